@@ -0,0 +1,232 @@
+"""
+Agregador (debounce) de mensagens recebidas pelo WhatsApp.
+
+Usuários mandam rajadas de mensagens curtas. Em vez de uma chamada à LLM por
+fragmento, cada mensagem entra no buffer do telefone (buffer_mensagens) e
+estende uma janela de espera:
+
+    prazo = min(ultima_mensagem + WHATSAPP_DEBOUNCE_SECONDS,
+                primeira_mensagem + WHATSAPP_DEBOUNCE_MAX_SECONDS)
+
+Cada mensagem agenda `processar_buffer_whatsapp_task` para o seu prazo; só a
+task que encontra o prazo vencido lê o buffer (`ler_janela`) e faz UMA chamada ao
+Agent com o texto concatenado. As mensagens só saem do buffer depois que a resposta
+foi enviada (`confirmar_janela`): se a LLM ou o envio falharem, o retry as encontra.
+A resposta gerada fica guardada (`salvar_resposta_pendente`) com quantos parágrafos
+já saíram: o retry de um envio que falhou no meio não chama a LLM de novo nem
+repete parágrafos já entregues. Um lock distribuído por telefone
+garante que apenas um worker processe o telefone por vez (sem respostas duplicadas).
+"""
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from redis.lock import Lock
+
+from api.utils.redis_db import get_redis_client
+from api.utils.settings import settings
+
+# Publicada pelo nome: a API não importa ia_tasks (langchain/Evolution API só no worker "ia")
+PROCESSAR_BUFFER_TASK = "api.utils.tasks.ia_tasks.processar_buffer_whatsapp_task"
+DEBOUNCE_PREFIX = "debounce:"
+LOCK_PREFIX = "lock:whatsapp:"
+RESPOSTA_PREFIX = "resposta_pendente:"
+RESPOSTA_TTL_SECONDS = 3600
+
+# KEYS[1]: buffer; KEYS[2]: janela; KEYS[3]: resposta pendente; ARGV[1]: mensagens respondidas.
+# Remove só as mensagens respondidas; se chegaram outras durante o processamento,
+# a janela continua e passa a contar a partir da última delas.
+_CONFIRMAR_SCRIPT = """
+redis.call('DEL', KEYS[3])
+redis.call('LTRIM', KEYS[1], ARGV[1], -1)
+local restantes = redis.call('LLEN', KEYS[1])
+if restantes == 0 then
+    redis.call('DEL', KEYS[2])
+else
+    local ultima = redis.call('HGET', KEYS[2], 'ultima')
+    if ultima then
+        redis.call('HSET', KEYS[2], 'inicio', ultima)
+    end
+end
+return restantes
+"""
+
+
+def _janela_key(telefone: str) -> str:
+    return DEBOUNCE_PREFIX + telefone
+
+
+def _resposta_key(telefone: str) -> str:
+    return RESPOSTA_PREFIX + telefone
+
+
+def _assinatura(mensagens: List[str]) -> str:
+    return hashlib.sha256("\x1e".join(mensagens).encode("utf-8")).hexdigest()
+
+
+def registrar_mensagem(telefone: str, mensagem: str) -> Optional[float]:
+    """
+    Adiciona a mensagem ao buffer e estende a janela do telefone.
+
+    Returns:
+        Segundos até o prazo da janela (para agendar o processamento) ou None se o Redis
+        estiver indisponível
+    """
+    client = get_redis_client()
+    if client is None:
+        print("❌ Conexão Redis não está ativa")
+        return None
+
+    agora = time.time()
+    janela = _janela_key(telefone)
+    ttl = int(settings.WHATSAPP_DEBOUNCE_MAX_SECONDS + settings.WHATSAPP_LOCK_TIMEOUT_SECONDS)
+
+    pipe = client.pipeline(transaction=True)
+    pipe.rpush(telefone, mensagem)
+    pipe.hsetnx(janela, "inicio", agora)
+    pipe.hset(janela, "ultima", agora)
+    pipe.hget(janela, "inicio")
+    pipe.expire(janela, ttl)
+    resultados = pipe.execute()
+
+    inicio = float(resultados[3])
+    prazo = min(agora + settings.WHATSAPP_DEBOUNCE_SECONDS, inicio + settings.WHATSAPP_DEBOUNCE_MAX_SECONDS)
+    return max(0.0, prazo - agora)
+
+
+def segundos_ate_prazo(telefone: str) -> Optional[float]:
+    """
+    Quanto falta para a janela do telefone vencer.
+
+    Returns:
+        0 se já venceu, o tempo restante se ainda está aberta, None se não há janela
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    estado = client.hgetall(_janela_key(telefone))
+    if not estado:
+        return None
+    inicio, ultima = float(estado["inicio"]), float(estado["ultima"])
+    prazo = min(ultima + settings.WHATSAPP_DEBOUNCE_SECONDS, inicio + settings.WHATSAPP_DEBOUNCE_MAX_SECONDS)
+    return max(0.0, prazo - time.time())
+
+
+def ler_janela(telefone: str) -> List[str]:
+    """Lê o buffer do telefone sem removê-lo (ver `confirmar_janela`)."""
+    client = get_redis_client()
+    if client is None:
+        return []
+    return client.lrange(telefone, 0, -1) or []
+
+
+def confirmar_janela(telefone: str, quantidade: int) -> int:
+    """
+    Remove do buffer as `quantidade` mensagens já respondidas (chamar após o envio).
+
+    Returns:
+        Quantas mensagens ficaram no buffer (chegaram durante o processamento)
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+    return int(client.eval(
+        _CONFIRMAR_SCRIPT, 3, telefone, _janela_key(telefone), _resposta_key(telefone), quantidade
+    ))
+
+
+def salvar_resposta_pendente(telefone: str, mensagens: List[str], respostas: List[str]) -> Dict[str, Any]:
+    """
+    Guarda a resposta gerada para `mensagens` até que todos os parágrafos sejam enviados.
+
+    Returns:
+        A resposta pendente (quantidade, respostas, enviadas)
+    """
+    pendente = {"quantidade": len(mensagens), "respostas": list(respostas), "enviadas": 0}
+    client = get_redis_client()
+    if client is not None:
+        key = _resposta_key(telefone)
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hset(key, mapping={
+            "janela": _assinatura(mensagens),
+            "quantidade": len(mensagens),
+            "respostas": json.dumps(pendente["respostas"], ensure_ascii=False),
+            "enviadas": 0,
+        })
+        pipe.expire(key, RESPOSTA_TTL_SECONDS)
+        pipe.execute()
+    return pendente
+
+
+def buscar_resposta_pendente(telefone: str, mensagens: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Resposta já gerada para o início do buffer, se houver.
+
+    Vale apenas se as primeiras `quantidade` mensagens do buffer forem as mesmas que
+    a geraram (mensagens novas entram no fim do buffer e ficam para a próxima janela).
+
+    Returns:
+        Dict com quantidade, respostas e enviadas, ou None
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    estado = client.hgetall(_resposta_key(telefone))
+    if not estado:
+        return None
+    quantidade = int(estado["quantidade"])
+    if quantidade > len(mensagens) or _assinatura(mensagens[:quantidade]) != estado["janela"]:
+        return None
+    return {
+        "quantidade": quantidade,
+        "respostas": json.loads(estado["respostas"]),
+        "enviadas": int(estado["enviadas"]),
+    }
+
+
+def marcar_paragrafo_enviado(telefone: str) -> None:
+    """Avança o contador de parágrafos entregues da resposta pendente."""
+    client = get_redis_client()
+    if client is not None:
+        client.hincrby(_resposta_key(telefone), "enviadas", 1)
+
+
+def adquirir_lock(telefone: str) -> Optional[Lock]:
+    """
+    Tenta adquirir (sem bloquear) o lock distribuído do telefone.
+
+    Returns:
+        O lock adquirido (liberar com `.release()`) ou None se outro worker já o detém
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    lock = client.lock(
+        LOCK_PREFIX + telefone,
+        timeout=settings.WHATSAPP_LOCK_TIMEOUT_SECONDS,
+        blocking=False,
+    )
+    return lock if lock.acquire() else None
+
+
+def enfileirar_mensagem_whatsapp(telefone: str, instancia: str, mensagem: str) -> bool:
+    """
+    Ponto de entrada do webhook: registra a mensagem e agenda o processamento do buffer.
+
+    Args:
+        telefone: Telefone do remetente
+        instancia: Nome da instância da Evolution API (para enviar a resposta)
+        mensagem: Texto já extraído (texto, transcrição de áudio, OCR etc.)
+
+    Returns:
+        True se a mensagem foi enfileirada
+    """
+    espera = registrar_mensagem(telefone, mensagem)
+    if espera is None:
+        return False
+
+    from api.utils.celery_app import celery_app
+    celery_app.send_task(PROCESSAR_BUFFER_TASK, args=[telefone, instancia], countdown=espera)
+    return True
@@ -2,6 +2,7 @@
 Serviço assíncrono para envio de emails via Celery
 """
 from typing import Optional
+from uuid import UUID
 from api.utils.tasks.email_tasks import (
     send_password_reset_email_task,
     send_welcome_email_task,
@@ -110,6 +111,23 @@ class AsyncEmailService:
         )
         return task.id
     
+    @staticmethod
+    def _get_outbox_status(task_id: str) -> Optional[dict]:
+        """Status de um e-mail da outbox (os ids retornados pelo reset de senha são da outbox)."""
+        from api.utils.db_services import SessionLocal
+        from api.utils.email_outbox import get_outbox_status
+        
+        try:
+            outbox_id = UUID(task_id)
+        except ValueError:
+            return None
+        
+        db = SessionLocal()
+        try:
+            return get_outbox_status(db, outbox_id)
+        finally:
+            db.close()
+    
     @staticmethod
     def get_task_status(task_id: str) -> dict:
         """
@@ -124,6 +142,10 @@ class AsyncEmailService:
         from api.utils.celery_app import celery_app
         
         try:
+            outbox_status = AsyncEmailService._get_outbox_status(task_id)
+            if outbox_status is not None:
+                return outbox_status
+            
             result = celery_app.AsyncResult(task_id)
             
             if result.state == 'PENDING':
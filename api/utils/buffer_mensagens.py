@@ -1,11 +1,12 @@
-from api.utils.redis_db import RedisDB
+from typing import List
+
+from api.utils.redis_db import RedisDB, get_async_redis_client
 
 def add_message_to_buffer(telefone: str, message: str):
     print(f"🔄 Adicionando mensagem para {telefone}: {message}")
     db = RedisDB()
     result = db.add_message(telefone, message)
     print(f"🔄 Resultado da adição: {result}")
-    db.close_connections()
     return result
 
 def get_message_from_buffer(telefone):
@@ -13,7 +14,6 @@ def get_message_from_buffer(telefone):
     db = RedisDB()
     response = db.get_messages(telefone)
     print(f"🔍 Mensagens encontradas: {response}")
-    db.close_connections()
     return response
 
 def remove_message_from_buffer(telefone):
@@ -21,6 +21,43 @@ def remove_message_from_buffer(telefone):
     db = RedisDB()
     result = db.delete_messages(telefone)
     print(f"🗑️ Resultado da remoção: {result}")
-    db.close_connections()
     return result
 
+def drain_message_buffer(telefone: str) -> List[str]:
+    """Lê e limpa o buffer do telefone em uma única ida ao Redis (LRANGE + DEL atômicos)."""
+    print(f"📤 Drenando mensagens para {telefone}")
+    db = RedisDB()
+    response = db.drain_messages(telefone)
+    print(f"📤 Mensagens drenadas: {len(response)}")
+    return response
+
+
+# ---- Versões assíncronas (redis.asyncio, mesmo pool por event loop) ----
+
+async def aadd_message_to_buffer(telefone: str, message: str) -> bool:
+    client = get_async_redis_client()
+    if client is None:
+        print("❌ Conexão Redis não está ativa")
+        return False
+    try:
+        await client.rpush(telefone, message)
+        return True
+    except Exception as e:
+        print(f"❌ Erro ao adicionar mensagem: {e}")
+        return False
+
+async def adrain_message_buffer(telefone: str) -> List[str]:
+    """Versão assíncrona de `drain_message_buffer`."""
+    client = get_async_redis_client()
+    if client is None:
+        print("❌ Conexão Redis não está ativa")
+        return []
+    try:
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.lrange(telefone, 0, -1)
+            pipe.delete(telefone)
+            mensagens, _ = await pipe.execute()
+        return mensagens if mensagens else []
+    except Exception as e:
+        print(f"❌ Erro ao drenar mensagens: {e}")
+        return []
@@ -1,18 +1,26 @@
 """
 Configuração do Celery para processamento assíncrono de tarefas
 """
-from celery import Celery
+from celery import Celery, signals
+from api.utils.metrics import install_celery_metrics
 from api.utils.settings import settings
+from api.utils.tracing import setup_tracing, shutdown_tracing
+
+# Módulos de tasks importados no boot de todo worker
+TASK_MODULES = [
+    'api.utils.tasks.email_tasks',
+    'api.v1.web_link.celery.tasks',
+]
+# Agente de WhatsApp: só no worker da fila "ia" (ver WHATSAPP_AGENT_ENABLED)
+if settings.WHATSAPP_AGENT_ENABLED:
+    TASK_MODULES.append('api.utils.tasks.ia_tasks')
 
 # Configuração do Celery
 celery_app = Celery(
     "celery_tasks",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=[
-        'api.utils.tasks.email_tasks',
-        'api.v1.web_link.celery.tasks',
-    ]
+    include=TASK_MODULES,
 )
 
 # Configurações do Celery
@@ -39,9 +47,29 @@ celery_app.conf.update(
         'api.v1.web_link.celery.tasks.scrape_url_task': {'queue': 'scraping'}, 
     },
     
-    # Rate limiting
-    task_annotations={
-        'api.utils.tasks.email_tasks.send_email_task': {'rate_limit': '10/m'},  # 10 emails por minuto
-        'api.utils.tasks.email_tasks.send_bulk_emails_task': {'rate_limit': '2/m'},  # 2 bulk por minuto
+    # Tarefas periódicas (celery beat)
+    beat_schedule={
+        'dispatch-email-outbox': {
+            'task': 'api.utils.tasks.email_tasks.dispatch_email_outbox_task',
+            'schedule': settings.EMAIL_OUTBOX_POLL_SECONDS,
+        },
     },
-) 
\ No newline at end of file
+    
+    # Sem rate_limit fixo nas tasks de e-mail: o ritmo é dado pelo orçamento global
+    # SMTP_MESSAGES_PER_MINUTE (SharedRateBudget no Redis, ver smtp_pool.py)
+) 
+
+# Duração das tasks e servidor /metrics do worker (CELERY_METRICS_PORT)
+install_celery_metrics()
+
+
+# Tracing em cada processo filho (depois do fork: o exportador usa threads próprias).
+# O contexto do trace chega nos headers da task publicada pela API.
+@signals.worker_process_init.connect(weak=False)
+def _init_worker_tracing(**kwargs):
+    setup_tracing("bna-worker")
+
+
+@signals.worker_process_shutdown.connect(weak=False)
+def _shutdown_worker_tracing(**kwargs):
+    shutdown_tracing()
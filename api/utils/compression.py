@@ -0,0 +1,134 @@
+"""
+Compressão negociada (brotli/gzip) das respostas da API.
+
+Middleware ASGI que escolhe o encoding pelo header Accept-Encoding (respeitando
+q-values), comprimindo apenas respostas completas acima de COMPRESSION_MINIMUM_SIZE
+e com content-type textual. Respostas em streaming (SSE, downloads) passam intactas.
+
+brotli é opcional: sem o pacote instalado, apenas gzip é oferecido.
+"""
+import gzip
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/problem+json",
+    "text/",
+    "application/javascript",
+    "application/xml",
+)
+
+
+def _parse_accept_encoding(value: str) -> Dict[str, float]:
+    """Converte 'br;q=1.0, gzip;q=0.8, *;q=0' em {'br': 1.0, 'gzip': 0.8, '*': 0.0}."""
+    encodings: Dict[str, float] = {}
+    for part in value.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[token] = quality
+    return encodings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Retorna 'br', 'gzip' ou None conforme o que o cliente aceita."""
+    if not accept_encoding:
+        return None
+    accepted = _parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+
+    candidates: List[str] = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Comprime respostas com brotli ou gzip conforme o Accept-Encoding.
+
+    Args:
+        app: Aplicação ASGI
+        minimum_size: Tamanho mínimo (bytes) do corpo para comprimir
+        gzip_level: Nível de compressão gzip (1-9)
+        brotli_quality: Qualidade brotli (0-11); valores baixos priorizam latência
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=start_message["headers"])
+            content_type = headers.get("content-type", "")
+
+            # Streaming, já comprimido, tipo binário ou pequeno demais: não mexe
+            if (
+                more_body
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or len(body) < self.minimum_size
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(body, compresslevel=self.gzip_level)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -2,6 +2,10 @@ from decouple import config
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from api.utils.metrics import install_db_metrics
+from api.utils.query_budget import install_query_counter
+from api.utils.slow_queries import install_slow_query_capture
+
 DATABASE_URL = config("DATABASE_URL")
 
 engine = create_engine(
@@ -14,6 +18,10 @@ engine = create_engine(
     connect_args={"options": "-c timezone=America/Sao_Paulo"}
 )
 
+install_query_counter(engine)
+install_db_metrics(engine)
+install_slow_query_capture(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
 
 def get_db():
@@ -0,0 +1,226 @@
+"""
+Outbox transacional de e-mails.
+
+Em vez de publicar uma task no Celery de dentro do request (o e-mail se perde se
+o broker falhar depois do commit, ou sai para uma ação que sofreu rollback), o
+e-mail é gravado na tabela `email_outbox` na MESMA sessão/transação da mudança
+de negócio:
+
+    reset_token = PasswordResetToken(...)
+    db.add(reset_token)
+    enqueue_email(db, EmailTemplateType.PASSWORD_RESET, user.email, {...})
+    db.commit()          # token e e-mail entram juntos (ou nenhum dos dois)
+    kick_email_dispatcher()
+
+O `dispatch_email_outbox_task` drena a tabela em lotes: reserva as linhas com
+SELECT ... FOR UPDATE SKIP LOCKED e um lease em `available_at` (vários workers não
+pegam a mesma linha), agrupa por template e entrega cada grupo ao sender SMTP com
+pool, sem transação aberta durante o envio. Além do
+agendamento periódico (beat), `kick_email_dispatcher` antecipa o dispatch, no
+máximo uma vez por EMAIL_OUTBOX_KICK_SECONDS: um pico de cadastros vira poucas
+mensagens no broker em vez de uma por e-mail.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import pytz
+from sqlalchemy.orm import Session
+
+from api.utils.redis_db import get_redis_client
+from api.utils.settings import settings
+from api.v1._database.models import EmailOutbox, EmailOutboxStatus
+
+tz = pytz.timezone('America/Sao_Paulo')
+KICK_KEY = "email_outbox:kick"
+
+
+def enqueue_email(
+    db: Session,
+    template_type,
+    to_email: str,
+    variables: Dict[str, Any],
+    custom_subject: Optional[str] = None,
+) -> EmailOutbox:
+    """
+    Adiciona um e-mail à outbox na sessão informada (sem commit).
+
+    Args:
+        db: Sessão da transação de negócio
+        template_type: EmailTemplateType ou o valor em string
+        to_email: Destinatário
+        variables: Variáveis do template (precisam ser serializáveis em JSON)
+        custom_subject: Assunto customizado (opcional)
+    """
+    item = EmailOutbox(
+        template_type=getattr(template_type, "value", template_type),
+        to_email=to_email,
+        variables=variables,
+        custom_subject=custom_subject,
+    )
+    db.add(item)
+    return item
+
+
+def kick_email_dispatcher() -> bool:
+    """
+    Pede um dispatch antecipado (chamar após o commit).
+
+    Returns:
+        True se uma task foi publicada; False se outra já foi publicada na janela
+        (ou se o broker estiver indisponível)
+    """
+    try:
+        client = get_redis_client()
+        if client is not None and not client.set(KICK_KEY, 1, nx=True, ex=settings.EMAIL_OUTBOX_KICK_SECONDS):
+            return False
+
+        from api.utils.tasks.email_tasks import dispatch_email_outbox_task
+        dispatch_email_outbox_task.apply_async(countdown=settings.EMAIL_OUTBOX_KICK_SECONDS)
+        return True
+    except Exception as e:
+        # O e-mail já está salvo na outbox: o dispatch periódico o enviará
+        print(f"⚠️ Não foi possível antecipar o dispatch da outbox: {e}")
+        return False
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(3600, 30 * 2 ** (attempts - 1)))
+
+
+def _claim_batch(db: Session, batch_size: int) -> List[Dict[str, Any]]:
+    """
+    Reserva um lote de pendentes numa transação curta.
+
+    As linhas são travadas (FOR UPDATE SKIP LOCKED) só o tempo de empurrar
+    `available_at` para depois de EMAIL_OUTBOX_LEASE_SECONDS; após o commit elas
+    ficam fora da varredura de outros dispatchers até o lease vencer. Se o worker
+    morrer no meio do envio, o lote volta sozinho para a fila.
+    """
+    agora = datetime.now(tz)
+    itens: List[EmailOutbox] = (
+        db.query(EmailOutbox)
+        .filter(
+            EmailOutbox.status == EmailOutboxStatus.PENDENTE.value,
+            EmailOutbox.available_at <= agora,
+        )
+        .order_by(EmailOutbox.available_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    lease = agora + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+    claimed = []
+    for item in itens:
+        item.available_at = lease
+        claimed.append({
+            "id": item.id,
+            "template_type": item.template_type,
+            "to_email": item.to_email,
+            "variables": item.variables or {},
+            "custom_subject": item.custom_subject,
+        })
+    db.commit()
+    return claimed
+
+
+def _record_results(db: Session, resultados: Dict[UUID, Optional[str]]) -> Tuple[int, int]:
+    """
+    Grava o resultado dos envios numa segunda transação curta.
+
+    Args:
+        resultados: id -> None (enviado) ou mensagem de erro
+
+    Returns:
+        (enviados, falhas)
+    """
+    enviados = falhas = 0
+    itens: List[EmailOutbox] = (
+        db.query(EmailOutbox)
+        .filter(
+            EmailOutbox.id.in_(list(resultados)),
+            EmailOutbox.status == EmailOutboxStatus.PENDENTE.value,
+        )
+        .with_for_update()
+        .all()
+    )
+    agora = datetime.now(tz)
+    for item in itens:
+        erro = resultados[item.id]
+        item.attempts += 1
+        if erro is None:
+            item.status = EmailOutboxStatus.ENVIADO.value
+            item.sent_at = agora
+            item.last_error = None
+            enviados += 1
+        else:
+            item.last_error = erro
+            falhas += 1
+            if item.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                item.status = EmailOutboxStatus.FALHOU.value
+            else:
+                item.available_at = agora + _backoff(item.attempts)
+    db.commit()
+    return enviados, falhas
+
+
+def dispatch_batch(db: Session, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Envia um lote de e-mails pendentes.
+
+    Nenhuma transação fica aberta durante o SMTP: o lote é reservado com um lease
+    (`_claim_batch`), enviado fora da transação e os status são gravados depois
+    (`_record_results`). Dispatchers concorrentes pegam lotes disjuntos. Falhas
+    voltam para a fila com backoff exponencial até EMAIL_OUTBOX_MAX_ATTEMPTS.
+
+    Returns:
+        Dict com selected, sent e failed
+    """
+    from api.utils.modules.smtp.email_service import EmailService, EmailTemplateType
+
+    itens = _claim_batch(db, batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not itens:
+        return {"selected": 0, "sent": 0, "failed": 0}
+
+    grupos: Dict[Tuple[str, Optional[str]], List[Dict[str, Any]]] = defaultdict(list)
+    for item in itens:
+        grupos[(item["template_type"], item["custom_subject"])].append(item)
+
+    email_service = EmailService()
+    resultados: Dict[UUID, Optional[str]] = {}
+    for (template_type, custom_subject), grupo in grupos.items():
+        try:
+            sucessos = email_service.send_batch(
+                EmailTemplateType(template_type),
+                [(item["to_email"], item["variables"]) for item in grupo],
+                custom_subject=custom_subject,
+            )
+            erro = "Falha no envio SMTP"
+        except Exception as e:
+            # Template inválido/variável ausente: nenhum e-mail do grupo sai
+            sucessos = [False] * len(grupo)
+            erro = str(e)
+
+        for item, sucesso in zip(grupo, sucessos):
+            resultados[item["id"]] = None if sucesso else erro
+
+    enviados, falhas = _record_results(db, resultados)
+    return {"selected": len(itens), "sent": enviados, "failed": falhas}
+
+
+def get_outbox_status(db: Session, outbox_id: UUID) -> Optional[Dict[str, Any]]:
+    """Situação de um e-mail da outbox (None se o id não for da outbox)."""
+    item = db.get(EmailOutbox, outbox_id)
+    if item is None:
+        return None
+    return {
+        "state": {
+            EmailOutboxStatus.PENDENTE.value: "PENDING",
+            EmailOutboxStatus.ENVIADO.value: "SUCCESS",
+            EmailOutboxStatus.FALHOU.value: "FAILURE",
+        }.get(item.status, item.status),
+        "status": item.status,
+        "attempts": item.attempts,
+        "error": item.last_error,
+    }
@@ -1,5 +1,10 @@
+import asyncio
+import base64
 import logging
-from typing import Any, Dict, Optional
+import re
+import weakref
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Union
 
 from decouple import config
 import httpx
@@ -9,6 +14,8 @@ from api.v1._shared.custom_schemas import MensagemZap
 # Configurações da Evolution API
 EVOLUTIONAPI_URL = config("EVOLUTIONAPI_URL")
 EVOLUTIONAPI_KEY = config("EVOLUTIONAPI_KEY")
+EVOLUTION_MAX_CONNECTIONS = config("EVOLUTION_MAX_CONNECTIONS", default=20, cast=int)
+EVOLUTION_KEEPALIVE_SECONDS = config("EVOLUTION_KEEPALIVE_SECONDS", default=30.0, cast=float)
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +27,182 @@ class EvolutionAPIError(Exception):
     pass
 
 
+# Um AsyncClient por event loop (o pool do httpx fica preso ao loop que o criou):
+# o da API e o loop persistente de cada processo do worker (ia_tasks._run_async)
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_evolution_client() -> httpx.AsyncClient:
+    """
+    Retorna o AsyncClient compartilhado (keep-alive + pool limitado) do event loop atual.
+
+    `max_connections` também limita a concorrência: requisições além do limite
+    aguardam uma conexão livre (até o timeout de pool).
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, pool=10.0),
+            limits=httpx.Limits(
+                max_connections=EVOLUTION_MAX_CONNECTIONS,
+                max_keepalive_connections=EVOLUTION_MAX_CONNECTIONS,
+                keepalive_expiry=EVOLUTION_KEEPALIVE_SECONDS,
+            ),
+            headers={"apikey": EVOLUTIONAPI_KEY},
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose_evolution_client() -> None:
+    """Fecha o client do event loop atual (usar no shutdown da aplicação/worker)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+_BASE64_FIELD_RE = re.compile(rb'"base64"\s*:\s*"')
+
+
+class _Base64FieldDecoder:
+    """
+    Decodifica incrementalmente o campo "base64" de um JSON recebido em pedaços,
+    escrevendo os bytes direto no arquivo de saída (memória constante).
+    """
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.bytes_written = 0
+        self._head = b""
+        self._pending = b""
+        self._in_field = False
+        self._prefix_checked = False
+        self._done = False
+
+    def feed(self, chunk: bytes) -> None:
+        if self._done:
+            return
+        if not self._in_field:
+            self._head += chunk
+            match = _BASE64_FIELD_RE.search(self._head)
+            if match is None:
+                self._head = self._head[-32:]  # o marcador pode estar dividido entre pedaços
+                return
+            chunk = self._head[match.end():]
+            self._head = b""
+            self._in_field = True
+
+        end = chunk.find(b'"')
+        if end != -1:
+            chunk = chunk[:end]
+            self._done = True
+        self._pending += chunk
+        self._drain()
+
+    def _drain(self) -> None:
+        # Escapes JSON possíveis dentro de base64 (\/ e quebras de linha escapadas)
+        hold = b""
+        if self._pending.endswith(b"\\") and not self._done:
+            self._pending, hold = self._pending[:-1], b"\\"
+        data = self._pending.replace(b"\\/", b"/").replace(b"\\n", b"").replace(b"\\r", b"")
+
+        # Remove prefixo data:<mime>;base64, se existir
+        if not self._prefix_checked:
+            if data.startswith(b"data:"):
+                comma = data.find(b",")
+                if comma == -1:
+                    self._pending = data + hold
+                    return
+                data = data[comma + 1:]
+            elif len(data) < 5 and not self._done:
+                self._pending = data + hold
+                return
+            self._prefix_checked = True
+
+        usable = len(data) if self._done else len(data) - (len(data) % 4)
+        if usable:
+            decoded = base64.b64decode(data[:usable])
+            self.out.write(decoded)
+            self.bytes_written += len(decoded)
+        self._pending = data[usable:] + hold
+
+    def finish(self) -> int:
+        if not self._in_field:
+            raise ValueError("Base64 não encontrado na resposta da API")
+        if not self._done:
+            raise ValueError("Resposta da API truncada: campo base64 sem fechamento")
+        return self.bytes_written
+
+
+async def download_media_to_file(
+    instance_name: str,
+    message_id: str,
+    file_path: Union[str, Path],
+    convert_to_mp4: bool = False,
+) -> Path:
+    """
+    Baixa a mídia da Evolution API decodificando o base64 em streaming direto para arquivo.
+
+    Diferente de `get_media_base64`, o JSON nunca é carregado inteiro em memória:
+    os pedaços da resposta são decodificados e gravados conforme chegam.
+
+    Args:
+        instance_name: Nome da instância do WhatsApp
+        message_id: ID da mensagem que contém a mídia
+        file_path: Caminho de destino do arquivo
+        convert_to_mp4: Se deve converter áudio para MP4 (opcional, padrão: False)
+
+    Returns:
+        Path do arquivo gravado
+
+    Raises:
+        EvolutionAPIError: Em caso de erro na requisição
+        ValueError: Se a resposta não contiver o campo base64
+    """
+    url = f"{EVOLUTIONAPI_URL}/chat/getBase64FromMediaMessage/{instance_name}"
+    payload: Dict[str, Any] = {"message": {"key": {"id": message_id}}}
+    if convert_to_mp4:
+        payload["convertToMp4"] = True
+
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    client = get_evolution_client()
+
+    try:
+        async with client.stream("POST", url, json=payload, timeout=60.0) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            with open(file_path, "wb") as out:
+                decoder = _Base64FieldDecoder(out)
+                async for chunk in response.aiter_bytes():
+                    decoder.feed(chunk)
+                total = decoder.finish()
+
+        logger.info(f"Mídia gravada em streaming para message_id {message_id}: {total} bytes em {file_path}")
+        return file_path
+
+    except httpx.HTTPStatusError as e:
+        file_path.unlink(missing_ok=True)
+        error_msg = f"Erro HTTP ao obter mídia (Status {e.response.status_code}): {e.response.text}"
+        logger.error(error_msg)
+        raise EvolutionAPIError(error_msg)
+    except httpx.TimeoutException:
+        file_path.unlink(missing_ok=True)
+        error_msg = f"Timeout ao obter mídia para message_id: {message_id}"
+        logger.error(error_msg)
+        raise EvolutionAPIError(error_msg)
+    except httpx.HTTPError as e:
+        file_path.unlink(missing_ok=True)
+        error_msg = f"Erro inesperado ao obter mídia: {str(e)}"
+        logger.error(error_msg)
+        raise EvolutionAPIError(error_msg)
+    except Exception:
+        file_path.unlink(missing_ok=True)
+        raise
+
+
 async def get_media_base64(
     instance_name: str, 
     message_id: str, 
@@ -59,15 +242,15 @@ async def get_media_base64(
         if convert_to_mp4:
             payload["convertToMp4"] = True
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            
-            response_data = response.json()
-            
-            logger.info(f"Mídia obtida com sucesso para message_id: {message_id}")
-            return response_data
-            
+        client = get_evolution_client()
+        response = await client.post(url, json=payload, headers=headers, timeout=30.0)
+        response.raise_for_status()
+        
+        response_data = response.json()
+        
+        logger.info(f"Mídia obtida com sucesso para message_id: {message_id}")
+        return response_data
+        
     except httpx.HTTPStatusError as e:
         error_msg = f"Erro HTTP ao obter mídia (Status {e.response.status_code}): {e.response.text}"
         logger.error(error_msg)
@@ -114,15 +297,15 @@ async def send_text_message(
             "text": text
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            
-            response_data = response.json()
-            
-            logger.info(f"Mensagem de texto enviada com sucesso para: {phone_number}")
-            return response_data
-            
+        client = get_evolution_client()
+        response = await client.post(url, json=payload, headers=headers, timeout=30.0)
+        response.raise_for_status()
+        
+        response_data = response.json()
+        
+        logger.info(f"Mensagem de texto enviada com sucesso para: {phone_number}")
+        return response_data
+        
     except httpx.HTTPStatusError as e:
         error_msg = f"Erro HTTP ao enviar texto (Status {e.response.status_code}): {e.response.text}"
         logger.error(error_msg)
@@ -183,15 +366,15 @@ async def send_media_message(
         if caption:
             payload["mediaMessage"]["caption"] = caption
         
-        async with httpx.AsyncClient(timeout=60.0) as client:  # Timeout maior para mídia
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            
-            response_data = response.json()
-            
-            logger.info(f"Mensagem de mídia ({media_type}) enviada com sucesso para: {phone_number}")
-            return response_data
-            
+        client = get_evolution_client()
+        response = await client.post(url, json=payload, headers=headers, timeout=60.0)
+        response.raise_for_status()
+        
+        response_data = response.json()
+        
+        logger.info(f"Mensagem de mídia ({media_type}) enviada com sucesso para: {phone_number}")
+        return response_data
+        
     except httpx.HTTPStatusError as e:
         error_msg = f"Erro HTTP ao enviar mídia (Status {e.response.status_code}): {e.response.text}"
         logger.error(error_msg)
@@ -0,0 +1,174 @@
+"""
+Cache de extração de mídia (áudio, imagem, PDF) por conteúdo.
+
+Mídias encaminhadas no WhatsApp chegam iguais para vários números. O resultado
+da extração (texto + tokens gastos) fica no Redis indexado pelo SHA-256 do
+arquivo, então a mesma mídia só passa pelo modelo uma vez:
+
+    midia:{tipo}:{sha256}        -> JSON {"text", "tokens_used", "model"} (TTL)
+    midia:chave:{tipo}:{chave}   -> sha256 (chave de mídia da Evolution, quando houver)
+    midia:indice                 -> ZSET sha256 por horário de gravação (limite de entradas)
+
+Com a chave de mídia da Evolution o acerto acontece antes do download; sem ela,
+o arquivo é baixado, o hash é calculado e o acerto evita só a chamada ao modelo.
+O índice mantém no máximo MEDIA_CACHE_MAX_ENTRIES entradas (as mais antigas saem).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional, Union
+
+from api.utils.metrics import record_cache
+from api.utils.redis_db import get_async_redis_client
+from api.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "midia:"
+CHAVE_PREFIX = "midia:chave:"
+INDICE_KEY = "midia:indice"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class ExtracaoCacheada:
+    """Resultado de extração guardado no cache."""
+    text: str
+    tokens_used: int = 0
+    model: str = ""
+
+
+def media_key_da_mensagem(mensagem) -> Optional[str]:
+    """Chave de mídia da Evolution (`mediaKey`), se a mensagem trouxer."""
+    return getattr(mensagem, "media_key", None) or None
+
+
+def _cache_key(tipo: str, sha256: str) -> str:
+    return f"{CACHE_PREFIX}{tipo}:{sha256}"
+
+
+def _chave_key(tipo: str, media_key: str) -> str:
+    return f"{CHAVE_PREFIX}{tipo}:{media_key}"
+
+
+def _indice_membro(tipo: str, sha256: str) -> str:
+    return f"{tipo}:{sha256}"
+
+
+def _sha256_arquivo_sync(file_path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for bloco in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+async def sha256_arquivo(file_path: Union[str, Path]) -> str:
+    """SHA-256 do arquivo, lido em blocos fora do event loop."""
+    return await asyncio.to_thread(_sha256_arquivo_sync, file_path)
+
+
+async def _ler(client, key: str) -> Optional[ExtracaoCacheada]:
+    bruto = await client.get(key)
+    if not bruto:
+        return None
+    try:
+        return ExtracaoCacheada(**json.loads(bruto))
+    except (ValueError, TypeError):
+        return None
+
+
+async def buscar_por_media_key(tipo: str, media_key: Optional[str]) -> Optional[ExtracaoCacheada]:
+    """
+    Procura a extração pela chave de mídia da Evolution (permite pular o download).
+
+    Args:
+        tipo: "audio", "imagem" ou "pdf"
+        media_key: Chave de mídia informada pela Evolution (ou None)
+    """
+    if not settings.MEDIA_CACHE_ENABLED or not media_key:
+        return None
+    client = get_async_redis_client()
+    if client is None:
+        return None
+    try:
+        sha256 = await client.get(_chave_key(tipo, media_key))
+        resultado = await _ler(client, _cache_key(tipo, sha256)) if sha256 else None
+        record_cache(f"midia_{tipo}_chave", resultado is not None)
+        if resultado:
+            logger.info(f"♻️ Cache de mídia ({tipo}) encontrado pela chave da Evolution: {sha256[:12]}")
+        return resultado
+    except Exception as e:
+        logger.warning(f"Falha ao consultar cache de mídia: {e}")
+        return None
+
+
+async def buscar_por_hash(
+    tipo: str, sha256: str, media_key: Optional[str] = None
+) -> Optional[ExtracaoCacheada]:
+    """
+    Procura a extração pelo hash do conteúdo.
+
+    Em caso de acerto, associa também a chave de mídia da Evolution (se informada)
+    para que a próxima cópia nem precise ser baixada.
+    """
+    if not settings.MEDIA_CACHE_ENABLED:
+        return None
+    client = get_async_redis_client()
+    if client is None:
+        return None
+    try:
+        resultado = await _ler(client, _cache_key(tipo, sha256))
+        record_cache(f"midia_{tipo}_hash", resultado is not None)
+        if resultado is None:
+            return None
+        if media_key:
+            await client.set(_chave_key(tipo, media_key), sha256, ex=settings.MEDIA_CACHE_TTL_SECONDS)
+        logger.info(f"♻️ Cache de mídia ({tipo}) encontrado pelo hash: {sha256[:12]}")
+        return resultado
+    except Exception as e:
+        logger.warning(f"Falha ao consultar cache de mídia: {e}")
+        return None
+
+
+async def salvar_extracao(
+    tipo: str,
+    sha256: str,
+    text: str,
+    tokens_used: int = 0,
+    model: str = "",
+    media_key: Optional[str] = None,
+) -> None:
+    """
+    Grava a extração no cache e aplica o limite de entradas.
+
+    Textos vazios ou maiores que MEDIA_CACHE_MAX_TEXT_CHARS não são guardados.
+    """
+    if not settings.MEDIA_CACHE_ENABLED or not text or len(text) > settings.MEDIA_CACHE_MAX_TEXT_CHARS:
+        return
+    client = get_async_redis_client()
+    if client is None:
+        return
+
+    ttl = settings.MEDIA_CACHE_TTL_SECONDS
+    valor = json.dumps(asdict(ExtracaoCacheada(text=text, tokens_used=int(tokens_used), model=model)), ensure_ascii=False)
+    try:
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.set(_cache_key(tipo, sha256), valor, ex=ttl)
+            if media_key:
+                pipe.set(_chave_key(tipo, media_key), sha256, ex=ttl)
+            pipe.zadd(INDICE_KEY, {_indice_membro(tipo, sha256): time.time()})
+            pipe.zcard(INDICE_KEY)
+            resultados = await pipe.execute()
+
+        excedentes = resultados[-1] - settings.MEDIA_CACHE_MAX_ENTRIES
+        if excedentes > 0:
+            antigos = await client.zpopmin(INDICE_KEY, excedentes)
+            if antigos:
+                await client.delete(*(f"{CACHE_PREFIX}{membro}" for membro, _ in antigos))
+    except Exception as e:
+        logger.warning(f"Falha ao gravar cache de mídia: {e}")
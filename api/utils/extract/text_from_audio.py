@@ -2,7 +2,14 @@ import base64
 import logging
 from pathlib import Path
 
-from api.utils.evolution_api import EvolutionAPIError, get_media_base64
+from api.utils.evolution_api import EvolutionAPIError, download_media_to_file
+from api.utils.extract.cache_midia import (
+    buscar_por_hash,
+    buscar_por_media_key,
+    media_key_da_mensagem,
+    salvar_extracao,
+    sha256_arquivo,
+)
 from api.utils.ia.ia_audio import transcribe_mp4_to_text
 from api.utils.utils_file import cleanup_temp_file
 from api.v1._shared.constants import MESSAGE_TYPE_AUDIO_ERROR
@@ -15,29 +22,6 @@ logger = logging.getLogger(__name__)
 
 async def _baixa_audio(instance_name, message_id) -> str:
     try:        
-        # Usa o método centralizado da Evolution API com conversão para MP4
-        response_data = await get_media_base64(instance_name, message_id, convert_to_mp4=True)
-        
-        # Assume que o base64 está em response_data["base64"] ou similar
-        # Ajuste conforme a estrutura real da resposta da API
-        if "base64" in response_data:
-            audio_base64 = response_data["base64"]
-        elif "data" in response_data and "base64" in response_data["data"]:
-            audio_base64 = response_data["data"]["base64"]
-        else:
-            # Se não encontrar o base64, use a resposta completa
-            audio_base64 = response_data.get("media", response_data.get("base64", ""))
-        
-        if not audio_base64:
-            raise ValueError("Base64 não encontrado na resposta da API")
-        
-        # Remove prefixo data:audio/... se existir
-        if "," in audio_base64:
-            audio_base64 = audio_base64.split(",")[1]
-        
-        # Decodifica o base64
-        audio_bytes = base64.b64decode(audio_base64)
-        
         # Cria a pasta temp se não existir
         temp_dir = Path("temp")
         temp_dir.mkdir(exist_ok=True)
@@ -46,9 +30,8 @@ async def _baixa_audio(instance_name, message_id) -> str:
         filename = f"{instance_name}_{message_id}.mp4"
         file_path = temp_dir / filename
         
-        # Salva o arquivo MP4
-        with open(file_path, "wb") as audio_file:
-            audio_file.write(audio_bytes)
+        # Baixa decodificando o base64 em streaming direto para o arquivo (memória constante)
+        await download_media_to_file(instance_name, message_id, file_path, convert_to_mp4=True)
         
         logger.info(f"Arquivo salvo com sucesso: {file_path}")
         
@@ -67,6 +50,12 @@ async def _baixa_audio(instance_name, message_id) -> str:
 
 async def text_from_audio(mensagem: MensagemZap) -> str:    
 
+    # Áudio encaminhado já transcrito: nem baixa
+    media_key = media_key_da_mensagem(mensagem)
+    cacheado = await buscar_por_media_key("audio", media_key)
+    if cacheado:
+        return cacheado.text
+
     # Baixa o áudio
     file_path = await _baixa_audio(mensagem.nome_instancia, mensagem.message_id)
 
@@ -76,10 +65,24 @@ async def text_from_audio(mensagem: MensagemZap) -> str:
     
     # Transcreve o áudio usando OpenAI
     try:
+        sha256 = await sha256_arquivo(file_path)
+        cacheado = await buscar_por_hash("audio", sha256, media_key)
+        if cacheado:
+            cleanup_temp_file(file_path)
+            return cacheado.text
+
         transcription_result: TranscriptionResult = transcribe_mp4_to_text(str(file_path))
         logger.info(f"Transcrição concluída - Tokens utilizados: {transcription_result.tokens_used}")        
         # Retorna Message com texto transcrito e informações detalhadas
         response_texto = transcription_result.text
+        await salvar_extracao(
+            "audio",
+            sha256,
+            response_texto,
+            tokens_used=transcription_result.tokens_used,
+            model=transcription_result.model_used,
+            media_key=media_key,
+        )
 
     except Exception as e:
         logger.error(f"Erro ao transcrever áudio: {e}")
@@ -13,6 +13,7 @@ Características principais:
 - Logging detalhado para monitoramento
 - Tratamento robusto de erros
 - Estimativa de consumo de tokens
+- Cache por conteúdo (SHA-256): a mesma imagem encaminhada não volta ao modelo
 
 O prompt foi especificamente desenhado para preservar formatação, ordem visual,
 números, símbolos e marcas d'água, mantendo fidelidade ao texto original.
@@ -22,8 +23,15 @@ import base64
 import logging
 from pathlib import Path
 
-from api.utils.evolution_api import get_media_base64, EvolutionAPIError
-from api.utils.ia.ia_imagem import process_image_with_vision
+from api.utils.evolution_api import download_media_to_file, EvolutionAPIError
+from api.utils.extract.cache_midia import (
+    buscar_por_hash,
+    buscar_por_media_key,
+    media_key_da_mensagem,
+    salvar_extracao,
+    sha256_arquivo,
+)
+from api.utils.ia.ia_imagem import VISION_MODEL, process_image_with_vision_usage
 from api.utils.utils_file import cleanup_temp_file
 from api.v1._shared.constants import MESSAGE_TYPE_IMAGE_ERROR
 from api.v1._shared.custom_schemas import MensagemZap
@@ -44,39 +52,16 @@ async def _baixa_imagem(instance_name, message_id) -> str:
         str: Caminho para o arquivo da imagem baixada
     """
     try:        
-        # Usa o método centralizado da Evolution API
-        response_data = await get_media_base64(instance_name, message_id)
-        
-        # Busca o base64 na resposta
-        if "base64" in response_data:
-            image_base64 = response_data["base64"]
-        elif "data" in response_data and "base64" in response_data["data"]:
-            image_base64 = response_data["data"]["base64"]
-        else:
-            # Se não encontrar o base64, use a resposta completa
-            image_base64 = response_data.get("media", response_data.get("base64", ""))
-        
-        if not image_base64:
-            raise ValueError("Base64 não encontrado na resposta da API")
-        
-        # Remove prefixo data:image/... se existir
-        if "," in image_base64:
-            image_base64 = image_base64.split(",")[1]
-        
-        # Decodifica o base64
-        image_bytes = base64.b64decode(image_base64)
-        
         # Cria a pasta temp se não existir
         temp_dir = Path("temp")
         temp_dir.mkdir(exist_ok=True)
         
-        # Define o nome do arquivo (usa jpg como padrão)
+        # Define o nome do arquivo
         filename = f"{instance_name}_{message_id}.jpg"
         file_path = temp_dir / filename
         
-        # Salva o arquivo da imagem
-        with open(file_path, "wb") as image_file:
-            image_file.write(image_bytes)
+        # Baixa decodificando o base64 em streaming direto para o arquivo (memória constante)
+        await download_media_to_file(instance_name, message_id, file_path)
         
         logger.info(f"Imagem salva com sucesso: {file_path}")
         
@@ -109,6 +94,14 @@ async def extract_text_from_image(mensagem: MensagemZap) -> str:
         Message: Objeto com o texto extraído
     """
     response = ""
+    media_key = media_key_da_mensagem(mensagem)
+    # A legenda entra no prompt: com legenda o resultado não é reaproveitável
+    usa_cache = not mensagem.label
+    if usa_cache:
+        cacheado = await buscar_por_media_key("imagem", media_key)
+        if cacheado:
+            return cacheado.text
+
     try:
         file_path = await _baixa_imagem(mensagem.nome_instancia, mensagem.message_id)
         
@@ -119,9 +112,17 @@ async def extract_text_from_image(mensagem: MensagemZap) -> str:
     
     # Processa a imagem com OpenAI Vision
     try:
+        sha256 = await sha256_arquivo(file_path) if usa_cache else None
+        cacheado = await buscar_por_hash("imagem", sha256, media_key) if sha256 else None
+        if cacheado:
+            cleanup_temp_file(file_path)
+            return cacheado.text
+
         logger.info(f"Processando imagem com OpenAI Vision...")
-        response = await process_image_with_vision(file_path, mensagem.label)    
+        response, tokens_used = await process_image_with_vision_usage(file_path, mensagem.label)    
         logger.info(f"FINALIZANDO extract_text_from_image com sucesso")
+        if sha256:
+            await salvar_extracao("imagem", sha256, response, tokens_used=tokens_used, model=VISION_MODEL, media_key=media_key)
         
     except Exception as e:
         logger.error(f" Erro ao processar imagem: {e}")
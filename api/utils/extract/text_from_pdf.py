@@ -1,46 +1,28 @@
+import asyncio
 import base64
 import logging
 from pathlib import Path
+from typing import Optional
 
-import PyPDF2
-
-from api.utils.evolution_api import EvolutionAPIError, get_media_base64
-from api.utils.utils_file import cleanup_temp_file
-from api.v1._shared.constants import (
-    MESSAGE_TYPE_ARQUIVO_MUITO_LONGO,
-    MESSAGE_TYPE_PDF_ERROR,
+from api.utils.evolution_api import EvolutionAPIError, download_media_to_file
+from api.utils.modules.pdf.pdf_text import iter_pdf_pages
+from api.utils.extract.cache_midia import (
+    buscar_por_hash,
+    buscar_por_media_key,
+    media_key_da_mensagem,
+    salvar_extracao,
+    sha256_arquivo,
 )
+from api.utils.utils_file import cleanup_temp_file
+from api.utils.settings import settings
+from api.v1._shared.constants import MESSAGE_TYPE_PDF_ERROR
 from api.v1._shared.custom_schemas import MensagemZap
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-
 async def _baixa_pdf(instance_name, message_id) -> str:
     try:        
-        # Usa o método centralizado da Evolution API
-        response_data = await get_media_base64(instance_name, message_id)
-            
-        # Assume que o base64 está em response_data["base64"] ou similar
-        # Ajuste conforme a estrutura real da resposta da API
-        if "base64" in response_data:
-            pdf_base64 = response_data["base64"]
-        elif "data" in response_data and "base64" in response_data["data"]:
-            pdf_base64 = response_data["data"]["base64"]
-        else:
-            # Se não encontrar o base64, use a resposta completa
-            pdf_base64 = response_data.get("media", response_data.get("base64", ""))
-        
-        if not pdf_base64:
-            raise ValueError("Base64 não encontrado na resposta da API")
-        
-        # Remove prefixo data:application/pdf;... se existir
-        if "," in pdf_base64:
-            pdf_base64 = pdf_base64.split(",")[1]
-        
-        # Decodifica o base64
-        pdf_bytes = base64.b64decode(pdf_base64)
-        
         # Cria a pasta temp se não existir
         temp_dir = Path("temp")
         temp_dir.mkdir(exist_ok=True)
@@ -49,9 +31,8 @@ async def _baixa_pdf(instance_name, message_id) -> str:
         filename = f"{instance_name}_{message_id}.pdf"
         file_path = temp_dir / filename
         
-        # Salva o arquivo PDF
-        with open(file_path, "wb") as pdf_file:
-            pdf_file.write(pdf_bytes)
+        # Baixa decodificando o base64 em streaming direto para o arquivo (memória constante)
+        await download_media_to_file(instance_name, message_id, file_path)
         
         logger.info(f"Arquivo PDF salvo com sucesso: {file_path}")
         
@@ -67,32 +48,26 @@ async def _baixa_pdf(instance_name, message_id) -> str:
         logger.error(f"Erro inesperado ao processar PDF: {e}")
         raise Exception(f"Erro ao processar PDF: {str(e)}")
 
-def _extract_text_from_pdf_file(file_path: str) -> tuple[str, int]:
+def _extract_text_from_pdf_file(file_path: str, char_budget: Optional[int] = None) -> tuple[str, int]:
     """
-    Extrai texto de um arquivo PDF e retorna o texto e número de páginas.
+    Extrai texto de um arquivo PDF e retorna o texto e número de páginas lidas.
     
     Args:
         file_path: Caminho para o arquivo PDF
+        char_budget: Máximo de caracteres (padrão: PDF_MESSAGE_CHAR_BUDGET)
         
     Returns:
         tuple: (texto_extraido, numero_de_paginas)
     """
+    if char_budget is None:
+        char_budget = settings.PDF_MESSAGE_CHAR_BUDGET
     try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            num_pages = len(pdf_reader.pages)
-            
-            # Se tem mais que 2 páginas, retorna mensagem especial
-            if num_pages > 2:
-                return MESSAGE_TYPE_ARQUIVO_MUITO_LONGO, num_pages
-            
-            # Extrai texto de todas as páginas (máximo 2)
-            text = ""
-            for page_num in range(num_pages):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
-            
-            return text.strip(), num_pages
+        pages = [text for _, text in iter_pdf_pages(file_path, char_budget)]
+        text = "\n".join(pages).strip()
+        total_chars = sum(len(page) for page in pages)
+        if total_chars >= char_budget:
+            logger.info(f"PDF cortado no orçamento de {char_budget} caracteres (página {len(pages)})")
+        return text, len(pages)
             
     except Exception as e:
         logger.error(f"Erro ao extrair texto do PDF: {e}")
@@ -101,16 +76,29 @@ def _extract_text_from_pdf_file(file_path: str) -> tuple[str, int]:
 async def extract_text_from_pdf(mensagem: MensagemZap) -> str:    
 
     response = ""
+    file_path = None
+
+    media_key = media_key_da_mensagem(mensagem)
+    cacheado = await buscar_por_media_key("pdf", media_key)
+    if cacheado:
+        return cacheado.text
 
     try:
         file_path = await _baixa_pdf(mensagem.nome_instancia, mensagem.message_id)
         logger.info(f"PDF salvo em: {file_path}")
+
+        sha256 = await sha256_arquivo(file_path)
+        cacheado = await buscar_por_hash("pdf", sha256, media_key)
+        if cacheado:
+            cleanup_temp_file(file_path)
+            return cacheado.text
         
-        # Extrai o texto do PDF
-        extracted_text = _extract_text_from_pdf_file(file_path)
+        # Extrai o texto do PDF (pool de processos, fora do event loop)
+        extracted_text, num_pages = await asyncio.to_thread(_extract_text_from_pdf_file, str(file_path))
         
-        logger.info(f"Extração de texto concluída ")
+        logger.info(f"Extração de texto concluída: {num_pages} páginas, {len(extracted_text)} caracteres")
         response = extracted_text
+        await salvar_extracao("pdf", sha256, response, model="PyPDF2", media_key=media_key)
         
     except Exception as e:
         logger.error(f"Erro ao processar PDF: {e}")
@@ -1,15 +1,20 @@
+import json
 import logging
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import shutil
 import subprocess
 import tempfile
 import time
+from typing import List, Optional, Tuple
 
 from decouple import config
 from openai import OpenAI
 
-from api.v1._shared.custom_schemas import TranscriptionResult
+from api.utils.metrics import observe_openai
+from api.v1._shared.custom_schemas import TranscriptionResult, TranscriptionSegment
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,6 +22,16 @@ logger = logging.getLogger(__name__)
 MODEL = "whisper-1" 
 LANGUAGE = "pt"
 OPENAI_API_KEY = config("OPENAI_API_KEY")
+TRANSCRIPTION_PROMPT = "Este é um áudio em português brasileiro. Transcreva com pontuação adequada e formatação correta."
+
+# Modo segmentado (áudios longos)
+AUDIO_SEGMENT_THRESHOLD_SECONDS = config("AUDIO_SEGMENT_THRESHOLD_SECONDS", default=120.0, cast=float)
+AUDIO_SEGMENT_MAX_SECONDS = config("AUDIO_SEGMENT_MAX_SECONDS", default=90.0, cast=float)
+AUDIO_SEGMENT_MIN_SECONDS = config("AUDIO_SEGMENT_MIN_SECONDS", default=20.0, cast=float)
+AUDIO_TRANSCRIBE_CONCURRENCY = config("AUDIO_TRANSCRIBE_CONCURRENCY", default=4, cast=int)
+AUDIO_SEGMENT_BITRATE = config("AUDIO_SEGMENT_BITRATE", default="24k")
+SILENCE_NOISE_DB = "-35dB"
+SILENCE_MIN_DURATION = 0.4
 
 def analyze_audio_quality(audio_path: str) -> dict:
     """
@@ -111,13 +126,15 @@ def check_ffmpeg_installation():
         """
         raise RuntimeError(f"Ferramentas não encontradas: {', '.join(missing_tools)}\n{install_instructions}")
 
-def transcribe_mp4_to_text(video_path: str) -> TranscriptionResult:
+def transcribe_mp4_to_text(video_path: str, segmented: Optional[bool] = None) -> TranscriptionResult:
     """
     Extrai o áudio de um MP4 e transcreve com OpenAI, retornando objeto com detalhes.
     Requer: OPENAI_API_KEY no ambiente e ffmpeg instalado no PATH.
     
     Args:
         video_path: Caminho para o arquivo MP4
+        segmented: Força (True) ou desliga (False) o modo segmentado; por padrão é
+            usado para áudios acima de AUDIO_SEGMENT_THRESHOLD_SECONDS
         
     Returns:
         TranscriptionResult: Objeto com texto, tokens utilizados, modelo e duração
@@ -129,6 +146,13 @@ def transcribe_mp4_to_text(video_path: str) -> TranscriptionResult:
     # Verifica se ferramentas estão instaladas
     check_ffmpeg_installation()
 
+    if segmented is None:
+        segmented = _probe_duration(video_path) > AUDIO_SEGMENT_THRESHOLD_SECONDS
+    if segmented:
+        return transcribe_segmented(video_path)
+
+    started_at = time.time()
+
     # Análise prévia da qualidade do áudio
     logger.info(f"Analisando qualidade do arquivo: {video_path}")
     audio_quality = analyze_audio_quality(video_path)
@@ -278,7 +302,7 @@ def transcribe_mp4_to_text(video_path: str) -> TranscriptionResult:
             logger.info("Iniciando transcrição otimizada com OpenAI Whisper...")
             transcription_start = time.time()
             
-            with open(audio_wav, "rb") as f:
+            with open(audio_wav, "rb") as f, observe_openai("transcribe", MODEL) as call:
                 result = client.audio.transcriptions.create(
                     model=MODEL,
                     file=f,
@@ -289,8 +313,9 @@ def transcribe_mp4_to_text(video_path: str) -> TranscriptionResult:
                     temperature=0.0,  # Determinístico (mais assertivo, menos criativo)
                     
                     # Prompt inicial para melhorar contexto (português brasileiro)
-                    prompt="Este é um áudio em português brasileiro. Transcreva com pontuação adequada e formatação correta."
+                    prompt=TRANSCRIPTION_PROMPT
                 )
+                call.record(result)
             
             transcription_time = time.time() - transcription_start
             
@@ -339,12 +364,24 @@ def transcribe_mp4_to_text(video_path: str) -> TranscriptionResult:
             logger.info(f"  - Duração otimizada: {final_duration:.2f}s")
             logger.info(f"  - Economia de custo: {cost_savings * 60:.1f}s ({cost_savings:.2f} minutos)")
             logger.info(f"  - Tokens estimados: {estimated_tokens}")
+
+            metrics = {
+                "mode": "single",
+                "extraction_s": round(extraction_time, 3),
+                "transcription_s": round(transcription_time, 3),
+                "total_s": round(time.time() - started_at, 3),
+                "audio_s": round(final_duration, 3),
+                "upload_bytes": audio_wav.stat().st_size,
+                "chunks": 1,
+            }
+            _log_metrics(metrics)
             
             return TranscriptionResult(
                 text=transcription_text,
                 tokens_used=estimated_tokens,
                 model_used=MODEL,
-                duration_seconds=final_duration  # Usar duração otimizada
+                duration_seconds=final_duration,  # Usar duração otimizada
+                metrics=metrics,
             )
             
     except subprocess.CalledProcessError as e:
@@ -356,6 +393,192 @@ def transcribe_mp4_to_text(video_path: str) -> TranscriptionResult:
         logger.error(error_msg)
         raise RuntimeError(error_msg)
 
+def _log_metrics(metrics: dict) -> None:
+    """Loga as métricas por etapa em uma linha JSON (fácil de agregar)."""
+    logger.info("audio_transcription_metrics %s", json.dumps(metrics, ensure_ascii=False))
+
+
+def _probe_duration(audio_path: Path) -> float:
+    """Duração do arquivo em segundos via ffprobe (0.0 se não for possível obter)."""
+    cmd = [
+        "ffprobe", "-v", "quiet",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        str(audio_path),
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.strip()
+        return float(out) if out else 0.0
+    except (subprocess.CalledProcessError, ValueError) as e:
+        logger.warning(f"Não foi possível obter duração do arquivo: {e}")
+        return 0.0
+
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+
+def _detect_silences(audio_path: Path) -> List[Tuple[float, float]]:
+    """Intervalos de silêncio (início, fim) detectados pelo filtro silencedetect do ffmpeg."""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats", "-i", str(audio_path), "-vn",
+        "-af", f"silencedetect=noise={SILENCE_NOISE_DB}:d={SILENCE_MIN_DURATION}",
+        "-f", "null", "-",
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    silences, start = [], None
+    for kind, value in _SILENCE_RE.findall(result.stderr):
+        if kind == "start":
+            start = max(0.0, float(value))
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    return silences
+
+
+def _plan_segments(duration: float, silences: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """
+    Define os cortes: cada trecho termina no último silêncio entre MIN e MAX segundos
+    a partir do seu início; sem silêncio na faixa, corta seco em MAX.
+    """
+    midpoints = [(a + b) / 2 for a, b in silences]
+    segments, start = [], 0.0
+    while duration - start > AUDIO_SEGMENT_MAX_SECONDS:
+        window = [m for m in midpoints if start + AUDIO_SEGMENT_MIN_SECONDS <= m <= start + AUDIO_SEGMENT_MAX_SECONDS]
+        cut = window[-1] if window else start + AUDIO_SEGMENT_MAX_SECONDS
+        segments.append((start, cut))
+        start = cut
+    segments.append((start, duration))
+    return segments
+
+
+def _encode_segment(source: Path, start: float, end: float, target_dir: Path, index: int) -> Path:
+    """Recorta e codifica o trecho em Opus mono de baixo bitrate (fallback: MP3)."""
+    base = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", str(source),
+            "-vn", "-ac", "1", "-ar", "16000"]
+    opus_path = target_dir / f"chunk_{index:03d}.ogg"
+    try:
+        subprocess.run(base + ["-c:a", "libopus", "-b:a", AUDIO_SEGMENT_BITRATE, "-application", "voip", str(opus_path)],
+                       capture_output=True, text=True, check=True)
+        return opus_path
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"Opus indisponível, usando MP3 no trecho {index}: {e.stderr}")
+        mp3_path = target_dir / f"chunk_{index:03d}.mp3"
+        subprocess.run(base + ["-c:a", "libmp3lame", "-b:a", "32k", str(mp3_path)],
+                       capture_output=True, text=True, check=True)
+        return mp3_path
+
+
+def _transcribe_segment(client: OpenAI, chunk_path: Path, offset: float) -> List[TranscriptionSegment]:
+    """Transcreve um trecho e desloca os tempos dos segmentos para a linha do tempo original."""
+    with open(chunk_path, "rb") as f, observe_openai("transcribe", MODEL) as call:
+        result = client.audio.transcriptions.create(
+            model=MODEL,
+            file=f,
+            language=LANGUAGE,
+            response_format="verbose_json",
+            temperature=0.0,
+            prompt=TRANSCRIPTION_PROMPT,
+        )
+        call.record(result)
+    segments = getattr(result, "segments", None) or []
+    if not segments:
+        text = (getattr(result, "text", "") or "").strip()
+        duration = float(getattr(result, "duration", 0.0) or 0.0)
+        return [TranscriptionSegment(start=offset, end=offset + duration, text=text)] if text else []
+    return [
+        TranscriptionSegment(
+            start=round(offset + float(seg.start), 2),
+            end=round(offset + float(seg.end), 2),
+            text=seg.text.strip(),
+        )
+        for seg in segments
+        if seg.text and seg.text.strip()
+    ]
+
+
+def transcribe_segmented(video_path: Path) -> TranscriptionResult:
+    """
+    Modo segmentado para áudios longos.
+
+    Corta o áudio nos silêncios em trechos de até AUDIO_SEGMENT_MAX_SECONDS, codifica cada
+    trecho em Opus de baixo bitrate (upload muito menor que o WAV PCM) e transcreve os
+    trechos em paralelo (AUDIO_TRANSCRIBE_CONCURRENCY). Os segmentos voltam costurados
+    com timestamps absolutos e as métricas de cada etapa vão em `metrics`.
+    """
+    started_at = time.time()
+    client = OpenAI(api_key=OPENAI_API_KEY)
+
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmp = Path(tmpdir)
+
+            probe_start = time.time()
+            duration = _probe_duration(video_path)
+            probe_time = time.time() - probe_start
+
+            silence_start = time.time()
+            silences = _detect_silences(video_path)
+            plan = _plan_segments(duration, silences)
+            silence_time = time.time() - silence_start
+            logger.info(f"Áudio de {duration:.1f}s dividido em {len(plan)} trechos ({len(silences)} silêncios detectados)")
+
+            encode_start = time.time()
+            with ThreadPoolExecutor(max_workers=AUDIO_TRANSCRIBE_CONCURRENCY) as pool:
+                chunks = list(pool.map(
+                    lambda item: _encode_segment(video_path, item[1][0], item[1][1], tmp, item[0]),
+                    enumerate(plan),
+                ))
+            encode_time = time.time() - encode_start
+            upload_bytes = sum(chunk.stat().st_size for chunk in chunks)
+
+            transcription_start = time.time()
+            with ThreadPoolExecutor(max_workers=AUDIO_TRANSCRIBE_CONCURRENCY) as pool:
+                results = list(pool.map(
+                    lambda item: _transcribe_segment(client, item[0], item[1][0]),
+                    zip(chunks, plan),
+                ))
+            transcription_time = time.time() - transcription_start
+
+        segments = [seg for chunk_segments in results for seg in chunk_segments]
+        transcription_text = " ".join(seg.text for seg in segments).strip()
+        estimated_tokens = int((duration / 60) * 175)  # 175 tokens por minuto
+        if not transcription_text:
+            logger.warning("Transcrição retornou texto vazio")
+            transcription_text = "[Áudio sem conteúdo de fala detectado]"
+            estimated_tokens = 0
+
+        metrics = {
+            "mode": "segmented",
+            "probe_s": round(probe_time, 3),
+            "silence_detect_s": round(silence_time, 3),
+            "encode_s": round(encode_time, 3),
+            "transcription_s": round(transcription_time, 3),
+            "total_s": round(time.time() - started_at, 3),
+            "audio_s": round(duration, 3),
+            "upload_bytes": upload_bytes,
+            "chunks": len(plan),
+        }
+        _log_metrics(metrics)
+
+        return TranscriptionResult(
+            text=transcription_text,
+            tokens_used=estimated_tokens,
+            model_used=MODEL,
+            duration_seconds=duration,
+            segments=segments,
+            metrics=metrics,
+        )
+
+    except subprocess.CalledProcessError as e:
+        error_msg = f"Erro no FFmpeg: {e.stderr if e.stderr else str(e)}"
+        logger.error(error_msg)
+        raise RuntimeError(error_msg)
+    except Exception as e:
+        error_msg = f"Erro inesperado na transcrição segmentada: {str(e)}"
+        logger.error(error_msg)
+        raise RuntimeError(error_msg)
+
 def test_ffmpeg_installation():
     """
     Testa se FFmpeg está instalado e funcionando corretamente.
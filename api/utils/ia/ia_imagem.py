@@ -1,15 +1,46 @@
+import asyncio
 import base64
 import logging
 import os
+from typing import List, Tuple
 
 from decouple import config
 from openai import OpenAI
 
+from api.utils.ia.preprocessamento_imagem import ImagemPreparada, preparar_imagem
+from api.utils.metrics import observe_openai
+
 OPENAI_API_KEY = config("OPENAI_API_KEY")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+VISION_MODEL = "gpt-4o"
+
+
+def _partes_da_imagem(image_path: str) -> Tuple[List[str], str, ImagemPreparada | None]:
+    """
+    Partes em base64 a enviar e o `detail` escolhido.
+
+    Se a imagem não puder ser decodificada pelo Pillow, envia o arquivo original (detail=high).
+    """
+    try:
+        preparada = preparar_imagem(image_path)
+    except Exception as e:
+        logger.warning(f"Pré-processamento da imagem falhou, enviando original: {e}")
+        with open(image_path, "rb") as image_file:
+            return [base64.b64encode(image_file.read()).decode('utf-8')], "high", None
+
+    logger.info(
+        f"Imagem preparada: {preparada.bytes_antes / 1024:.1f} KB -> {preparada.bytes_depois / 1024:.1f} KB, "
+        f"~{preparada.tokens_antes} -> ~{preparada.tokens_depois} tokens de imagem, "
+        f"{preparada.dimensoes_antes} -> {preparada.dimensoes_depois}, "
+        f"detail={preparada.detail} (densidade de texto {preparada.densidade_texto})"
+    )
+    partes = [base64.b64encode(parte).decode('utf-8') for parte in preparada.partes]
+    return partes, preparada.detail, preparada
+
+
 async def process_image_with_vision(image_path: str, caption: str = "") -> str:
     """
     Processa imagem usando OpenAI Vision para extrair texto.
@@ -21,12 +52,22 @@ async def process_image_with_vision(image_path: str, caption: str = "") -> str:
     Returns:
         str: Texto extraído da imagem
     """
+    extracted_text, _ = await process_image_with_vision_usage(image_path, caption)
+    return extracted_text
+
+
+async def process_image_with_vision_usage(image_path: str, caption: str = "") -> Tuple[str, int]:
+    """
+    Igual a `process_image_with_vision`, mas devolve também os tokens consumidos.
+
+    Returns:
+        tuple: (texto_extraido, tokens_utilizados)
+    """
     client = OpenAI(api_key=OPENAI_API_KEY)
     
     try:
-        # Lê a imagem e converte para base64
-        with open(image_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode('utf-8')
+        # Decodifica, orienta, reduz (e fatia, se preciso) fora do event loop
+        partes, detail, preparada = await asyncio.to_thread(_partes_da_imagem, image_path)
         
         # Constrói o prompt otimizado para extração de texto
         system_prompt = """#Instruções 
@@ -64,13 +105,17 @@ Analise a imagem e extraia TODO o texto visível seguindo as instruções."""
                         "type": "text",
                         "text": user_prompt
                     },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{image_data}",
-                            "detail": "high"  # Usar alta resolução para melhor extração de texto
+                    # Fatias (quando houver) vão em ordem de leitura
+                    *[
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{image_data}",
+                                "detail": detail  # high para imagens com texto, low para fotos
+                            }
                         }
-                    }
+                        for image_data in partes
+                    ]
                 ]
             }
         ]
@@ -78,29 +123,39 @@ Analise a imagem e extraia TODO o texto visível seguindo as instruções."""
         logger.info("Iniciando extração de texto com OpenAI Vision...")
         
         # Faz a chamada para a API
-        response = client.chat.completions.create(
-            model="gpt-4o",  # Modelo otimizado para visão e texto
-            messages=messages,
-            max_tokens=4000,  # Permite respostas longas para textos extensos
-            temperature=0.0   # Determinístico para maior precisão
-        )
+        with observe_openai("vision", VISION_MODEL) as call:
+            response = client.chat.completions.create(
+                model=VISION_MODEL,  # Modelo otimizado para visão e texto
+                messages=messages,
+                max_tokens=4000,  # Permite respostas longas para textos extensos
+                temperature=0.0   # Determinístico para maior precisão
+            )
+            call.record(response)
         
         extracted_text = response.choices[0].message.content.strip()
         
         # Estima tokens utilizados (aproximação baseada no tamanho da imagem e resposta)
-        image_size = os.path.getsize(image_path)
+        image_size = preparada.bytes_depois if preparada else os.path.getsize(image_path)
         estimated_tokens = int((image_size / 1024) * 0.75) + len(extracted_text.split()) * 1.3
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            estimated_tokens = usage.total_tokens
         
         logger.info(f"Extração concluída:")
         logger.info(f"  - Texto extraído: {len(extracted_text)} caracteres")
         logger.info(f"  - Palavras: {len(extracted_text.split())} palavras")
         logger.info(f"  - Tokens estimados: {int(estimated_tokens)}")
-        logger.info(f"  - Tamanho da imagem: {image_size / 1024:.1f} KB")
+        logger.info(f"  - Tamanho da imagem enviada: {image_size / 1024:.1f} KB")
+        if usage is not None and preparada:
+            logger.info(
+                f"  - Tokens de entrada: {usage.prompt_tokens} "
+                f"(imagem original custaria ~{preparada.tokens_antes} só de imagem)"
+            )
         
         if caption:
             logger.info(f"  - Caption utilizada como contexto: {caption[:100]}...")
         
-        return extracted_text
+        return extracted_text, int(estimated_tokens)
         
     except Exception as e:
         logger.error(f"Erro na API OpenAI Vision: {e}")
@@ -4,7 +4,6 @@ from typing import Any, Dict, List
 
 from decouple import config
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.callbacks import BaseCallbackHandler
 from langchain_openai import ChatOpenAI
 
 from api.v1._shared.custom_schemas import MensagemRetornoLLM
@@ -130,33 +129,56 @@ def _dividir_em_paragrafos(texto: str) -> List[str]:
     return paragrafos_limpos if paragrafos_limpos else [texto]
 
 
-class TokenCountingHandler(BaseCallbackHandler):
+def _extrair_tokens(resp: Any) -> tuple[int, int]:
     """
-    Callback handler para capturar os tokens reais consumidos pela OpenAI.
+    Lê os tokens reais da própria resposta da LLM (por invocação, sem estado compartilhado).
+
+    Usa `usage_metadata` do AIMessage e, como fallback, `response_metadata["token_usage"]`.
     """
-    def __init__(self):
-        self.prompt_tokens = 0
-        self.completion_tokens = 0
-        self.total_tokens = 0
-    
-    def on_llm_end(self, response, **kwargs):
-        """Captura os tokens do response da LLM"""
-        if hasattr(response, 'llm_output') and response.llm_output:
-            token_usage = response.llm_output.get('token_usage', {})
-            self.prompt_tokens = token_usage.get('prompt_tokens', 0)
-            self.completion_tokens = token_usage.get('completion_tokens', 0)
-            self.total_tokens = token_usage.get('total_tokens', 0)
-    
-    def reset(self):
-        """Reset dos contadores para nova invocação"""
-        self.prompt_tokens = 0
-        self.completion_tokens = 0
-        self.total_tokens = 0
+    usage = getattr(resp, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    metadata = getattr(resp, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+def _montar_retorno(resp: Any) -> MensagemRetornoLLM:
+    """Converte a resposta da chain em MensagemRetornoLLM (parágrafos + tokens + ligação)."""
+    resposta_completa = resp.content if hasattr(resp, "content") else str(resp)
+
+    # Extrair mensagem e análise de ligação da resposta estruturada
+    mensagem_texto, permitiu_ligacao = _extrair_resposta_estruturada(resposta_completa)
+
+    # Tokens reais desta invocação
+    tokens_in_real, tokens_out_real = _extrair_tokens(resp)
+
+    # Dividir resposta em parágrafos (usar apenas o texto da mensagem)
+    paragrafos = _dividir_em_paragrafos(mensagem_texto)
+
+    return MensagemRetornoLLM(
+        respostas=paragrafos,
+        tokens_in=tokens_in_real,
+        tokens_out=tokens_out_real,
+        permitiu_ligacao=permitiu_ligacao
+    )
+
+
+def _montar_entrada(telefone: str, mensagem: str, memoria_resumida: str | None) -> Dict[str, Any]:
+    return {
+        "telefone": telefone,
+        "mensagem": mensagem,
+        "memoria_resumida": memoria_resumida or "(vazio)",
+    }
 
 
 class Agent:
     """
     Camada LLMChain mínima, focada em baixo custo.
+
+    A chain (prompt | llm) é montada uma única vez no __init__ e a contagem de tokens
+    vem de cada resposta, então a mesma instância pode ser usada por várias
+    invocações concorrentes (run, arun, abatch) sem misturar contadores.
     """
     def __init__(self, temperature: float = DEFAULT_TEMPERATURE):
         api_key = config("OPENAI_API_KEY")
@@ -175,7 +197,7 @@ class Agent:
                 ("user", USER_FRAME),
             ]
         )
-        self.token_handler = TokenCountingHandler()
+        self.chain = self.prompt | self.llm
 
     def run(
         self,
@@ -183,51 +205,40 @@ class Agent:
         mensagem: str,
         memoria_resumida: str | None,
     ) -> MensagemRetornoLLM:
-        mem = memoria_resumida or "(vazio)"
+        resp = self.chain.invoke(_montar_entrada(telefone, mensagem, memoria_resumida))
+        return _montar_retorno(resp)
 
-        # Reset do handler para nova invocação
-        self.token_handler.reset()
+    async def arun(
+        self,
+        telefone: str,
+        mensagem: str,
+        memoria_resumida: str | None,
+    ) -> MensagemRetornoLLM:
+        """Versão assíncrona de `run` (não bloqueia o event loop)."""
+        resp = await self.chain.ainvoke(_montar_entrada(telefone, mensagem, memoria_resumida))
+        return _montar_retorno(resp)
 
-        chain = self.prompt | self.llm  # retorna texto
-        
-        # Invoca com callback handler para capturar tokens reais
-        resp = chain.invoke(
-            {
-                "telefone": telefone,
-                "mensagem": mensagem,
-                "memoria_resumida": mem,
-            },
-            config={"callbacks": [self.token_handler]}
-        )
-        resposta_completa = resp.content if hasattr(resp, "content") else str(resp)
-        
-        # Extrair mensagem e análise de ligação da resposta estruturada
-        mensagem_texto, permitiu_ligacao = _extrair_resposta_estruturada(resposta_completa)
-        
-        # Usar tokens reais capturados pelo handler
-        tokens_in_real = self.token_handler.prompt_tokens
-        tokens_out_real = self.token_handler.completion_tokens
-        
-        # Fallback para contagem aproximada se não conseguir capturar tokens reais
-        #if tokens_in_real == 0 and tokens_out_real == 0:
-        #    # Preparar input para contagem de tokens aproximada (fallback)
-        #    input_text = f"{SYSTEM_PROMPT}\n{USER_FRAME}".format(
-        #        telefone=telefone,
-        #        mensagem=mensagem,
-        #        memoria_resumida=mem,
-        #    )
-        #    tokens_in_real = _contar_tokens_aproximado(input_text)
-        #    tokens_out_real = _contar_tokens_aproximado(resposta_texto)
-
-        # Dividir resposta em parágrafos (usar apenas o texto da mensagem)
-        paragrafos = _dividir_em_paragrafos(mensagem_texto)
-        
-        return MensagemRetornoLLM(
-            respostas=paragrafos,
-            tokens_in=tokens_in_real,
-            tokens_out=tokens_out_real,
-            permitiu_ligacao=permitiu_ligacao
-        )
+    async def abatch(
+        self,
+        entradas: List[Dict[str, Any]],
+        max_concurrency: int = 5,
+    ) -> List[MensagemRetornoLLM]:
+        """
+        Executa várias conversas em paralelo (limitado por `max_concurrency`).
+
+        Args:
+            entradas: Lista de dicts com "telefone", "mensagem" e "memoria_resumida"
+            max_concurrency: Número máximo de chamadas simultâneas à OpenAI
+
+        Returns:
+            Resultados na mesma ordem das entradas
+        """
+        payloads = [
+            _montar_entrada(e["telefone"], e["mensagem"], e.get("memoria_resumida"))
+            for e in entradas
+        ]
+        respostas = await self.chain.abatch(payloads, config={"max_concurrency": max_concurrency})
+        return [_montar_retorno(resp) for resp in respostas]
 
 # ------------- Exemplo de uso integrado -------------
 # from postgres_db import PostgresDB  # sua classe
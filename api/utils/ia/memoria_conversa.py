@@ -0,0 +1,171 @@
+"""
+Memória de conversa por telefone (Redis) para o Agent.
+
+Estrutura:
+    memoria:{telefone}:turnos  -> lista JSON [{"role": "user"|"assistant", "content": "..."}]
+    memoria:{telefone}:resumo  -> resumo acumulado dos turnos antigos
+
+Os últimos MEMORIA_TURNOS_RECENTES turnos ficam literais; quando a lista passa
+disso, `resumir_memoria_task` (fora do caminho da resposta) dobra os turnos
+excedentes no resumo. `montar_memoria` devolve o texto para `memoria_resumida`
+respeitando o teto MEMORIA_MAX_TOKENS, então a entrada do Agent.run tem tamanho
+constante independentemente do tamanho da conversa.
+"""
+import json
+from typing import Dict, List, Optional
+
+from decouple import config
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+
+from api.utils.redis_db import get_redis_client
+from api.utils.settings import settings
+
+MEMORIA_PREFIX = "memoria:"
+LOCK_RESUMO_PREFIX = "lock:memoria:"
+RESUMO_MODEL_NAME = "gpt-4o-mini"
+
+ROTULOS = {"user": "Usuário", "assistant": "Fgenia"}
+
+RESUMO_PROMPT = """Você mantém a memória de uma conversa de WhatsApp entre a Fgenia e um professor.
+Atualize o resumo abaixo incorporando os novos turnos. Guarde apenas fatos úteis:
+nome, etapa/disciplinas, rotina, dores, interesse, objeções, pedidos e o que já foi perguntado.
+Português, tópicos curtos, no máximo {max_palavras} palavras.
+
+Resumo atual:
+{resumo}
+
+Novos turnos:
+{turnos}
+"""
+
+
+def _turnos_key(telefone: str) -> str:
+    return f"{MEMORIA_PREFIX}{telefone}:turnos"
+
+
+def _resumo_key(telefone: str) -> str:
+    return f"{MEMORIA_PREFIX}{telefone}:resumo"
+
+
+def _contar_tokens(texto: str) -> int:
+    """Estimativa de ~4 caracteres por token (mesma regra do llm_agent)."""
+    return len(texto) // 4
+
+
+def _formatar_turnos(turnos: List[Dict[str, str]]) -> str:
+    return "\n".join(f"{ROTULOS.get(t['role'], t['role'])}: {t['content']}" for t in turnos)
+
+
+def registrar_turno(telefone: str, role: str, conteudo: str) -> bool:
+    """
+    Acrescenta um turno à memória do telefone.
+
+    Returns:
+        True se a lista passou de MEMORIA_TURNOS_RECENTES e precisa ser resumida
+    """
+    client = get_redis_client()
+    if client is None:
+        return False
+
+    pipe = client.pipeline(transaction=True)
+    pipe.rpush(_turnos_key(telefone), json.dumps({"role": role, "content": conteudo}, ensure_ascii=False))
+    pipe.expire(_turnos_key(telefone), settings.MEMORIA_TTL_SECONDS)
+    pipe.expire(_resumo_key(telefone), settings.MEMORIA_TTL_SECONDS)
+    tamanho, _, _ = pipe.execute()
+    return tamanho > settings.MEMORIA_TURNOS_RECENTES
+
+
+def montar_memoria(telefone: str) -> Optional[str]:
+    """
+    Monta o texto de `memoria_resumida` (resumo + turnos recentes) dentro do orçamento de tokens.
+
+    Se o orçamento estourar, os turnos mais antigos saem primeiro; o resumo é cortado por último.
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+
+    pipe = client.pipeline(transaction=False)
+    pipe.get(_resumo_key(telefone))
+    pipe.lrange(_turnos_key(telefone), -settings.MEMORIA_TURNOS_RECENTES, -1)
+    resumo, brutos = pipe.execute()
+
+    turnos = [json.loads(item) for item in brutos or []]
+    if not resumo and not turnos:
+        return None
+
+    orcamento = settings.MEMORIA_MAX_TOKENS
+    resumo = (resumo or "")[: settings.MEMORIA_RESUMO_MAX_TOKENS * 4]
+    orcamento -= _contar_tokens(resumo)
+
+    recentes: List[str] = []
+    for turno in reversed(turnos):
+        linha = _formatar_turnos([turno])
+        custo = _contar_tokens(linha)
+        if custo > orcamento:
+            break
+        recentes.append(linha)
+        orcamento -= custo
+    recentes.reverse()
+
+    partes = []
+    if resumo:
+        partes.append(f"Resumo: {resumo}")
+    if recentes:
+        partes.append("Últimas mensagens:\n" + "\n".join(recentes))
+    return "\n".join(partes)
+
+
+def compactar_memoria(telefone: str) -> int:
+    """
+    Dobra no resumo os turnos além dos MEMORIA_TURNOS_RECENTES mais novos.
+
+    Executado pela task `resumir_memoria_task`, com lock por telefone. Remove da lista
+    exatamente os turnos resumidos (LTRIM), então turnos que chegarem no meio do caminho
+    não se perdem.
+
+    Returns:
+        Quantidade de turnos incorporados ao resumo
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+
+    lock = client.lock(LOCK_RESUMO_PREFIX + telefone, timeout=120, blocking=False)
+    if not lock.acquire():
+        return 0
+
+    try:
+        tamanho = client.llen(_turnos_key(telefone))
+        excedentes = tamanho - settings.MEMORIA_TURNOS_RECENTES
+        if excedentes <= 0:
+            return 0
+
+        antigos = [json.loads(item) for item in client.lrange(_turnos_key(telefone), 0, excedentes - 1)]
+        resumo_atual = client.get(_resumo_key(telefone)) or "(vazio)"
+
+        llm = ChatOpenAI(
+            model=RESUMO_MODEL_NAME,
+            temperature=0,
+            max_tokens=settings.MEMORIA_RESUMO_MAX_TOKENS,
+            api_key=config("OPENAI_API_KEY"),
+        )
+        chain = ChatPromptTemplate.from_messages([("user", RESUMO_PROMPT)]) | llm
+        resp = chain.invoke({
+            "resumo": resumo_atual,
+            "turnos": _formatar_turnos(antigos),
+            "max_palavras": int(settings.MEMORIA_RESUMO_MAX_TOKENS * 0.7),
+        })
+        novo_resumo = (resp.content if hasattr(resp, "content") else str(resp)).strip()
+
+        pipe = client.pipeline(transaction=True)
+        pipe.set(_resumo_key(telefone), novo_resumo, ex=settings.MEMORIA_TTL_SECONDS)
+        pipe.ltrim(_turnos_key(telefone), len(antigos), -1)
+        pipe.execute()
+        return len(antigos)
+    finally:
+        try:
+            lock.release()
+        except Exception:
+            pass
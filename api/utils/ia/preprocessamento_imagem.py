@@ -0,0 +1,166 @@
+"""
+Pré-processamento de imagens antes do OpenAI Vision.
+
+Fotos de celular (12 MP+) eram enviadas cruas: upload de megabytes e o máximo de
+tokens de visão, embora o modelo reduza a imagem internamente. Aqui a imagem é:
+
+- decodificada e orientada pelo EXIF (e o EXIF descartado na recodificação)
+- reduzida à resolução efetiva do modelo (cabe em 2048x2048, lado menor <= 768)
+- classificada pela densidade de texto (bordas) para escolher `detail` low/high
+- opcionalmente fatiada (imagens altas e cheias de texto, como prints de conversa),
+  para que cada fatia chegue legível ao modelo
+
+O resultado traz bytes e tokens estimados antes e depois, para log/métricas.
+"""
+import io
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from decouple import config
+from PIL import Image, ImageFilter, ImageOps, ImageStat
+
+logger = logging.getLogger(__name__)
+
+# Limites de resolução efetiva do modelo (detail=high)
+VISION_MAX_SIDE = 2048
+VISION_SHORT_SIDE = 768
+VISION_TILE_SIZE = 512
+VISION_BASE_TOKENS = 85
+VISION_TILE_TOKENS = 170
+
+VISION_JPEG_QUALITY = config("VISION_JPEG_QUALITY", default=85, cast=int)
+VISION_TEXT_DENSITY_LOW = config("VISION_TEXT_DENSITY_LOW", default=0.04, cast=float)
+VISION_TILING_ENABLED = config("VISION_TILING_ENABLED", default=True, cast=bool)
+VISION_TILING_MIN_ASPECT = config("VISION_TILING_MIN_ASPECT", default=2.5, cast=float)
+VISION_TILING_MAX_TILES = config("VISION_TILING_MAX_TILES", default=4, cast=int)
+TILE_OVERLAP = 0.05
+DENSITY_SAMPLE_SIDE = 256
+EDGE_THRESHOLD = 48
+
+
+@dataclass
+class ImagemPreparada:
+    """Imagem pronta para o Vision (uma ou mais partes JPEG) e o relatório da redução."""
+    partes: List[bytes]
+    detail: str
+    densidade_texto: float
+    bytes_antes: int
+    bytes_depois: int
+    tokens_antes: int
+    tokens_depois: int
+    dimensoes_antes: Tuple[int, int] = (0, 0)
+    dimensoes_depois: List[Tuple[int, int]] = field(default_factory=list)
+
+
+def estimar_tokens_vision(largura: int, altura: int, detail: str = "high") -> int:
+    """
+    Tokens de entrada cobrados por uma imagem (regra publicada da OpenAI para gpt-4o).
+
+    low: valor fixo; high: a imagem é ajustada a 2048x2048, depois o lado menor a 768,
+    e cada bloco de 512x512 custa VISION_TILE_TOKENS.
+    """
+    if detail == "low":
+        return VISION_BASE_TOKENS
+    largura, altura = _dimensoes_efetivas(largura, altura)
+    blocos = math.ceil(largura / VISION_TILE_SIZE) * math.ceil(altura / VISION_TILE_SIZE)
+    return VISION_BASE_TOKENS + VISION_TILE_TOKENS * blocos
+
+
+def _dimensoes_efetivas(largura: int, altura: int) -> Tuple[int, int]:
+    """Dimensões que o modelo realmente enxerga (nunca amplia)."""
+    escala = min(1.0, VISION_MAX_SIDE / max(largura, altura))
+    largura, altura = largura * escala, altura * escala
+    escala = min(1.0, VISION_SHORT_SIDE / min(largura, altura))
+    return max(1, round(largura * escala)), max(1, round(altura * escala))
+
+
+def densidade_texto(imagem: Image.Image) -> float:
+    """
+    Fração de pixels de borda forte numa miniatura em tons de cinza.
+
+    Texto gera muitas bordas finas; fotos sem texto ficam bem abaixo de VISION_TEXT_DENSITY_LOW.
+    """
+    amostra = imagem.convert("L")
+    amostra.thumbnail((DENSITY_SAMPLE_SIDE, DENSITY_SAMPLE_SIDE))
+    bordas = amostra.filter(ImageFilter.FIND_EDGES).point(lambda p: 255 if p > EDGE_THRESHOLD else 0)
+    return ImageStat.Stat(bordas).mean[0] / 255
+
+
+def _reduzir(imagem: Image.Image) -> Image.Image:
+    largura, altura = _dimensoes_efetivas(*imagem.size)
+    if (largura, altura) == imagem.size:
+        return imagem
+    return imagem.resize((largura, altura), Image.LANCZOS)
+
+
+def _codificar(imagem: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    # Recodificar sem `exif=` descarta os metadados (GPS, câmera etc.)
+    imagem.save(buffer, format="JPEG", quality=VISION_JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def _fatiar(imagem: Image.Image) -> List[Image.Image]:
+    """Fatias na direção do lado maior, com leve sobreposição para não cortar linhas."""
+    largura, altura = imagem.size
+    vertical = altura >= largura
+    lado_maior, lado_menor = (altura, largura) if vertical else (largura, altura)
+    quantidade = min(VISION_TILING_MAX_TILES, math.ceil(lado_maior / (lado_menor * 2)))
+    if quantidade <= 1:
+        return [imagem]
+
+    passo = lado_maior / quantidade
+    margem = int(passo * TILE_OVERLAP)
+    fatias = []
+    for i in range(quantidade):
+        inicio = max(0, int(i * passo) - margem)
+        fim = min(lado_maior, int((i + 1) * passo) + margem)
+        caixa = (0, inicio, largura, fim) if vertical else (inicio, 0, fim, altura)
+        fatias.append(imagem.crop(caixa))
+    return fatias
+
+
+def preparar_imagem(image_path: str) -> ImagemPreparada:
+    """
+    Decodifica, orienta, remove EXIF, reduz e (se for o caso) fatia a imagem.
+
+    Args:
+        image_path: Caminho do arquivo original
+
+    Returns:
+        ImagemPreparada com as partes JPEG, o `detail` escolhido e o relatório antes/depois
+    """
+    with open(image_path, "rb") as f:
+        original = f.read()
+
+    with Image.open(io.BytesIO(original)) as bruta:
+        imagem = ImageOps.exif_transpose(bruta)
+        imagem = imagem.convert("RGB")
+
+    dimensoes_antes = imagem.size
+    densidade = densidade_texto(imagem)
+    detail = "low" if densidade < VISION_TEXT_DENSITY_LOW else "high"
+
+    largura, altura = imagem.size
+    aspecto = max(largura, altura) / min(largura, altura)
+    if VISION_TILING_ENABLED and detail == "high" and aspecto >= VISION_TILING_MIN_ASPECT:
+        fatias = _fatiar(imagem)
+    else:
+        fatias = [imagem]
+
+    reduzidas = [_reduzir(fatia) for fatia in fatias]
+    partes = [_codificar(fatia) for fatia in reduzidas]
+
+    return ImagemPreparada(
+        partes=partes,
+        detail=detail,
+        densidade_texto=round(densidade, 4),
+        bytes_antes=len(original),
+        bytes_depois=sum(len(parte) for parte in partes),
+        tokens_antes=estimar_tokens_vision(*dimensoes_antes, detail="high"),
+        tokens_depois=sum(estimar_tokens_vision(*fatia.size, detail=detail) for fatia in reduzidas),
+        dimensoes_antes=dimensoes_antes,
+        dimensoes_depois=[fatia.size for fatia in reduzidas],
+    )
@@ -0,0 +1,123 @@
+"""
+Limitador de tentativas de login (por conta e por IP) no Redis.
+
+Cada tentativa é RESERVADA antes do bcrypt: um script Lua incrementa os
+contadores da conta e do IP numa única operação atômica e recusa (429) quando
+algum passa do limite. Assim, uma rajada de requisições concorrentes não passa
+toda pela verificação antes de a primeira falha ser contada. A reserva vira a
+falha registrada; em caso de sucesso o contador da conta é zerado e a tentativa
+do IP devolvida.
+
+Se o Redis estiver indisponível o limitador libera a tentativa (fail-open) para
+não derrubar o login; o pool de hash continua protegido pelo limite de hashes
+em andamento (ver security.PASSWORD_HASH_MAX_IN_FLIGHT).
+"""
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+
+from api.utils.redis_db import get_async_redis_client
+from api.utils.settings import settings
+
+LOGIN_ACCOUNT_PREFIX = "login_attempts:conta:"
+LOGIN_IP_PREFIX = "login_attempts:ip:"
+
+# KEYS: contadores; ARGV[1]: janela (s); ARGV[i + 1]: limite de KEYS[i].
+# Retorna {bloqueado, ttl}; quando bloqueado a reserva é desfeita.
+_RESERVE_SCRIPT = """
+local bloqueado = 0
+local ttl = 0
+for i, key in ipairs(KEYS) do
+    local tentativas = redis.call('INCR', key)
+    if tentativas == 1 then
+        redis.call('EXPIRE', key, ARGV[1])
+    end
+    if tentativas > tonumber(ARGV[i + 1]) then
+        bloqueado = 1
+        local restante = redis.call('TTL', key)
+        if restante > ttl then
+            ttl = restante
+        end
+    end
+end
+if bloqueado == 1 then
+    for _, key in ipairs(KEYS) do
+        redis.call('DECR', key)
+    end
+end
+return {bloqueado, ttl}
+"""
+
+
+def _account_key(email: str) -> str:
+    return LOGIN_ACCOUNT_PREFIX + email.strip().lower()
+
+
+def _ip_key(ip: str) -> str:
+    return LOGIN_IP_PREFIX + ip
+
+
+def _keys(email: str, ip: Optional[str]) -> List[str]:
+    keys = [_account_key(email)]
+    if ip:
+        keys.append(_ip_key(ip))
+    return keys
+
+
+async def reserve_login_attempt(email: str, ip: Optional[str] = None) -> None:
+    """
+    Reserva uma tentativa para a conta e o IP (chamar antes de qualquer hash).
+
+    Raises:
+        HTTPException: 429 com Retry-After quando a conta ou o IP estão no limite
+    """
+    client = get_async_redis_client()
+    if client is None:
+        return
+
+    keys = _keys(email, ip)
+    limits = [settings.LOGIN_MAX_ATTEMPTS_PER_ACCOUNT, settings.LOGIN_MAX_ATTEMPTS_PER_IP][:len(keys)]
+    try:
+        bloqueado, ttl = await client.eval(
+            _RESERVE_SCRIPT, len(keys), *keys, settings.LOGIN_ATTEMPT_WINDOW_SECONDS, *limits
+        )
+    except Exception as e:
+        print(f"❌ Erro ao reservar tentativa de login: {e}")
+        return
+
+    if int(bloqueado):
+        retry_after = int(ttl) if ttl and int(ttl) > 0 else settings.LOGIN_ATTEMPT_WINDOW_SECONDS
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login. Tente novamente mais tarde.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+async def cancel_login_attempt(email: str, ip: Optional[str] = None) -> None:
+    """Devolve a tentativa reservada (ex.: o hash foi recusado por sobrecarga, não pela senha)."""
+    client = get_async_redis_client()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=True)
+        for key in _keys(email, ip):
+            pipe.decr(key)
+        await pipe.execute()
+    except Exception as e:
+        print(f"❌ Erro ao devolver tentativa de login: {e}")
+
+
+async def reset_login_failures(email: str, ip: Optional[str] = None) -> None:
+    """Após um login bem-sucedido: zera o contador da conta e devolve a tentativa do IP."""
+    client = get_async_redis_client()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(_account_key(email))
+        if ip:
+            pipe.decr(_ip_key(ip))
+        await pipe.execute()
+    except Exception as e:
+        print(f"❌ Erro ao zerar tentativas de login: {e}")
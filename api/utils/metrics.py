@@ -0,0 +1,376 @@
+"""
+Métricas Prometheus da API e dos workers Celery.
+
+Rodamos vários processos (workers do uvicorn, filhos prefork do Celery), então as
+métricas usam o modo multiprocesso do prometheus_client: com
+PROMETHEUS_MULTIPROC_DIR definido, cada processo grava seus valores em arquivos
+nesse diretório e quem expõe as métricas agrega todos (MultiProcessCollector).
+
+- A variável precisa estar no ambiente ANTES do primeiro import de prometheus_client
+  e o diretório deve ser esvaziado a cada start do container (ver entrypoints).
+- Sem a variável (desenvolvimento), usa o registry do próprio processo.
+
+API: `/metrics` (main.py). Celery: servidor HTTP no processo principal do worker
+(CELERY_METRICS_PORT), agregando os filhos do prefork.
+
+Instrumentação:
+    - MetricsMiddleware: latência por rota e nº de queries por requisição
+    - install_db_metrics(engine): latência de cada statement
+    - observe_openai(purpose, model): latência, tokens e erros das chamadas OpenAI
+    - observe_chrome_launch() / observe_page_load(): Selenium
+    - install_celery_metrics(): duração das tasks; profundidade das filas no scrape
+    - record_cache(cache, hit): taxa de acerto dos caches
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional, Tuple
+
+from api.utils.settings import settings
+from api.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+_multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if _multiproc_dir:
+    os.makedirs(_multiproc_dir, exist_ok=True)
+
+from prometheus_client import (  # noqa: E402 - depende do diretório acima
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from starlette.types import ASGIApp, Message, Receive, Scope, Send  # noqa: E402
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP por rota",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Statements SQL executados por requisição",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Latência dos statements SQL por operação",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+OPENAI_REQUEST_DURATION = Histogram(
+    "openai_request_duration_seconds",
+    "Latência das chamadas à OpenAI por finalidade",
+    ["purpose", "model"],
+    buckets=SLOW_BUCKETS,
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens",
+    "Tokens consumidos na OpenAI por finalidade",
+    ["purpose", "model", "kind"],
+)
+OPENAI_ERRORS = Counter(
+    "openai_errors",
+    "Erros nas chamadas à OpenAI por finalidade",
+    ["purpose", "error"],
+)
+CHROME_LAUNCH_DURATION = Histogram(
+    "chrome_launch_duration_seconds",
+    "Tempo para subir o Chrome headless (webdriver)",
+    buckets=SLOW_BUCKETS,
+)
+CHROME_PAGE_LOAD_DURATION = Histogram(
+    "chrome_page_load_duration_seconds",
+    "Tempo de navegação + render de uma página no Chrome",
+    ["timed_out"],
+    buckets=SLOW_BUCKETS,
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Duração das tasks do Celery",
+    ["task", "state"],
+    buckets=SLOW_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Consultas aos caches (hit/miss)",
+    ["cache", "result"],
+)
+
+
+# ---------------------------------------------------------------------------
+# Registry / exposição
+# ---------------------------------------------------------------------------
+
+def _new_registry() -> CollectorRegistry:
+    """Registry que agrega todos os processos (ou o do processo, sem multiprocesso)."""
+    if not _multiproc_dir:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+_api_registry: Optional[CollectorRegistry] = None
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """
+    Conteúdo do /metrics da API: métricas de todos os processos + profundidade das filas.
+
+    Returns:
+        (corpo, content-type)
+    """
+    global _api_registry
+    if _api_registry is None:
+        registry = _new_registry()
+        registry.register(CeleryQueueCollector())
+        _api_registry = registry
+    return generate_latest(_api_registry), CONTENT_TYPE_LATEST
+
+
+# ---------------------------------------------------------------------------
+# HTTP + queries por requisição
+# ---------------------------------------------------------------------------
+
+_request_queries: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: latência por rota (template, não a URL) e queries por requisição.
+
+    Requisições que não casam com nenhuma rota entram como "unmatched", para não
+    explodir a cardinalidade com URLs arbitrárias.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        queries = [0]
+        token = _request_queries.set(queries)
+        inicio = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duracao = time.perf_counter() - inicio
+            _request_queries.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(scope["method"], route_path, str(status_code)).observe(duracao)
+            DB_QUERIES_PER_REQUEST.labels(route_path).observe(queries[0])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_metrics_started_at", None)
+    if inicio is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    DB_QUERY_DURATION.labels(operation[:16]).observe(time.perf_counter() - inicio)
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+def install_db_metrics(engine: Engine) -> None:
+    """Registra a medição de latência/contagem de statements no engine."""
+    if not settings.METRICS_ENABLED:
+        return
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------------------------------------------------------
+# OpenAI
+# ---------------------------------------------------------------------------
+
+class _OpenAICall:
+    def __init__(self, purpose: str, model: str, trace_span=None):
+        self.purpose = purpose
+        self.model = model
+        self.span = trace_span
+
+    def record(self, response) -> None:
+        """Registra os tokens informados em `response.usage` (quando houver)."""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        for kind in ("prompt_tokens", "completion_tokens", "input_tokens", "output_tokens", "total_tokens"):
+            valor = getattr(usage, kind, None)
+            if isinstance(valor, int) and valor:
+                OPENAI_TOKENS.labels(self.purpose, self.model, kind.replace("_tokens", "")).inc(valor)
+                if self.span is not None:
+                    self.span.set_attribute(f"openai.usage.{kind}", valor)
+
+
+@contextmanager
+def observe_openai(purpose: str, model: str):
+    """
+    Mede uma chamada à OpenAI (e abre o span `openai.<purpose>`, se houver tracing).
+
+    Uso:
+        with observe_openai("summarize", MODEL) as call:
+            response = client.chat.completions.create(...)
+            call.record(response)
+
+    Args:
+        purpose: embed, summarize, rag, vision, transcribe...
+        model: Modelo usado (label)
+    """
+    inicio = time.perf_counter()
+    with span(f"openai.{purpose}", **{"openai.model": model}) as trace_span:
+        call = _OpenAICall(purpose, model or "desconhecido", trace_span)
+        try:
+            yield call
+        except Exception as e:
+            OPENAI_ERRORS.labels(purpose, type(e).__name__).inc()
+            raise
+        finally:
+            OPENAI_REQUEST_DURATION.labels(purpose, call.model).observe(time.perf_counter() - inicio)
+
+
+# ---------------------------------------------------------------------------
+# Chrome / Selenium
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def observe_chrome_launch():
+    """Mede a subida do webdriver (só conta lançamentos bem-sucedidos)."""
+    inicio = time.perf_counter()
+    with span("chrome.launch"):
+        yield
+    CHROME_LAUNCH_DURATION.observe(time.perf_counter() - inicio)
+
+
+def observe_page_load(seconds: float, timed_out: bool) -> None:
+    CHROME_PAGE_LOAD_DURATION.labels("true" if timed_out else "false").observe(seconds)
+
+
+# ---------------------------------------------------------------------------
+# Caches
+# ---------------------------------------------------------------------------
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Conta uma consulta ao cache `cache` (hit ou miss)."""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+# ---------------------------------------------------------------------------
+# Celery
+# ---------------------------------------------------------------------------
+
+class CeleryQueueCollector:
+    """
+    Profundidade das filas do broker (Redis), lida no momento do scrape.
+
+    Não passa pelos arquivos do multiprocesso: é um valor do broker, não do processo.
+    """
+
+    def __init__(self, queues: Optional[Iterable[str]] = None):
+        self._queues = list(queues) if queues else None
+        self._client = None
+
+    def _queue_names(self) -> list:
+        if self._queues is not None:
+            return self._queues
+        from api.utils.celery_app import celery_app
+
+        nomes = {celery_app.conf.task_default_queue or "celery"}
+        for rota in (celery_app.conf.task_routes or {}).values():
+            if isinstance(rota, dict) and rota.get("queue"):
+                nomes.add(rota["queue"])
+        self._queues = sorted(nomes)
+        return self._queues
+
+    def collect(self):
+        gauge = GaugeMetricFamily("celery_queue_length", "Mensagens aguardando em cada fila do Celery", labels=["queue"])
+        if not settings.CELERY_BROKER_URL.startswith(("redis://", "rediss://")):
+            yield gauge
+            return
+        try:
+            if self._client is None:
+                import redis
+
+                self._client = redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_timeout=1)
+            for fila in self._queue_names():
+                gauge.add_metric([fila], self._client.llen(fila))
+        except Exception as e:
+            logger.warning(f"Não foi possível ler a profundidade das filas do Celery: {e}")
+        yield gauge
+
+
+_task_started_at = {}
+
+
+def _task_prerun(task_id=None, **kwargs):
+    _task_started_at[task_id] = time.perf_counter()
+
+
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    inicio = _task_started_at.pop(task_id, None)
+    if inicio is None or task is None:
+        return
+    CELERY_TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - inicio)
+
+
+def _start_worker_metrics_server(**kwargs):
+    """No processo principal do worker: expõe as métricas de todos os filhos."""
+    if settings.CELERY_METRICS_PORT <= 0:
+        return
+    from prometheus_client import start_http_server
+
+    try:
+        start_http_server(settings.CELERY_METRICS_PORT, registry=_new_registry())
+        logger.info(f"Métricas do worker em :{settings.CELERY_METRICS_PORT}/metrics")
+    except OSError as e:
+        logger.warning(f"Servidor de métricas do worker não iniciado: {e}")
+
+
+def _mark_process_dead(pid=None, **kwargs):
+    if _multiproc_dir:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def install_celery_metrics() -> None:
+    """Conecta os sinais do Celery (duração das tasks e servidor de métricas do worker)."""
+    if not settings.METRICS_ENABLED:
+        return
+    from celery import signals
+
+    signals.task_prerun.connect(_task_prerun, weak=False)
+    signals.task_postrun.connect(_task_postrun, weak=False)
+    signals.worker_init.connect(_start_worker_metrics_server, weak=False)
+    signals.worker_process_shutdown.connect(_mark_process_dead, weak=False)
@@ -0,0 +1,47 @@
+"""
+Download de PDF em streaming, compartilhado pelos thumbnails e pela ingestão RAG.
+
+Sessão HTTP reaproveitada (keep-alive), timeout de conexão/leitura e limite de
+tamanho checado no Content-Length declarado e nos bytes efetivamente recebidos.
+"""
+from typing import Iterator, Tuple
+
+import requests
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_http = requests.Session()
+
+
+class PdfTooLargeError(Exception):
+    pass
+
+
+def iter_pdf_download(url: str, max_bytes: int, timeout: Tuple[float, float]) -> Iterator[bytes]:
+    """
+    Gera o corpo da resposta em pedaços de DOWNLOAD_CHUNK_SIZE.
+
+    A conexão é fechada quando o gerador termina ou é fechado.
+
+    Args:
+        url: URL do PDF
+        max_bytes: Tamanho máximo aceito
+        timeout: (conexão, leitura) em segundos
+
+    Raises:
+        PdfTooLargeError: se o arquivo passar de `max_bytes`
+        requests.RequestException: em erro de rede ou resposta HTTP de erro
+    """
+    with _http.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+
+        declarado = int(response.headers.get("Content-Length") or 0)
+        if declarado > max_bytes:
+            raise PdfTooLargeError(f"PDF de {declarado} bytes excede o limite de {max_bytes}")
+
+        total = 0
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            total += len(chunk)
+            if total > max_bytes:
+                raise PdfTooLargeError(f"PDF excede o limite de {max_bytes} bytes")
+            yield chunk
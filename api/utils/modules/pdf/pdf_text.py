@@ -0,0 +1,109 @@
+"""
+Extração de texto de PDF página a página (usada pelo WhatsApp e pela ingestão RAG).
+
+`iter_pdf_pages` gera (numero_da_pagina, texto) sob demanda, extraindo lotes de
+páginas num pool de processos quando possível, com orçamento de caracteres.
+"""
+import itertools
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import PyPDF2
+
+from api.utils.settings import settings
+
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+_pdf_executor_lock = threading.Lock()
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extrai o texto das páginas [start, end) (executado nos processos do pool).
+
+    Returns:
+        Lista de (numero_da_pagina, texto), numeração a partir de 1
+    """
+    reader = PyPDF2.PdfReader(file_path)
+    pages = []
+    for page_num in range(start, end):
+        try:
+            text = reader.pages[page_num].extract_text() or ""
+        except Exception as e:
+            # Uma página corrompida não derruba o documento inteiro
+            text = ""
+            print(f"⚠️ Falha ao extrair página {page_num + 1} de {file_path}: {e}")
+        pages.append((page_num + 1, text))
+    return pages
+
+
+def _get_pdf_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Pool de processos compartilhado para extração (None quando não é possível usar processos).
+
+    Workers do Celery (prefork) são processos daemon e não podem criar filhos:
+    nesse caso a extração roda no próprio processo.
+    """
+    global _pdf_executor
+    if multiprocessing.current_process().daemon or settings.PDF_EXTRACT_WORKERS <= 1:
+        return None
+    with _pdf_executor_lock:
+        if _pdf_executor is None:
+            _pdf_executor = ProcessPoolExecutor(max_workers=settings.PDF_EXTRACT_WORKERS)
+    return _pdf_executor
+
+
+def iter_pdf_pages(file_path: str, char_budget: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Gera (numero_da_pagina, texto) em ordem, extraindo lotes de páginas em paralelo.
+
+    No máximo 2 lotes por worker ficam em andamento: ao esgotar o orçamento de
+    caracteres os lotes pendentes são cancelados, então documentos enormes não
+    são extraídos por inteiro à toa.
+
+    Args:
+        file_path: Caminho para o arquivo PDF
+        char_budget: Máximo de caracteres a produzir (None = sem limite); a página
+            que estoura o orçamento é cortada
+    """
+    num_pages = len(PyPDF2.PdfReader(file_path).pages)
+    batch = max(1, settings.PDF_PAGES_PER_TASK)
+    ranges = [(start, min(start + batch, num_pages)) for start in range(0, num_pages, batch)]
+    remaining = char_budget
+
+    def _consume(pages):
+        nonlocal remaining
+        for page_num, text in pages:
+            if remaining is not None:
+                text = text[:remaining]
+                remaining -= len(text)
+            yield page_num, text
+            if remaining is not None and remaining <= 0:
+                return
+
+    executor = _get_pdf_executor() if len(ranges) > 1 else None
+    if executor is None:
+        for start, end in ranges:
+            yield from _consume(_extract_page_range(file_path, start, end))
+            if remaining is not None and remaining <= 0:
+                return
+        return
+
+    pending: deque = deque()
+    next_range = iter(ranges)
+    max_in_flight = settings.PDF_EXTRACT_WORKERS * 2
+    try:
+        for start, end in itertools.islice(next_range, max_in_flight):
+            pending.append(executor.submit(_extract_page_range, file_path, start, end))
+        while pending:
+            pages = pending.popleft().result()
+            for start, end in itertools.islice(next_range, 1):
+                pending.append(executor.submit(_extract_page_range, file_path, start, end))
+            yield from _consume(pages)
+            if remaining is not None and remaining <= 0:
+                return
+    finally:
+        for future in pending:
+            future.cancel()
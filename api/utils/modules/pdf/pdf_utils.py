@@ -1,16 +1,65 @@
+import hashlib
 import io
 import os
+import math
 import logging
 import asyncio
-from urllib.parse import unquote, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
 
+import PyPDF2
 import requests
 from pdf2image import convert_from_bytes
 
-from api.utils.modules.upload.upload_utils import azure_upload_buffer
+from api.utils.modules.pdf.pdf_download import iter_pdf_download
+from api.utils.modules.upload.upload_utils import azure_get_file_exists, azure_upload_buffer
+from api.utils.settings import settings
 
+THUMBNAIL_SIZE = (256, 256)
+THUMBNAIL_LOCAL_PATH = "thumbnails"
+PDF_POINTS_PER_INCH = 72
 
-# Função de trabalho síncrona (não bloqueia o event loop pois será executada em thread)
+# Pool limitado: cada renderização abre um pdftoppm e segura o PDF em memória,
+# então a concorrência precisa de teto
+_thumbnail_executor = ThreadPoolExecutor(
+    max_workers=settings.PDF_THUMBNAIL_WORKERS, thread_name_prefix="pdf-thumbnail"
+)
+
+
+def _baixar_pdf(pdf_url: str) -> Optional[bytes]:
+    """
+    Baixa o PDF em streaming, com timeout e limite de tamanho (PDF_THUMBNAIL_MAX_BYTES).
+
+    Returns:
+        bytes do PDF ou None se o download falhar
+    """
+    timeout = (settings.PDF_THUMBNAIL_CONNECT_TIMEOUT, settings.PDF_THUMBNAIL_READ_TIMEOUT)
+    try:
+        return b"".join(iter_pdf_download(pdf_url, settings.PDF_THUMBNAIL_MAX_BYTES, timeout))
+    except requests.HTTPError as e:
+        logging.error(f"Falha ao fazer download do PDF ({e})")
+        return None
+
+
+def _dpi_para_thumbnail(pdf_bytes: bytes) -> int:
+    """
+    DPI que faz a primeira página caber no thumbnail (em vez dos 200 DPI padrão do pdf2image).
+
+    Lê o MediaBox da página 1; se não conseguir, usa PDF_THUMBNAIL_FALLBACK_DPI.
+    """
+    try:
+        pagina = PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages[0]
+        largura, altura = float(pagina.mediabox.width), float(pagina.mediabox.height)
+        polegadas = max(largura, altura) / PDF_POINTS_PER_INCH
+        dpi = math.ceil(max(THUMBNAIL_SIZE) / polegadas)
+    except Exception as e:
+        logging.warning(f"Não foi possível ler o tamanho da página: {e}")
+        return settings.PDF_THUMBNAIL_FALLBACK_DPI
+    return max(settings.PDF_THUMBNAIL_MIN_DPI, min(dpi, settings.PDF_THUMBNAIL_FALLBACK_DPI))
+
+
+# Função de trabalho síncrona (não bloqueia o event loop pois será executada no pool)
 def _gerar_thumbnail_pdf_sync(pdf_url: str):
     try:
         parsed_url = urlparse(pdf_url)
@@ -20,34 +69,35 @@ def _gerar_thumbnail_pdf_sync(pdf_url: str):
             logging.error("A URL não aponta para um arquivo PDF válido")
             return None
 
-        # 1. Download do PDF
-        response = requests.get(pdf_url)
-        if response.status_code != 200:
-            logging.error("Falha ao fazer download do PDF")
+        # 1. Download do PDF (streaming, com limite)
+        pdf_bytes = _baixar_pdf(pdf_url)
+        if pdf_bytes is None:
             return None
 
-        pdf_bytes = response.content
+        # 2. Nome do arquivo pelo hash do conteúdo: o mesmo PDF nunca é renderizado duas vezes
+        content_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        thumbnail_filename = f"{content_hash}_thumbnail.jpg"
 
-        # 2. Conversão para imagem (primeira página)
-        images = convert_from_bytes(pdf_bytes, first_page=1, last_page=1)
+        blob_client = azure_get_file_exists(thumbnail_filename, THUMBNAIL_LOCAL_PATH)
+        if blob_client is not None and blob_client.exists():
+            logging.info(f"Thumbnail já existe para {content_hash[:12]}, reaproveitando")
+            return blob_client.url
 
-        # 3. Criação do thumbnail
-        thumbnail_size = (256, 256)
-        buffer = io.BytesIO()
-        images[0].thumbnail(thumbnail_size)
-        images[0].save(buffer, format="JPEG", quality=85)
-        buffer.seek(0)
+        # 3. Conversão para imagem (primeira página), já na resolução do thumbnail
+        images = convert_from_bytes(
+            pdf_bytes, dpi=_dpi_para_thumbnail(pdf_bytes), first_page=1, last_page=1
+        )
 
-        # 4. Nome do arquivo
-        original_filename = os.path.basename(parsed_url.path)
-        base_name = os.path.splitext(original_filename)[0]
-        thumbnail_filename = f"{unquote(base_name)}_thumbnail.jpg"
+        # 4. Criação do thumbnail
+        buffer = io.BytesIO()
+        images[0].thumbnail(THUMBNAIL_SIZE)
+        images[0].convert("RGB").save(buffer, format="JPEG", quality=85)
 
         # 5. Upload
         url_thumbnail = azure_upload_buffer(
             buffer=buffer.getvalue(),
             file_name=thumbnail_filename,
-            local_path="thumbnails",
+            local_path=THUMBNAIL_LOCAL_PATH,
         )
 
         return url_thumbnail
@@ -59,5 +109,20 @@ def _gerar_thumbnail_pdf_sync(pdf_url: str):
 
 # Wrapper assíncrono para ser usado no restante do código
 async def gerar_thumbnail_pdf(pdf_url: str):
-    """Gera thumbnail de forma assíncrona utilizando thread pool."""
-    return await asyncio.to_thread(_gerar_thumbnail_pdf_sync, pdf_url)
\ No newline at end of file
+    """Gera thumbnail de forma assíncrona utilizando o pool limitado de thumbnails."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_thumbnail_executor, _gerar_thumbnail_pdf_sync, pdf_url)
+
+
+async def gerar_thumbnails_pdf(pdf_urls: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Gera thumbnails para vários PDFs (URLs repetidas são processadas uma vez).
+
+    A concorrência fica limitada a PDF_THUMBNAIL_WORKERS pelo pool.
+
+    Returns:
+        Dicionário {pdf_url: url_do_thumbnail ou None}
+    """
+    unicas = list(dict.fromkeys(pdf_urls))
+    resultados = await asyncio.gather(*(gerar_thumbnail_pdf(url) for url in unicas))
+    return dict(zip(unicas, resultados))
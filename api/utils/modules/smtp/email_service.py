@@ -1,11 +1,12 @@
 from datetime import datetime
-import smtplib
 from pathlib import Path
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from enum import Enum
-from api.utils.settings import Settings
+from api.utils.settings import settings
+from .smtp_pool import get_smtp_sender
+from .template_engine import CompiledEmailTemplate, get_template_engine
 from .templates.template_config import get_template_config
 
 class EmailTemplateType(Enum):
@@ -23,8 +24,10 @@ class EmailTemplate:
 
 class EmailService:
     def __init__(self):
-        self.settings = Settings()
+        self.settings = settings
         self.templates_dir = Path(__file__).parent / "templates"
+        # Templates compilados ficam no engine do processo: criar um EmailService é barato
+        self._engine = get_template_engine()
         self._templates = self._load_templates()
     
     def _get_header_title(self, template_type: EmailTemplateType) -> str:
@@ -38,34 +41,51 @@ class EmailService:
         }
         return header_titles.get(template_type.value, template_type.value.replace("_", " ").title())
     
-    def _load_template_file(self, filename: str) -> str:
-        """Carrega um arquivo de template HTML"""
-        template_path = self.templates_dir / filename
-        if not template_path.exists():
-            raise FileNotFoundError(f"Template não encontrado: {filename}")
-        
-        with open(template_path, 'r', encoding='utf-8') as file:
-            return file.read()
+    def _load_templates(self) -> Dict[EmailTemplateType, CompiledEmailTemplate]:
+        """Obtém os templates compilados (base já mesclado) de todos os tipos"""
+        return {template_type: self._engine.get(template_type.value) for template_type in EmailTemplateType}
     
-    def _load_base_template(self) -> str:
-        """Carrega o template base HTML"""
-        return self._load_template_file("base.html")
+    def _default_variables(self, template_type: EmailTemplateType) -> Dict[str, Any]:
+        return {
+            "company_name": self.settings.SMTP_USER,
+            "year": datetime.now().year,
+            "header_title": self._get_header_title(template_type),
+            "footer": ""
+        }
     
-    def _load_templates(self) -> Dict[EmailTemplateType, EmailTemplate]:
-        """Carrega todos os templates de arquivos HTML"""
-        templates = {}
+    def _build_message(self, to_email: str, subject: str, html_content: str) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg["From"] = self.settings.SMTP_USER
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.attach(MIMEText(html_content, "html"))
+        return msg
+    
+    def render_messages(self,
+                        template_type: EmailTemplateType,
+                        recipients: List[Tuple[str, Dict[str, Any]]],
+                        custom_subject: Optional[str] = None) -> List[MIMEMultipart]:
+        """
+        Renderiza o mesmo template para vários destinatários
         
-        for template_type in EmailTemplateType:
-            config = get_template_config(template_type.value)
-            html_content = self._load_template_file(config.template_file)
-            
-            templates[template_type] = EmailTemplate(
-                subject=config.subject,
-                html_content=html_content,
-                variables=config.variables
-            )
+        Args:
+            template_type: Tipo do template a ser usado
+            recipients: Lista de (email, variáveis do template)
+            custom_subject: Assunto customizado para todos (opcional)
+        """
+        if template_type not in self._templates:
+            raise ValueError(f"Template {template_type} não encontrado")
         
-        return templates
+        defaults = self._default_variables(template_type)
+        rendered = self._engine.render_many(
+            template_type.value,
+            ({**defaults, **variables} for _, variables in recipients),
+            custom_subject,
+        )
+        return [
+            self._build_message(to_email, subject, html_content)
+            for (to_email, _), (subject, html_content) in zip(recipients, rendered)
+        ]
     
     def send_email(self, 
                    template_type: EmailTemplateType, 
@@ -83,60 +103,27 @@ class EmailService:
             from_name: Nome do remetente (opcional)
             custom_subject: Assunto customizado (opcional)
         """
-        
-        if template_type not in self._templates:
-            raise ValueError(f"Template {template_type} não encontrado")
-        
-        template = self._templates[template_type]
-        
-        # Preparar variáveis padrão
-        default_variables = {
-            "company_name": self.settings.SMTP_USER,
-            "year": datetime.now().year,
-            "header_title": self._get_header_title(template_type),
-            "footer": ""
-        }
-        
-        # Mesclar variáveis
-        all_variables = {**default_variables, **variables}
-        
-        # Renderizar template
-        try:
-            subject = custom_subject or template.subject.format(**all_variables)
-            content = template.html_content.format(**all_variables)
-            
-            # Carregar template base e inserir conteúdo
-            base_template = self._load_base_template()
-            html_content = base_template.format(
-                content=content,
-                **all_variables
-            )
-            
-        except KeyError as e:
-            raise ValueError(f"Variável obrigatória não fornecida: {e}")
-        
-        # Preparar mensagem
-        msg = MIMEMultipart()
-        msg["From"] = self.settings.SMTP_USER
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        
-        msg.attach(MIMEText(html_content, "html"))
+        msg = self.render_messages(template_type, [(to_email, variables)], custom_subject)[0]
         
         # Enviar email
         return self._send_message(msg)
     
+    def send_batch(self,
+                   template_type: EmailTemplateType,
+                   recipients: List[Tuple[str, Dict[str, Any]]],
+                   custom_subject: Optional[str] = None) -> List[bool]:
+        """
+        Renderiza e envia um template para vários destinatários pelas mesmas conexões SMTP
+        
+        Returns:
+            Sucesso de cada envio, na ordem de `recipients`
+        """
+        messages = self.render_messages(template_type, recipients, custom_subject)
+        return get_smtp_sender().send_many(messages)
+    
     def _send_message(self, msg: MIMEMultipart) -> bool:
-        """Método privado para envio da mensagem"""
-        try:
-            with smtplib.SMTP(self.settings.SMTP_HOST, self.settings.SMTP_PORT) as server:
-                server.starttls()
-                server.login(self.settings.SMTP_USER, self.settings.SMTP_PASSWORD)
-                server.send_message(msg)
-            return True
-        except Exception as e:
-            print(f"Erro ao enviar e-mail: {e}")
-            return False
+        """Método privado para envio da mensagem (conexão SMTP reaproveitada do pool)"""
+        return get_smtp_sender().send(msg)
     
     def get_template_preview(self, template_type: EmailTemplateType, variables: Dict[str, Any]) -> str:
         """
@@ -146,25 +133,9 @@ class EmailService:
         if template_type not in self._templates:
             raise ValueError(f"Template {template_type} não encontrado")
         
-        template = self._templates[template_type]
-        
-        # Preparar variáveis padrão
-        default_variables = {
-            "company_name": self.settings.SMTP_USER,
-            "year": datetime.now().year,
-            "header_title": self._get_header_title(template_type),
-            "footer": ""
-        }
-        
-        # Mesclar variáveis
-        all_variables = {**default_variables, **variables}
-        
-        try:
-            content = template.html_content.format(**all_variables)
-            base_template = self._load_base_template()
-            return base_template.format(content=content, **all_variables)
-        except KeyError as e:
-            raise ValueError(f"Variável obrigatória não fornecida: {e}")
+        all_variables = {**self._default_variables(template_type), **variables}
+        _, html_content = self._engine.render(template_type.value, all_variables)
+        return html_content
     
     def list_template_variables(self, template_type: EmailTemplateType) -> list:
         """Retorna as variáveis obrigatórias de um template"""
@@ -173,6 +144,7 @@ class EmailService:
     
     def reload_templates(self):
         """Recarrega todos os templates (útil em desenvolvimento)"""
+        self._engine.clear_cache()
         self._templates = self._load_templates()
     
     # Métodos de conveniência para manter compatibilidade
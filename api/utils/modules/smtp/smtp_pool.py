@@ -0,0 +1,287 @@
+"""
+Envio SMTP com conexões reaproveitadas.
+
+Abrir conexão, STARTTLS e LOGIN a cada e-mail custa várias idas e voltas ao
+servidor (e costuma disparar limites do provedor). Aqui cada processo mantém um
+pequeno pool de conexões já autenticadas:
+
+- uma conexão é reaproveitada por até `max_messages_per_connection` mensagens
+- conexões ociosas há mais de `idle_timeout` segundos são testadas com NOOP
+- se o servidor derrubar a conexão no meio do envio, reconecta e tenta de novo uma
+  vez (respostas SMTP de erro, como destinatário recusado, não são repetidas)
+- um orçamento por minuto (token bucket) substitui as pausas fixas entre e-mails; o
+  bucket fica no Redis e vale para todos os processos/workers somados
+"""
+import queue
+import smtplib
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from email.message import Message
+from typing import Callable, Iterable, List, Optional
+
+# Só falhas de conexão/transporte: SMTPException herda de OSError, e uma resposta de
+# erro do servidor (SMTPResponseException) repetida numa conexão nova falharia igual
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+# KEYS[1]: hash do bucket; ARGV[1]: tokens por segundo; ARGV[2]: capacidade.
+# Consome um token se houver e retorna "0"; senão retorna a espera em segundos.
+_SHARED_BUDGET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(estado[1]) or capacity
+local updated = tonumber(estado[2]) or agora
+tokens = math.min(capacity, tokens + math.max(0, agora - updated) * rate)
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    espera = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(agora))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(espera)
+"""
+
+
+class RateBudget:
+    """Token bucket: no máximo `per_minute` envios por minuto, com rajada de `burst`."""
+
+    def __init__(self, per_minute: int, burst: Optional[int] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or max(1, per_minute // 6))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Bloqueia até haver orçamento para mais um envio."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (agora - self._updated) * self.rate)
+                self._updated = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.rate
+            time.sleep(espera)
+
+
+class SharedRateBudget(RateBudget):
+    """
+    Token bucket guardado no Redis, compartilhado por todos os processos.
+
+    O limite do provedor vale para a conta SMTP, não para o processo: com N workers
+    um bucket local deixaria passar N vezes `per_minute`. Se o Redis estiver
+    indisponível, cai no bucket local (por processo) em vez de travar os envios.
+    """
+
+    def __init__(self, client, key: str, per_minute: int, burst: Optional[int] = None):
+        super().__init__(per_minute, burst)
+        self.client = client
+        self.key = key
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            try:
+                espera = float(self.client.eval(_SHARED_BUDGET_SCRIPT, 1, self.key, self.rate, self.capacity))
+            except Exception as e:
+                print(f"⚠️ Orçamento SMTP no Redis indisponível, usando limite local: {e}")
+                return super().acquire()
+            if espera <= 0:
+                return
+            time.sleep(espera)
+
+
+class _PooledConnection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Pool de conexões SMTP autenticadas, seguro para uso entre threads."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str = "",
+        password: str = "",
+        use_tls: bool = True,
+        size: int = 2,
+        max_messages_per_connection: int = 100,
+        idle_timeout: float = 60.0,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> _PooledConnection:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.user:
+            server.login(self.user, self.password)
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _close(conn: _PooledConnection) -> None:
+        try:
+            conn.server.quit()
+        except Exception:
+            try:
+                conn.server.close()
+            except Exception:
+                pass
+
+    def _is_usable(self, conn: _PooledConnection) -> bool:
+        if conn.sent >= self.max_messages_per_connection:
+            return False
+        if time.monotonic() - conn.last_used < self.idle_timeout:
+            return True
+        try:
+            return conn.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self) -> _PooledConnection:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if self._is_usable(conn):
+                return conn
+            self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão; conexões com erro são descartadas em vez de devolvidas."""
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._acquire()
+            yield conn
+            conn.last_used = time.monotonic()
+            self._idle.put(conn)
+            conn = None
+        finally:
+            if conn is not None:
+                self._close(conn)
+            self._slots.release()
+
+    def send(self, msg: Message) -> None:
+        """Envia a mensagem, reconectando uma vez se o servidor derrubou a conexão."""
+        for tentativa in range(2):
+            try:
+                with self.connection() as conn:
+                    conn.server.send_message(msg)
+                    conn.sent += 1
+                return
+            except RECONNECT_ERRORS:
+                if tentativa:
+                    raise
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class PooledSMTPSender:
+    """Envio de mensagens pelo pool respeitando o orçamento por minuto."""
+
+    def __init__(self, pool: SMTPConnectionPool, budget: Optional[RateBudget] = None):
+        self.pool = pool
+        self.budget = budget
+
+    def send(self, msg: Message) -> bool:
+        if self.budget:
+            self.budget.acquire()
+        try:
+            self.pool.send(msg)
+            return True
+        except Exception as e:
+            print(f"Erro ao enviar e-mail: {e}")
+            return False
+
+    def send_many(
+        self,
+        messages: Iterable[Message],
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[bool]:
+        """
+        Envia as mensagens em sequência reaproveitando as conexões.
+
+        Args:
+            messages: Mensagens a enviar
+            on_progress: Chamado como on_progress(enviadas, sucessos) após cada mensagem
+
+        Returns:
+            Lista com o sucesso de cada mensagem, na mesma ordem
+        """
+        resultados = []
+        for msg in messages:
+            resultados.append(self.send(msg))
+            if on_progress:
+                on_progress(len(resultados), sum(resultados))
+        return resultados
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+SMTP_BUDGET_KEY = "smtp:rate_budget"
+
+_sender: Optional[PooledSMTPSender] = None
+_sender_lock = threading.Lock()
+
+
+def get_smtp_sender() -> PooledSMTPSender:
+    """Sender SMTP do processo (pool por processo; orçamento por minuto global, no Redis)."""
+    global _sender
+    if _sender is not None:
+        return _sender
+    with _sender_lock:
+        if _sender is None:
+            from api.utils.redis_db import get_redis_client
+            from api.utils.settings import settings
+
+            pool = SMTPConnectionPool(
+                host=settings.SMTP_HOST,
+                port=settings.SMTP_PORT,
+                user=settings.SMTP_USER,
+                password=settings.SMTP_PASSWORD,
+                use_tls=settings.SMTP_USE_TLS,
+                size=settings.SMTP_POOL_SIZE,
+                max_messages_per_connection=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+                idle_timeout=settings.SMTP_IDLE_TIMEOUT_SECONDS,
+            )
+            client = get_redis_client()
+            if client is not None:
+                budget = SharedRateBudget(client, SMTP_BUDGET_KEY, settings.SMTP_MESSAGES_PER_MINUTE)
+            else:
+                budget = RateBudget(settings.SMTP_MESSAGES_PER_MINUTE)
+            _sender = PooledSMTPSender(pool, budget)
+    return _sender
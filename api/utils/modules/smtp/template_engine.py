@@ -0,0 +1,189 @@
+"""
+Camada de templates de e-mail sobre Jinja2.
+
+Os arquivos em templates/ continuam no formato `str.format` ({variavel}, chaves
+literais do CSS como {{ }}). Na primeira renderização de cada tipo, o corpo é
+inserido no `{content}` do base.html, o conjunto é convertido para a sintaxe do
+Jinja2 e compilado uma única vez; o template compilado fica no cache do Environment
+do processo. Assim um envio não lê arquivo nem reprocessa o layout.
+
+Hot reload (checagem de mtime dos arquivos) só quando EMAIL_TEMPLATES_AUTO_RELOAD
+estiver ligado (desenvolvimento).
+"""
+import os
+import string
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from jinja2 import BaseLoader, Environment, StrictUndefined, Template, TemplateNotFound
+from jinja2.exceptions import UndefinedError
+
+from .templates.template_config import TEMPLATE_CONFIGS, get_template_config
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+BASE_TEMPLATE = "base.html"
+SUBJECT_SUFFIX = ":subject"
+JINJA_MARKERS = ("{{", "}}", "{%", "%}", "{#", "#}")
+
+_formatter = string.Formatter()
+
+
+def format_to_jinja(source: str, merge: Optional[Dict[str, str]] = None) -> str:
+    """
+    Converte um template `str.format` para a sintaxe do Jinja2.
+
+    Args:
+        source: Template com {variavel} e chaves literais escapadas ({{ }})
+        merge: Campos substituídos por outro trecho de template já convertido
+            (usado para embutir o corpo no {content} do base.html)
+    """
+    merge = merge or {}
+    partes = []
+    for literal, field_name, format_spec, conversion in _formatter.parse(source):
+        if literal:
+            if any(marker in literal for marker in JINJA_MARKERS):
+                partes.append("{% raw %}" + literal + "{% endraw %}")
+            else:
+                partes.append(literal)
+        if field_name is None:
+            continue
+        if format_spec or conversion:
+            raise ValueError(f"Formatação não suportada no campo '{field_name}'")
+        if field_name in merge:
+            partes.append(merge[field_name])
+        else:
+            partes.append("{{ " + field_name + " }}")
+    return "".join(partes)
+
+
+class _MergedFormatLoader(BaseLoader):
+    """
+    Loader que entrega cada tipo de template já mesclado com o base.html.
+
+    Nomes: "<tipo>" para o HTML e "<tipo>:subject" para o assunto.
+    """
+
+    def __init__(self, templates_dir: Path):
+        self.templates_dir = templates_dir
+
+    def _read(self, filename: str) -> Tuple[str, Path]:
+        path = self.templates_dir / filename
+        if not path.exists():
+            raise TemplateNotFound(filename)
+        return path.read_text(encoding="utf-8"), path
+
+    def get_source(self, environment: Environment, name: str):
+        template_type, _, part = name.partition(":")
+        if template_type not in TEMPLATE_CONFIGS:
+            raise TemplateNotFound(name)
+        config = get_template_config(template_type)
+
+        if part == "subject":
+            return format_to_jinja(config.subject), None, lambda: True
+
+        body, body_path = self._read(config.template_file)
+        base, base_path = self._read(BASE_TEMPLATE)
+        source = format_to_jinja(base, merge={"content": format_to_jinja(body)})
+
+        mtimes = (os.path.getmtime(body_path), os.path.getmtime(base_path))
+
+        def uptodate() -> bool:
+            try:
+                return (os.path.getmtime(body_path), os.path.getmtime(base_path)) == mtimes
+            except OSError:
+                return False
+
+        return source, str(body_path), uptodate
+
+
+@dataclass(frozen=True)
+class CompiledEmailTemplate:
+    """Assunto e HTML compilados de um tipo de e-mail."""
+    subject: Template
+    html: Template
+    variables: List[str]
+
+
+class EmailTemplateEngine:
+    """Renderização de e-mails com templates compilados e cacheados por processo."""
+
+    def __init__(self, templates_dir: Path = TEMPLATES_DIR, auto_reload: bool = False):
+        # Sem autoescape: variáveis como action_button/additional_info carregam HTML por contrato
+        self.environment = Environment(
+            loader=_MergedFormatLoader(templates_dir),
+            autoescape=False,
+            undefined=StrictUndefined,
+            auto_reload=auto_reload,
+            cache_size=-1,
+            keep_trailing_newline=True,
+        )
+
+    def get(self, template_type: str) -> CompiledEmailTemplate:
+        """Template compilado do tipo (compila na primeira chamada)."""
+        try:
+            return CompiledEmailTemplate(
+                subject=self.environment.get_template(template_type + SUBJECT_SUFFIX),
+                html=self.environment.get_template(template_type),
+                variables=get_template_config(template_type).variables,
+            )
+        except TemplateNotFound:
+            raise ValueError(f"Template {template_type} não encontrado")
+
+    def render(
+        self, template_type: str, variables: Dict[str, Any], custom_subject: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Renderiza assunto e HTML final (já com o layout base).
+
+        Raises:
+            ValueError: Se faltar uma variável usada pelo template
+        """
+        return self.render_many(template_type, [variables], custom_subject)[0]
+
+    def render_many(
+        self,
+        template_type: str,
+        variables_list: Iterable[Dict[str, Any]],
+        custom_subject: Optional[str] = None,
+    ) -> List[Tuple[str, str]]:
+        """
+        Renderiza o mesmo template para vários destinatários (busca o compilado uma vez).
+
+        Args:
+            custom_subject: Assunto fixo; quando informado o template de assunto não é renderizado
+
+        Returns:
+            Lista de (assunto, html), na ordem de `variables_list`
+        """
+        template = self.get(template_type)
+        renderizados = []
+        for variables in variables_list:
+            try:
+                subject = custom_subject if custom_subject else template.subject.render(variables)
+                renderizados.append((subject, template.html.render(variables)))
+            except UndefinedError as e:
+                raise ValueError(f"Variável obrigatória não fornecida: {e.message}")
+        return renderizados
+
+    def clear_cache(self) -> None:
+        """Descarta os templates compilados (próxima renderização relê os arquivos)."""
+        self.environment.cache.clear()
+
+
+_engine: Optional[EmailTemplateEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_template_engine() -> EmailTemplateEngine:
+    """Engine de templates do processo."""
+    global _engine
+    if _engine is not None:
+        return _engine
+    with _engine_lock:
+        if _engine is None:
+            from api.utils.settings import settings
+
+            _engine = EmailTemplateEngine(auto_reload=settings.EMAIL_TEMPLATES_AUTO_RELOAD)
+    return _engine
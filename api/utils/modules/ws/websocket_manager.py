@@ -1,33 +1,251 @@
-from fastapi import WebSocket
-from typing import Dict
+"""
+Push por WebSocket entre processos (Redis pub/sub).
+
+Cada processo da API mantém apenas os sockets conectados a ele. Para alcançar um
+usuário conectado em outro worker/pod, o evento é publicado no canal Redis do
+usuário (`ws:user:{user_id}`); todos os processos escutam `ws:user:*` (um único
+PSUBSCRIBE por processo) e entregam aos sockets locais daquele usuário.
+
+- Celery/código síncrono: `publish_user_event(user_id, message)`
+- Código async na API:   `await manager.publish(user_id, message)`
+- Consumidores HTTP (long-poll/SSE): `async with manager.subscribe(user_id) as fila`
+
+Um usuário pode ter vários sockets (abas, dispositivos). Cada socket tem uma fila
+limitada (WS_QUEUE_SIZE) consumida por uma task própria: um cliente lento não
+segura os demais. Com a fila cheia o evento mais antigo é descartado; se o envio
+demorar mais que WS_SEND_TIMEOUT_SECONDS ou os descartes passarem de
+WS_MAX_DROPPED, o socket é fechado (1013) para o cliente reconectar.
+"""
+import asyncio
+import json
 import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from api.utils.redis_db import get_async_redis_client, get_redis_client
+from api.utils.settings import settings
 
 logger = logging.getLogger(__name__)
 
+WS_CHANNEL_PREFIX = "ws:user:"
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+
+def _channel(user_id: str) -> str:
+    return f"{WS_CHANNEL_PREFIX}{user_id}"
+
+
+def publish_user_event(user_id: str, message: dict) -> bool:
+    """
+    Publica um evento para o usuário a partir de código síncrono (ex.: tasks do Celery).
+
+    Returns:
+        True se publicado no Redis
+    """
+    client = get_redis_client()
+    if client is None:
+        return False
+    try:
+        client.publish(_channel(str(user_id)), json.dumps(message, ensure_ascii=False, default=str))
+        return True
+    except Exception as e:
+        logger.error(f"Erro ao publicar evento para {user_id}: {e}")
+        return False
+
+
+class ClientConnection:
+    """Um socket com fila de saída limitada e task de envio própria."""
+
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=settings.WS_QUEUE_SIZE)
+        self.dropped = 0
+        self.closed = False
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self, on_close) -> None:
+        self._sender = asyncio.create_task(self._send_loop(on_close))
+
+    def enqueue(self, message: dict) -> None:
+        if self.closed:
+            return
+        if self.queue.full():
+            # Backpressure: descarta o evento mais antigo em vez de crescer sem limite
+            self.queue.get_nowait()
+            self.dropped += 1
+            if self.dropped > settings.WS_MAX_DROPPED:
+                logger.warning(f"WebSocket de {self.user_id} lento demais ({self.dropped} descartes). Fechando.")
+                asyncio.create_task(self.close(WS_CLOSE_TRY_AGAIN_LATER))
+                return
+        self.queue.put_nowait(message)
+
+    async def _send_loop(self, on_close) -> None:
+        try:
+            while True:
+                message = await self.queue.get()
+                await asyncio.wait_for(
+                    self.websocket.send_json(message), timeout=settings.WS_SEND_TIMEOUT_SECONDS
+                )
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            logger.warning(f"Envio para {self.user_id} excedeu o timeout. Fechando socket.")
+            await self.close(WS_CLOSE_TRY_AGAIN_LATER)
+        except Exception as e:
+            logger.error(f"Erro ao enviar mensagem para {self.user_id}: {e}. Desconectando.")
+        finally:
+            self.closed = True
+            on_close(self)
+
+    async def close(self, code: int = 1000) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+        if self._sender and self._sender is not asyncio.current_task():
+            self._sender.cancel()
+
+
 class ConnectionManager:
     def __init__(self):
-        # Mapeia user_id para a sua conexão WebSocket ativa
-        self.active_connections: Dict[str, WebSocket] = {}
+        # Mapeia user_id para os sockets ativos deste processo
+        self.active_connections: Dict[str, Set[ClientConnection]] = {}
+        # Filas de quem espera eventos sem socket (long-poll/SSE) neste processo
+        self.subscribers: Dict[str, Set["asyncio.Queue[dict]"]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
 
-    async def connect(self, websocket: WebSocket, user_id: str):
+    async def connect(self, websocket: WebSocket, user_id: str) -> ClientConnection:
         await websocket.accept()
-        self.active_connections[user_id] = websocket
-        logger.info(f"WebSocket conectado para o usuário: {user_id}")
+        user_id = str(user_id)
+        connection = ClientConnection(websocket, user_id)
+        self.active_connections.setdefault(user_id, set()).add(connection)
+        connection.start(self._remove)
+        self._ensure_listener()
+        logger.info(f"WebSocket conectado para o usuário: {user_id} ({len(self.active_connections[user_id])} sockets)")
+        return connection
 
-    def disconnect(self, user_id: str):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
-            logger.info(f"WebSocket desconectado para o usuário: {user_id}")
+    def _remove(self, connection: ClientConnection) -> None:
+        sockets = self.active_connections.get(connection.user_id)
+        if sockets is None:
+            return
+        sockets.discard(connection)
+        if not sockets:
+            del self.active_connections[connection.user_id]
+        logger.info(f"WebSocket desconectado para o usuário: {connection.user_id}")
+
+    def disconnect(self, user_id: str, connection: Optional[ClientConnection] = None):
+        """Remove um socket do usuário (ou todos, se `connection` não for informado)."""
+        user_id = str(user_id)
+        alvos = [connection] if connection else list(self.active_connections.get(user_id, ()))
+        for alvo in alvos:
+            if alvo is None:
+                continue
+            if alvo._sender:
+                alvo._sender.cancel()
+            alvo.closed = True
+            self._remove(alvo)
 
     async def send_personal_message(self, message: dict, user_id: str):
-        if user_id in self.active_connections:
-            websocket = self.active_connections[user_id]
+        """Entrega aos sockets (e assinantes) do usuário conectados a ESTE processo."""
+        for connection in list(self.active_connections.get(str(user_id), ())):
+            connection.enqueue(message)
+        for fila in list(self.subscribers.get(str(user_id), ())):
+            if fila.full():
+                fila.get_nowait()
+            fila.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: str) -> AsyncIterator["asyncio.Queue[dict]"]:
+        """
+        Recebe os eventos do usuário numa fila local, sem abrir conexão Redis própria.
+
+        Reaproveita o PSUBSCRIBE do processo. Ao entrar, espera (brevemente) o
+        listener estar inscrito, para que o chamador possa ler o estado atual
+        depois de assinar sem perder um evento publicado entre as duas coisas.
+        """
+        user_id = str(user_id)
+        fila: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=settings.WS_QUEUE_SIZE)
+        self.subscribers.setdefault(user_id, set()).add(fila)
+        self._ensure_listener()
+        try:
+            if get_async_redis_client() is not None:
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout=settings.WS_RECONNECT_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            yield fila
+        finally:
+            filas = self.subscribers.get(user_id)
+            if filas is not None:
+                filas.discard(fila)
+                if not filas:
+                    del self.subscribers[user_id]
+
+    async def publish(self, user_id: str, message: dict) -> None:
+        """Entrega ao usuário em qualquer processo (via Redis; local se o Redis estiver fora)."""
+        client = get_async_redis_client()
+        if client is None:
+            await self.send_personal_message(message, user_id)
+            return
+        try:
+            await client.publish(_channel(str(user_id)), json.dumps(message, ensure_ascii=False, default=str))
+        except Exception as e:
+            logger.error(f"Erro ao publicar evento para {user_id}: {e}. Entregando localmente.")
+            await self.send_personal_message(message, user_id)
+
+    def _ensure_listener(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        """Escuta `ws:user:*` e repassa aos sockets locais; reconecta se o Redis cair."""
+        while True:
+            client = get_async_redis_client()
+            if client is None:
+                await asyncio.sleep(settings.WS_RECONNECT_SECONDS)
+                continue
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
             try:
-                await websocket.send_json(message)
-                logger.debug(f"Mensagem enviada para {user_id}: {message}")
+                await pubsub.psubscribe(f"{WS_CHANNEL_PREFIX}*")
+                self._ready.set()
+                async for item in pubsub.listen():
+                    if item.get("type") != "pmessage":
+                        continue
+                    user_id = item["channel"][len(WS_CHANNEL_PREFIX):]
+                    if user_id not in self.active_connections and user_id not in self.subscribers:
+                        continue
+                    try:
+                        message = json.loads(item["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    await self.send_personal_message(message, user_id)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Erro ao enviar mensagem para {user_id}: {e}. Desconectando.")
-                self.disconnect(user_id)
+                logger.error(f"Listener de WebSocket caiu: {e}. Reconectando.")
+                await asyncio.sleep(settings.WS_RECONNECT_SECONDS)
+            finally:
+                self._ready.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def shutdown(self) -> None:
+        """Fecha o listener e todos os sockets locais (chamar no shutdown da aplicação)."""
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        for sockets in list(self.active_connections.values()):
+            for connection in list(sockets):
+                await connection.close(1001)
 
 # Crie uma única instância para ser usada em toda a aplicação
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
@@ -21,6 +21,7 @@ from typing import List
 from fastapi import HTTPException, Depends, status
 
 from api.v1._database.models import Usuario, PermissaoTipo
+from api.utils.principal_cache import Principal
 from api.utils.security import get_current_user
 
 
@@ -52,15 +53,15 @@ class PermissionChecker:
             if perm not in valid_perms:
                 raise ValueError(f"Permissão inválida: {perm}. Permissões válidas: {valid_perms}")
     
-    def __call__(self, current_user: Usuario = Depends(get_current_user)) -> Usuario:
+    def __call__(self, current_user: Principal = Depends(get_current_user)) -> Principal:
         """
         Verifica se o usuário atual tem as permissões necessárias.
         
         Args:
-            current_user: Usuário autenticado (injetado via dependency)
+            current_user: Principal do usuário autenticado (injetado via dependency, vem do cache)
             
         Returns:
-            Usuario: O usuário atual se tiver permissão
+            Principal: O usuário atual se tiver permissão
             
         Raises:
             HTTPException: Se o usuário não tiver permissão (403 Forbidden)
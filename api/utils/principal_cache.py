@@ -0,0 +1,151 @@
+"""
+Cache do usuário autenticado (principal).
+
+Guarda apenas o necessário para autorizar uma requisição (id, flag de ativo e
+permissões) em dois níveis:
+    - LRU local ao processo, com TTL curto (PRINCIPAL_CACHE_LOCAL_TTL_SECONDS)
+    - Redis, compartilhado entre workers (PRINCIPAL_CACHE_TTL_SECONDS)
+
+Com o cache quente, `get_current_user` não toca no banco. Qualquer alteração
+que afete a autorização (desativação, permissões, troca de senha) deve chamar
+`invalidate_principal`.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from api.utils.metrics import record_cache
+from api.utils.redis_db import RedisDB
+from api.utils.settings import settings
+
+PRINCIPAL_PREFIX = "principal:"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Usuário autenticado, reduzido ao que a autorização precisa."""
+    id: UUID
+    flg_ativo: bool
+    permissoes: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": str(self.id), "flg_ativo": self.flg_ativo, "permissoes": list(self.permissoes)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Principal":
+        return cls(
+            id=UUID(data["id"]),
+            flg_ativo=bool(data["flg_ativo"]),
+            permissoes=list(data.get("permissoes") or []),
+        )
+
+
+class _LocalLRU:
+    """LRU com expiração por entrada, seguro para uso entre threads."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Principal]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, principal = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return principal
+
+    def set(self, key: str, principal: Principal) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, principal)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_local = _LocalLRU(settings.PRINCIPAL_CACHE_MAX_ENTRIES, settings.PRINCIPAL_CACHE_LOCAL_TTL_SECONDS)
+_redis: Optional[RedisDB] = None
+
+
+def _get_redis() -> Optional[RedisDB]:
+    """Retorna a conexão Redis do módulo, criada na primeira utilização."""
+    global _redis
+    if _redis is None or _redis.redis_client is None:
+        _redis = RedisDB()
+    return _redis if _redis.redis_client is not None else None
+
+
+def _key(user_id: Any) -> str:
+    return PRINCIPAL_PREFIX + str(user_id)
+
+
+def get_principal(user_id: Any) -> Optional[Principal]:
+    """
+    Busca o principal no LRU local e, em seguida, no Redis.
+
+    Args:
+        user_id: ID do usuário (sub do JWT)
+
+    Returns:
+        Principal em cache ou None se não houver entrada válida
+    """
+    key = _key(user_id)
+    principal = _local.get(key)
+    record_cache("principal_local", principal is not None)
+    if principal is not None:
+        return principal
+
+    redis_db = _get_redis()
+    if redis_db is None:
+        return None
+    data = redis_db.get_json(key)
+    record_cache("principal_redis", bool(data))
+    if not data:
+        return None
+    try:
+        principal = Principal.from_dict(data)
+    except (KeyError, ValueError, TypeError):
+        return None
+    _local.set(key, principal)
+    return principal
+
+
+def set_principal(principal: Principal) -> None:
+    """Grava o principal nos dois níveis de cache."""
+    key = _key(principal.id)
+    _local.set(key, principal)
+    redis_db = _get_redis()
+    if redis_db is not None:
+        redis_db.set_json_with_ttl(key, principal.to_dict(), settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(user_id: Any) -> None:
+    """
+    Remove o principal do cache.
+
+    Deve ser chamado sempre que flag de ativo, permissões ou senha do usuário
+    mudarem. Outros workers deixam de ver a entrada antiga no Redis imediatamente
+    e no LRU local em no máximo PRINCIPAL_CACHE_LOCAL_TTL_SECONDS.
+    """
+    key = _key(user_id)
+    _local.delete(key)
+    redis_db = _get_redis()
+    if redis_db is not None:
+        redis_db.delete_messages(key)
@@ -0,0 +1,387 @@
+"""
+Profiling sob demanda de uma requisição (apenas administradores).
+
+Um admin liga o profiling de UMA requisição com o header `X-Profile` ou o
+parâmetro `?__profile=` (nome do header em PROFILING_HEADER):
+
+    X-Profile: 1        -> profile guardado no Redis (PROFILING_TTL_SECONDS); a
+                           resposta normal ganha os headers X-Profile-Id/X-Profile-Url
+    X-Profile: inline   -> a resposta é substituída pelo próprio profile (JSON)
+
+O profile traz:
+    - amostras de pilha de todas as threads do processo (thread do event loop e
+      workers do threadpool, onde rodam os endpoints síncronos) a cada
+      PROFILING_INTERVAL_MS, no formato speedscope (https://speedscope.app);
+      `GET /api/v1/admin/profiles/{id}?format=collapsed` devolve as mesmas pilhas no
+      formato do flamegraph.pl;
+    - o log de SQL da requisição: statement, início relativo, duração, linhas e
+      a thread que executou (liga a query à pilha amostrada).
+
+Requisições concorrentes no mesmo processo também aparecem nas amostras (o
+sampler vê todas as threads); a thread que executou o SQL do log identifica a
+da requisição. Um profile por vez por processo; sem o gatilho (ou para quem não
+é admin) a requisição segue sem custo além da leitura do header.
+"""
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.utils.redis_db import get_redis_client
+from api.utils.security import principal_from_access_token
+from api.utils.settings import settings
+from api.v1._database.models import PermissaoTipo
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PREFIX = "profile:"
+PROFILE_QUERY_PARAM = "__profile"
+PROFILE_FORMATS = ("speedscope", "collapsed", "sql", "full")
+
+# Arquivos onde uma thread parada esperando trabalho fica (amostras descartadas)
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py")
+
+_profile_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Sampler
+# ---------------------------------------------------------------------------
+
+class SamplingProfiler:
+    """
+    Amostra as pilhas de todas as threads numa thread própria.
+
+    Não instrumenta chamadas (sys.setprofile): o custo é o da thread do sampler,
+    proporcional ao intervalo, e só existe enquanto o profile está ativo.
+    """
+
+    def __init__(self, interval: float, max_seconds: float, main_thread_id: int):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.main_thread_id = main_thread_id
+        self.frames: List[Dict[str, Any]] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        # thread id -> [(pilha em índices, raiz -> folha), peso da amostra (ms)]
+        self.samples: Dict[int, List[Tuple[List[int], float]]] = {}
+        self.thread_names: Dict[int, str] = {}
+        self.started = 0.0
+        self.stopped = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped = time.perf_counter()
+
+    def _frame_id(self, code) -> int:
+        chave = (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+        indice = self._frame_index.get(chave)
+        if indice is None:
+            indice = len(self.frames)
+            self._frame_index[chave] = indice
+            self.frames.append({"name": chave[0], "file": chave[1], "line": chave[2]})
+        return indice
+
+    def _run(self) -> None:
+        proprio = threading.get_ident()
+        limite = self.started + self.max_seconds
+        anterior = self.started
+        while not self._stop.wait(self.interval):
+            agora = time.perf_counter()
+            # Peso = tempo real desde a amostra anterior (o sleep pode atrasar pelo GIL)
+            peso = round((agora - anterior) * 1000, 3)
+            anterior = agora
+            if agora > limite:
+                logger.warning(f"Profiling interrompido após {self.max_seconds}s (PROFILING_MAX_SECONDS)")
+                return
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == proprio:
+                    continue
+                if thread_id != self.main_thread_id and frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                pilha = []
+                while frame is not None:
+                    pilha.append(self._frame_id(frame.f_code))
+                    frame = frame.f_back
+                pilha.reverse()
+                self.samples.setdefault(thread_id, []).append((pilha, peso))
+            for thread in threading.enumerate():
+                if thread.ident in self.samples and thread.ident not in self.thread_names:
+                    self.thread_names[thread.ident] = thread.name
+
+    def _thread_label(self, thread_id: int) -> str:
+        nome = self.thread_names.get(thread_id, str(thread_id))
+        return f"{nome} (event loop)" if thread_id == self.main_thread_id else nome
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """Perfil no formato de arquivo do speedscope (um perfil "sampled" por thread)."""
+        duracao_ms = (self.stopped - self.started) * 1000
+        profiles = []
+        # Thread do event loop primeiro; depois as que mais apareceram
+        ordem = sorted(self.samples, key=lambda t: (t != self.main_thread_id, -len(self.samples[t])))
+        for thread_id in ordem:
+            amostras = self.samples[thread_id]
+            profiles.append({
+                "type": "sampled",
+                "name": self._thread_label(thread_id),
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(duracao_ms, 3),
+                "samples": [pilha for pilha, _ in amostras],
+                "weights": [peso for _, peso in amostras],
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "bna-backend",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": profiles,
+        }
+
+
+def speedscope_to_collapsed(profile: Dict[str, Any]) -> str:
+    """Converte um perfil speedscope em pilhas colapsadas (flamegraph.pl / inferno), em ms."""
+    frames = profile["shared"]["frames"]
+    totais: Dict[str, float] = {}
+    for perfil in profile["profiles"]:
+        raiz = perfil["name"].replace(";", ",")
+        for pilha, peso in zip(perfil["samples"], perfil["weights"]):
+            nomes = [raiz] + [frames[i]["name"].replace(";", ",") for i in pilha]
+            chave = ";".join(nomes)
+            totais[chave] = totais.get(chave, 0.0) + peso
+    return "".join(f"{pilha} {max(1, round(ms))}\n" for pilha, ms in totais.items())
+
+
+# ---------------------------------------------------------------------------
+# Log de SQL por requisição
+# ---------------------------------------------------------------------------
+
+_sql_log: ContextVar[Optional[Dict[str, Any]]] = ContextVar("profiling_sql_log", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _sql_log.get() is not None and context is not None:
+        context._profiling_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = _sql_log.get()
+    inicio = getattr(context, "_profiling_started_at", None)
+    if log is None or inicio is None:
+        return
+    fim = time.perf_counter()
+    log["statements"].append({
+        "sql": " ".join(statement.split())[:settings.PROFILING_SQL_MAX_CHARS],
+        "start_ms": round((inicio - log["started"]) * 1000, 3),
+        "duration_ms": round((fim - inicio) * 1000, 3),
+        "rows": getattr(cursor, "rowcount", None),
+        "executemany": executemany,
+        "thread": threading.current_thread().name,
+    })
+
+
+def install_profiling_hooks(engine: Engine) -> None:
+    """Registra o log de SQL do profiling no engine da API (apenas com PROFILING_ENABLED)."""
+    if not settings.PROFILING_ENABLED:
+        return
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------------------------------------------------------
+# Armazenamento
+# ---------------------------------------------------------------------------
+
+def _store_profile(profile: Dict[str, Any]) -> bool:
+    client = get_redis_client()
+    if client is None:
+        return False
+    try:
+        client.setex(
+            PROFILE_PREFIX + profile["id"],
+            settings.PROFILING_TTL_SECONDS,
+            json.dumps(profile, ensure_ascii=False, default=str),
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Erro ao guardar o profile {profile['id']}: {e}")
+        return False
+
+
+def load_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    """Profile guardado no Redis (None se expirou ou não existe)."""
+    client = get_redis_client()
+    if client is None:
+        return None
+    raw = client.get(PROFILE_PREFIX + profile_id)
+    return json.loads(raw) if raw else None
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+def _trigger(scope: Scope) -> Optional[str]:
+    """Modo pedido pela requisição ("store" ou "inline"), ou None."""
+    header = settings.PROFILING_HEADER.lower().encode("latin-1")
+    valor = None
+    for nome, conteudo in scope.get("headers", ()):
+        if nome == header:
+            valor = conteudo.decode("latin-1")
+            break
+    query_string = scope.get("query_string", b"")
+    if valor is None and PROFILE_QUERY_PARAM.encode() in query_string:
+        valor = (parse_qs(query_string.decode("latin-1")).get(PROFILE_QUERY_PARAM) or [None])[0]
+    if not valor or valor.strip().lower() in ("0", "false", "no"):
+        return None
+    return "inline" if valor.strip().lower() == "inline" else "store"
+
+
+def _bearer_token(scope: Scope) -> Optional[str]:
+    for nome, conteudo in scope.get("headers", ()):
+        if nome == b"authorization":
+            tipo, _, token = conteudo.decode("latin-1").partition(" ")
+            return token.strip() if tipo.lower() == "bearer" else None
+    return None
+
+
+def _is_admin(token: Optional[str]) -> bool:
+    """Confere o token e a permissão ADMIN (cache do principal; banco só em miss)."""
+    principal = principal_from_access_token(token)
+    return principal is not None and principal.flg_ativo and PermissaoTipo.ADMIN.value in principal.permissoes
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI: profiling de uma requisição quando um admin pede.
+
+    Fica por fora dos demais middlewares para medir a requisição inteira.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        modo = _trigger(scope)
+        if modo is None:
+            await self.app(scope, receive, send)
+            return
+        if not await asyncio.to_thread(_is_admin, _bearer_token(scope)):
+            # Sem revelar nada a quem não é admin: segue como uma requisição comum
+            await self.app(scope, receive, send)
+            return
+        if not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, _send_with_headers(send, {"X-Profile": "busy"}))
+            return
+        try:
+            await self._profile(scope, receive, send, modo)
+        finally:
+            _profile_lock.release()
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, modo: str) -> None:
+        profile_id = uuid.uuid4().hex
+        nome = f"{scope['method']} {scope['path']}"
+        if modo == "store" and await asyncio.to_thread(get_redis_client) is None:
+            modo = "inline"
+        status_code = 500
+        corpo = 0
+
+        async def observe(message: Message) -> None:
+            nonlocal status_code, corpo
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                corpo += len(message.get("body", b""))
+            if modo == "store":
+                await destino(message)
+
+        # store: a resposta segue normalmente (em streaming), com o id do profile
+        destino = _send_with_headers(send, {
+            "X-Profile-Id": profile_id,
+            "X-Profile-Url": f"/api/v1/admin/profiles/{profile_id}",
+        })
+
+        sql = {"started": time.perf_counter(), "statements": []}
+        token = _sql_log.set(sql)
+        profiler = SamplingProfiler(
+            interval=settings.PROFILING_INTERVAL_MS / 1000,
+            max_seconds=settings.PROFILING_MAX_SECONDS,
+            main_thread_id=threading.get_ident(),
+        )
+        profiler.start()
+        try:
+            await self.app(scope, receive, observe)
+        finally:
+            profiler.stop()
+            _sql_log.reset(token)
+
+        statements = sql["statements"]
+        profile = {
+            "id": profile_id,
+            "request": nome,
+            "query_string": scope.get("query_string", b"").decode("latin-1"),
+            "status_code": status_code,
+            "response_bytes": corpo,
+            "duration_ms": round((profiler.stopped - profiler.started) * 1000, 3),
+            "interval_ms": settings.PROFILING_INTERVAL_MS,
+            "sql_count": len(statements),
+            "sql_total_ms": round(sum(s["duration_ms"] for s in statements), 3),
+            "sql": statements,
+            "speedscope": profiler.to_speedscope(nome),
+        }
+        logger.info(
+            f"Profile {profile_id} de {nome}: {profile['duration_ms']} ms, "
+            f"{profile['sql_count']} statements ({profile['sql_total_ms']} ms de SQL)"
+        )
+
+        if modo == "store":
+            await asyncio.to_thread(_store_profile, profile)
+            return
+
+        # inline (ou Redis indisponível): o profile substitui a resposta
+        payload = json.dumps(profile, ensure_ascii=False, default=str).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                (b"x-profile-id", profile_id.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+
+def _send_with_headers(send: Send, headers: Dict[str, str]) -> Send:
+    """Envolve `send` adicionando headers ao http.response.start."""
+    extras = [(nome.lower().encode("latin-1"), valor.encode("latin-1")) for nome, valor in headers.items()]
+
+    async def wrapper(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": list(message.get("headers", [])) + extras}
+        await send(message)
+
+    return wrapper
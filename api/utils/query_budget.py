@@ -0,0 +1,112 @@
+"""
+Detector de N+1 / over-fetch por requisição (modo de teste).
+
+Quando QUERY_BUDGET_ENABLED=true:
+    - um listener no engine conta cada statement executado durante a requisição;
+    - o middleware compara o total com o orçamento (padrão ou declarado no endpoint
+      via `query_budget(...)`) e detecta o mesmo SQL repetido (padrão N+1);
+    - se o orçamento estourar a requisição falha com 500 e a lista de statements.
+
+Desligado (padrão), nada é registrado e o custo é zero.
+
+Uso nos endpoints:
+    @router.get("/", dependencies=[Depends(query_budget(5))])
+"""
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from api.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StatementBudget:
+    """Statements executados na requisição atual e limites aplicáveis."""
+    max_statements: int
+    max_repeats: int
+    statements: List[str] = field(default_factory=list)
+
+    def violations(self) -> List[str]:
+        problems = []
+        if len(self.statements) > self.max_statements:
+            problems.append(f"{len(self.statements)} statements (orçamento: {self.max_statements})")
+        for sql, count in Counter(self.statements).items():
+            if count > self.max_repeats:
+                problems.append(f"possível N+1: statement repetido {count}x: {sql[:200]}")
+        return problems
+
+
+_current_budget: ContextVar[Optional[StatementBudget]] = ContextVar("query_budget", default=None)
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.statements.append(" ".join(statement.split()))
+
+
+def install_query_counter(engine: Engine) -> None:
+    """Registra o contador de statements no engine (apenas com QUERY_BUDGET_ENABLED)."""
+    if not settings.QUERY_BUDGET_ENABLED:
+        return
+    if not event.contains(engine, "before_cursor_execute", _count_statement):
+        event.listen(engine, "before_cursor_execute", _count_statement)
+
+
+def query_budget(max_statements: int, max_repeats: Optional[int] = None) -> Callable:
+    """
+    Dependency que declara o orçamento de statements de um endpoint.
+
+    Args:
+        max_statements: Número máximo de statements na requisição
+        max_repeats: Quantas vezes o mesmo SQL pode se repetir (padrão: QUERY_BUDGET_MAX_REPEATS)
+    """
+    async def _apply_budget() -> None:
+        budget = _current_budget.get()
+        if budget is None:
+            return
+        budget.max_statements = max_statements
+        if max_repeats is not None:
+            budget.max_repeats = max_repeats
+
+    return _apply_budget
+
+
+class QueryBudgetMiddleware(BaseHTTPMiddleware):
+    """Abre um orçamento por requisição e falha a resposta se ele for excedido."""
+
+    async def dispatch(self, request: Request, call_next):
+        budget = StatementBudget(
+            max_statements=settings.QUERY_BUDGET_MAX_STATEMENTS,
+            max_repeats=settings.QUERY_BUDGET_MAX_REPEATS,
+        )
+        token = _current_budget.set(budget)
+        try:
+            response = await call_next(request)
+        finally:
+            _current_budget.reset(token)
+
+        problems = budget.violations()
+        if problems:
+            logger.error(f"Orçamento de queries excedido em {request.method} {request.url.path}: {problems}")
+            return JSONResponse(
+                status_code=500,
+                content={
+                    "error": "Orçamento de queries excedido",
+                    "problems": problems,
+                    "statements": budget.statements,
+                },
+            )
+
+        response.headers["X-DB-Statements"] = str(len(budget.statements))
+        return response
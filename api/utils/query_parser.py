@@ -1,6 +1,6 @@
 import re
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional
 from starlette.datastructures import QueryParams
 
 logger = logging.getLogger(__name__)
@@ -95,4 +95,26 @@ if __name__ == '__main__':
     print("\n--- Teste 6 ---")
     print(parse_filters(test_params_6))
     # Esperado: {}
-'''
\ No newline at end of file
+'''
+
+def parse_include(include: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Converte o parâmetro `include` em lista, aceitando apenas os relacionamentos
+    declarados pelo endpoint.
+
+    Relacionamentos não são carregados por padrão (lazy="raise_on_sql" nos modelos);
+    cada endpoint declara explicitamente o que pode ser incluído.
+
+    Raises:
+        ValueError: Se algum relacionamento não estiver em `allowed`
+    """
+    if not include:
+        return None
+    requested = [item.strip() for item in include.split(',') if item.strip()]
+    invalid = [item for item in requested if item not in allowed]
+    if invalid:
+        raise ValueError(
+            f"Relacionamento(s) não permitido(s) em include: {', '.join(invalid)}. "
+            f"Permitidos: {', '.join(sorted(allowed)) or 'nenhum'}"
+        )
+    return list(dict.fromkeys(requested)) or None
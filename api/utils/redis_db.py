@@ -1,9 +1,13 @@
 import os
 import json
+import asyncio
+import threading
+import weakref
 from typing import List, Optional
 
 from dotenv import load_dotenv
 import redis
+import redis.asyncio as aioredis
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -11,26 +15,77 @@ load_dotenv()
 CAD_PREFIX = "cadastro:"
 AGD_PREFIX = "agendamento:" 
 
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+
+# Clientes compartilhados pelo processo (um pool de conexões, não uma conexão por chamada)
+_sync_client: Optional[redis.Redis] = None
+_sync_lock = threading.Lock()
+# redis.asyncio prende as conexões ao event loop que as criou: um cliente por loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+
+
+def get_redis_client() -> Optional[redis.Redis]:
+    """
+    Retorna o cliente Redis síncrono do processo, apoiado em um ConnectionPool.
+
+    O pool é criado (e testado com PING) apenas na primeira chamada.
+    """
+    global _sync_client
+    if _sync_client is not None:
+        return _sync_client
+
+    with _sync_lock:
+        if _sync_client is not None:
+            return _sync_client
+        redis_url = os.getenv('REDIS_URL')
+        if not redis_url:
+            print("❌ REDIS_URL não encontrada nas variáveis de ambiente")
+            return None
+        try:
+            pool = redis.ConnectionPool.from_url(
+                redis_url,
+                decode_responses=True,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                health_check_interval=30,
+            )
+            client = redis.Redis(connection_pool=pool)
+            client.ping()
+            _sync_client = client
+        except Exception as e:
+            print(f"❌ Erro ao conectar ao Redis: {e}")
+            return None
+    return _sync_client
+
+
+def get_async_redis_client() -> Optional[aioredis.Redis]:
+    """Retorna o cliente redis.asyncio (com pool) do event loop atual."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is not None:
+        return client
+
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        print("❌ REDIS_URL não encontrada nas variáveis de ambiente")
+        return None
+    client = aioredis.from_url(
+        redis_url,
+        decode_responses=True,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        health_check_interval=30,
+    )
+    _async_clients[loop] = client
+    return client
+
+
 class RedisDB:
     def __init__(self):
         self.redis_client = None
         self.connect()
     
     def connect(self):
-        try:
-            redis_url = os.getenv('REDIS_URL')
-            if not redis_url:
-                print("❌ REDIS_URL não encontrada nas variáveis de ambiente")
-                return
-                
-            self.redis_client = redis.from_url(redis_url, decode_responses=True)
-            
-            # Testa a conexão
-            self.redis_client.ping()
-            
-        except Exception as e:
-            print(f"❌ Erro ao conectar ao Redis: {e}")
-            self.redis_client = None
+        """Usa o cliente compartilhado do processo (sem abrir conexão nova)."""
+        self.redis_client = get_redis_client()
     
     def add_message(self, telefone: str, mensagem: str):
         """Adicionar mensagem ao final da lista de mensagens do telefone"""
@@ -40,11 +95,8 @@ class RedisDB:
                 print("❌ Conexão Redis não está ativa")
                 return False
             
-            # Testa a conexão
-            self.redis_client.ping()
-            
             # Adiciona a mensagem ao final da lista
-            result = self.redis_client.rpush(telefone, mensagem)
+            self.redis_client.rpush(telefone, mensagem)
 
             return True
         except Exception as e:
@@ -75,10 +127,31 @@ class RedisDB:
             print(f"Erro ao deletar mensagens: {e}")
             return False
     
+    def drain_messages(self, telefone: str) -> List[str]:
+        """
+        Ler e apagar as mensagens do telefone de forma atômica (LRANGE + DEL em um MULTI).
+
+        Uma única ida ao Redis; mensagens que chegarem depois entram em uma lista nova.
+        """
+        try:
+            if not self.redis_client:
+                print("❌ Conexão Redis não está ativa")
+                return []
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.lrange(telefone, 0, -1)
+            pipe.delete(telefone)
+            mensagens, _ = pipe.execute()
+            return mensagens if mensagens else []
+        except Exception as e:
+            print(f"❌ Erro ao drenar mensagens: {e}")
+            return []
+
     def close_connections(self):
-        """Fechar conexões"""
-        if self.redis_client:
-            self.redis_client.close()
+        """
+        Mantido por compatibilidade: o cliente é compartilhado pelo processo e
+        devolve as conexões ao pool sozinho, então não há nada a fechar aqui.
+        """
+        return None
     
     def set_json_with_ttl(self, key: str, value: dict, ttl_seconds: int) -> bool:
         try:
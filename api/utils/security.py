@@ -1,4 +1,6 @@
-from typing import Annotated
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Optional, Tuple
 import jwt
 import pytz
 
@@ -10,13 +12,29 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 from api.v1._database.models import Usuario
 
-from api.utils.db_services import get_db
+from api.utils.db_services import SessionLocal, get_db
+from api.utils.principal_cache import Principal, get_principal, set_principal
 from api.utils.settings import settings
 
 tz = pytz.timezone('America/Sao_Paulo')
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/conta/login/oauth")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min_rounds = default_rounds: hashes com custo menor que o configurado são
+# marcados como desatualizados e refeitos no próximo login (verify_and_update)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# Pool dedicado e limitado: bcrypt é CPU-bound e não pode rodar no event loop
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+# Limita a fila do pool: sem isso uma rajada enfileira hashes sem limite no executor
+_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_IN_FLIGHT)
     
 T_OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]    
 
@@ -26,6 +44,38 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def _run_hash(func, *args):
+    """
+    Executa `func` no pool de hash, recusando com 429 quando já há
+    PASSWORD_HASH_MAX_IN_FLIGHT hashes em andamento (sem esperar na fila).
+    """
+    if _hash_slots.locked():
+        raise HTTPException(
+            status_code=429,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+    async with _hash_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+
+async def averify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha no pool de hash, sem bloquear o event loop.
+
+    Returns:
+        (válida, novo_hash): novo_hash vem preenchido quando o hash armazenado usa
+        parâmetros antigos (ex.: BCRYPT_ROUNDS aumentou) e deve ser regravado.
+
+    Raises:
+        HTTPException: 429 se o pool de hash estiver saturado
+    """
+    return await _run_hash(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def aget_password_hash(password: str) -> str:
+    """Gera o hash da senha no pool de hash, sem bloquear o event loop (429 se saturado)."""
+    return await _run_hash(pwd_context.hash, password)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(tz) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -90,20 +140,83 @@ def verify_refresh_token(token: str):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def authenticate_user(
+def user_id_from_access_token(token: Optional[str]) -> Optional[str]:
+    """
+    Extrai o user_id de um access token válido.
+
+    Para conexões sem header Authorization (ex.: WebSocket, que recebe o token por
+    query string). Retorna None se o token for inválido, expirado ou não for access.
+    """
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+    if payload.get("type") != "access":
+        return None
+    return payload.get("sub")
+
+def load_principal(db: Session, user_id: str) -> Optional[Principal]:
+    """Principal do usuário: cache primeiro; em miss, só id/flg_ativo/permissoes do banco."""
+    principal = get_principal(user_id)
+    if principal is not None:
+        return principal
+
+    row = (
+        db.query(Usuario.id, Usuario.flg_ativo, Usuario.permissoes)
+        .filter(Usuario.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+
+    principal = Principal(id=row.id, flg_ativo=bool(row.flg_ativo), permissoes=list(row.permissoes or []))
+    set_principal(principal)
+    return principal
+
+
+def principal_from_access_token(token: Optional[str]) -> Optional[Principal]:
+    """
+    Principal do access token fora das dependencies do FastAPI (middleware, WebSocket).
+
+    Abre uma sessão curta só em cache miss. Síncrono: em código async, chamar no threadpool.
+    """
+    user_id = user_id_from_access_token(token)
+    if user_id is None:
+        return None
+    principal = get_principal(user_id)
+    if principal is not None:
+        return principal
+    db = SessionLocal()
+    try:
+        return load_principal(db, user_id)
+    finally:
+        db.close()
+
+async def authenticate_user(
     db: Session, 
     email: str, senha: str):
+    """Retorna o usuário se email/senha conferem (bcrypt no pool de hash), senão False."""
     usuario = db.query(Usuario).filter(Usuario.email == email).first()
     if not usuario:
         return False
-    if not verify_password(senha, usuario.senha):
+    valid, _ = await averify_password(senha, usuario.senha)
+    if not valid:
         return False
     return usuario
 
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db),
-):
+) -> Principal:
+    """
+    Resolve o usuário autenticado a partir do access token.
+
+    Retorna um `Principal` (id, flg_ativo, permissoes) vindo do cache; o banco só
+    é consultado em cache miss, e apenas nessas três colunas (sem relacionamentos).
+    Endpoints que precisam do objeto Usuario completo devem usar `get_current_usuario`.
+    """
     credentials_exception = HTTPException(
         status_code=401,
         detail="Credenciais inválidas",
@@ -122,7 +235,25 @@ def get_current_user(
     except jwt.PyJWTError:
         raise credentials_exception
     
-    usuario = db.query(Usuario).filter(Usuario.id == user_id).first()
-    if usuario is None:
+    principal = load_principal(db, user_id)
+    if principal is None:
         raise credentials_exception
+    return principal
+
+def get_current_usuario(
+    principal: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> Usuario:
+    """
+    Carrega o objeto Usuario completo do usuário autenticado.
+
+    Usar apenas em endpoints que devolvem dados do próprio usuário (ex.: /me, /perfil).
+    """
+    usuario = db.query(Usuario).filter(Usuario.id == principal.id).first()
+    if usuario is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Credenciais inválidas",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return usuario
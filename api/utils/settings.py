@@ -18,12 +18,131 @@ class Settings(BaseSettings):
     SMTP_USER: str
     SMTP_PASSWORD: str
     SMTP_FRONTEND_URL: str
+    SMTP_USE_TLS: bool = True
+    SMTP_POOL_SIZE: int = 2
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+    SMTP_IDLE_TIMEOUT_SECONDS: float = 60.0
+    SMTP_MESSAGES_PER_MINUTE: int = 120
+    SMTP_BULK_PROGRESS_EVERY: int = 25
+    SMTP_BULK_PROGRESS_INTERVAL_SECONDS: float = 2.0
+    EMAIL_TEMPLATES_AUTO_RELOAD: bool = False  # True só em desenvolvimento
+
+    # Outbox de e-mails
+    EMAIL_OUTBOX_BATCH_SIZE: int = 100
+    EMAIL_OUTBOX_MAX_BATCHES: int = 10
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 5
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 300
+    EMAIL_OUTBOX_POLL_SECONDS: float = 10.0
+    EMAIL_OUTBOX_KICK_SECONDS: int = 1
     
     # Celery
     #CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     #CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
+
+    # Compressão de respostas
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Hash de senha / login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    # Hashes em andamento (executando + na fila do pool); acima disso, 429
+    PASSWORD_HASH_MAX_IN_FLIGHT: int = 16
+    LOGIN_MAX_ATTEMPTS_PER_ACCOUNT: int = 5
+    LOGIN_MAX_ATTEMPTS_PER_IP: int = 20
+    LOGIN_ATTEMPT_WINDOW_SECONDS: int = 900
+
+    # Agregação (debounce) de mensagens do WhatsApp
+    # Carrega as tasks do agente (fila "ia") no Celery; só o worker dessa fila
+    # liga, pois elas exigem Evolution API e langchain
+    WHATSAPP_AGENT_ENABLED: bool = False
+    WHATSAPP_DEBOUNCE_SECONDS: float = 4.0
+    WHATSAPP_DEBOUNCE_MAX_SECONDS: float = 20.0
+    WHATSAPP_LOCK_TIMEOUT_SECONDS: int = 120
+    # Falhas da LLM/envio por janela (esperas de lock e de janela não contam)
+    WHATSAPP_REPLY_MAX_ATTEMPTS: int = 3
+    WHATSAPP_REPLY_RETRY_SECONDS: float = 10.0
+
+    # Memória de conversa do agente
+    MEMORIA_TURNOS_RECENTES: int = 6
+    MEMORIA_MAX_TOKENS: int = 600
+    MEMORIA_RESUMO_MAX_TOKENS: int = 250
+    MEMORIA_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # Cache de extração de mídia (áudio, imagem, PDF)
+    MEDIA_CACHE_ENABLED: bool = True
+    MEDIA_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    MEDIA_CACHE_MAX_ENTRIES: int = 50000
+    MEDIA_CACHE_MAX_TEXT_CHARS: int = 50000
+
+    # Extração de texto de PDF
+    PDF_EXTRACT_WORKERS: int = 4
+    PDF_PAGES_PER_TASK: int = 8
+    PDF_MESSAGE_CHAR_BUDGET: int = 12000
+    PDF_RAG_CHAR_BUDGET: int = 2_000_000
+    PDF_RAG_MAX_BYTES: int = 50 * 1024 * 1024
+    PDF_RAG_CONNECT_TIMEOUT: float = 5.0
+    PDF_RAG_READ_TIMEOUT: float = 60.0
+
+    # Thumbnails de PDF
+    PDF_THUMBNAIL_WORKERS: int = 2
+    PDF_THUMBNAIL_MAX_BYTES: int = 25 * 1024 * 1024
+    PDF_THUMBNAIL_CONNECT_TIMEOUT: float = 5.0
+    PDF_THUMBNAIL_READ_TIMEOUT: float = 30.0
+    PDF_THUMBNAIL_MIN_DPI: int = 20
+    PDF_THUMBNAIL_FALLBACK_DPI: int = 72
+
+    # WebSocket (push entre processos via Redis pub/sub)
+    WS_QUEUE_SIZE: int = 100
+    WS_MAX_DROPPED: int = 500
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0
+    WS_RECONNECT_SECONDS: float = 2.0
+
+    # Métricas Prometheus (PROMETHEUS_MULTIPROC_DIR no ambiente liga o modo multiprocesso)
+    METRICS_ENABLED: bool = True
+    CELERY_METRICS_PORT: int = 9808
+
+    # Tracing (OpenTelemetry): exporter "otlp" (coletor OTLP/HTTP) ou "file" (JSON lines)
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "otlp"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_SAMPLE_RATE: float = 0.1
+
+    # Profiling sob demanda (header X-Profile ou ?__profile=, apenas admins)
+    PROFILING_ENABLED: bool = True
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_MAX_SECONDS: float = 60.0
+    PROFILING_TTL_SECONDS: int = 3600
+    PROFILING_SQL_MAX_CHARS: int = 4000
+
+    # Queries lentas (tabela slow_query) com EXPLAIN (ANALYZE, BUFFERS) por amostragem
+    SLOW_QUERY_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 500.0
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.2
+    SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS: int = 600
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: int = 30000
+    SLOW_QUERY_QUEUE_SIZE: int = 1000
+    SLOW_QUERY_RETENTION_DAYS: int = 14
+
+    # Progresso do processamento de WebLinks (long-poll / SSE)
+    WEBLINK_STATUS_MAX_WAIT_SECONDS: float = 30.0
+    WEBLINK_SSE_HEARTBEAT_SECONDS: float = 15.0
+    WEBLINK_SSE_MAX_SECONDS: float = 600.0
+
+    # Cache do usuário autenticado (principal)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_LOCAL_TTL_SECONDS: int = 5
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 1024
+
+    # Detector de N+1 / over-fetch (ligar apenas em testes)
+    QUERY_BUDGET_ENABLED: bool = False
+    QUERY_BUDGET_MAX_STATEMENTS: int = 10
+    QUERY_BUDGET_MAX_REPEATS: int = 3
     
     
 settings = Settings()
\ No newline at end of file
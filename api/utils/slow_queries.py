@@ -0,0 +1,383 @@
+"""
+Captura de queries lentas com EXPLAIN automático.
+
+Um listener no engine mede cada statement; os que passam de
+SLOW_QUERY_THRESHOLD_MS vão para a tabela `slow_query` com:
+    - SQL normalizado (literais e parâmetros viram `?`, listas IN colapsadas) e
+      o fingerprint (sha1) que agrupa execuções do mesmo formato;
+    - formato dos parâmetros (tipo e tamanho, nunca os valores);
+    - duração, linhas e origem ("GET /api/v1/web_links/" ou o nome da task);
+    - por amostragem (SLOW_QUERY_EXPLAIN_SAMPLE_RATE, no máximo uma vez por
+      fingerprint a cada SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS), o plano do
+      `EXPLAIN (ANALYZE, BUFFERS)` reexecutado com os mesmos parâmetros.
+
+Nada disso acontece no caminho da requisição: o listener só enfileira e uma
+thread do processo grava (e roda o EXPLAIN) numa conexão própria. O ANALYZE
+reexecuta a query, então só é usado em SELECT sem FOR UPDATE e sempre dentro de
+uma transação desfeita no final; os demais statements recebem o EXPLAIN simples.
+
+`top_offenders` agrega a tabela para `GET /api/v1/admin/slow-queries`.
+"""
+import hashlib
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import pytz
+from sqlalchemy import delete, event, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from api.utils.settings import settings
+from api.v1._database.models import SlowQuery
+
+logger = logging.getLogger(__name__)
+tz = pytz.timezone('America/Sao_Paulo')
+
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_DML_RE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b")
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL sem valores: parâmetros, strings e números viram `?`; listas IN viram `(?, ...)`."""
+    sql = " ".join(statement.split())
+    sql = _PARAM_RE.sub("?", sql)
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    return _LIST_RE.sub("(?, ...)", sql)
+
+
+def fingerprint(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.encode("utf-8")).hexdigest()
+
+
+def _shape(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return f"{type(value).__name__}({len(value)})"
+    if isinstance(value, (list, tuple, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def param_shapes(parameters: Any, executemany: bool = False) -> Any:
+    """Tipo/tamanho de cada parâmetro (ex.: {"context": "str(38)", "top_k": "int"})."""
+    if executemany:
+        linhas = list(parameters or [])
+        return {"executemany": len(linhas), "row": param_shapes(linhas[0]) if linhas else None}
+    if isinstance(parameters, dict):
+        return {nome: _shape(valor) for nome, valor in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_shape(valor) for valor in parameters]
+    return None
+
+
+def _can_analyze(statement: str) -> bool:
+    """ANALYZE executa a query: só SELECT/WITH de leitura, sem locks de linha."""
+    palavras = statement.split(None, 1)
+    return bool(palavras) and palavras[0].upper() in ("SELECT", "WITH") and not _DML_RE.search(statement.upper())
+
+
+# ---------------------------------------------------------------------------
+# Origem (endpoint ou task)
+# ---------------------------------------------------------------------------
+
+_current_scope: ContextVar[Optional[Scope]] = ContextVar("slow_query_scope", default=None)
+
+
+class SlowQueryContextMiddleware:
+    """Middleware ASGI: guarda o scope da requisição para identificar o endpoint de uma query lenta."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+
+
+def _origin() -> Optional[str]:
+    scope = _current_scope.get()
+    if scope is not None:
+        # O router grava a rota no próprio scope: o template, não a URL com ids
+        route = getattr(scope.get("route"), "path", None) or scope.get("path")
+        return f"{scope.get('method')} {route}"[:255]
+    from celery import current_task
+
+    if current_task and getattr(current_task, "name", None):
+        return f"task {current_task.name}"[:255]
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Listener e gravação em segundo plano
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _Capture:
+    statement: str
+    parameters: Any
+    executemany: bool
+    duration_ms: float
+    rows: Optional[int]
+    origin: Optional[str]
+    created_at: datetime
+
+
+_engine: Optional[Engine] = None
+_queue: "queue.Queue[_Capture]" = queue.Queue(maxsize=1)
+_writer_pid: Optional[int] = None
+_writer_lock = threading.Lock()
+_writer_thread = threading.local()
+_last_explain: Dict[str, float] = {}
+_last_purge = 0.0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_slow_query_started_at", None)
+    if inicio is None:
+        return
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    if duracao_ms < settings.SLOW_QUERY_THRESHOLD_MS or getattr(_writer_thread, "active", False):
+        return
+    _ensure_writer()
+    try:
+        _queue.put_nowait(_Capture(
+            statement=statement,
+            parameters=parameters,
+            executemany=executemany,
+            duration_ms=round(duracao_ms, 3),
+            rows=getattr(cursor, "rowcount", None),
+            origin=_origin(),
+            created_at=datetime.now(tz),
+        ))
+    except queue.Full:
+        logger.warning(f"Fila de queries lentas cheia; descartando statement de {duracao_ms:.0f} ms")
+
+
+def install_slow_query_capture(engine: Engine) -> None:
+    """Registra a captura de queries lentas no engine (apenas com SLOW_QUERY_ENABLED)."""
+    global _engine
+    if not settings.SLOW_QUERY_ENABLED:
+        return
+    _engine = engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _ensure_writer() -> None:
+    """Sobe a thread de gravação deste processo (de novo após um fork, ex.: workers do Celery)."""
+    global _queue, _writer_pid
+    if _writer_pid == os.getpid():
+        return
+    with _writer_lock:
+        if _writer_pid == os.getpid():
+            return
+        _queue = queue.Queue(maxsize=settings.SLOW_QUERY_QUEUE_SIZE)
+        threading.Thread(target=_writer_loop, name="slow-query-writer", daemon=True).start()
+        _writer_pid = os.getpid()
+
+
+def _writer_loop() -> None:
+    # Os statements da própria thread (EXPLAIN, INSERT) não são capturados
+    _writer_thread.active = True
+    while True:
+        capture = _queue.get()
+        try:
+            _persist(capture)
+        except Exception as e:
+            logger.error(f"Erro ao gravar query lenta: {e}")
+
+
+def _should_explain(chave: str, capture: _Capture) -> bool:
+    if capture.executemany or random.random() >= settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        return False
+    agora = time.monotonic()
+    if agora - _last_explain.get(chave, float("-inf")) < settings.SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS:
+        return False
+    _last_explain[chave] = agora
+    return True
+
+
+def _explain(conn, capture: _Capture) -> Any:
+    opcoes = "ANALYZE, BUFFERS, FORMAT JSON" if _can_analyze(capture.statement) else "FORMAT JSON"
+    trans = conn.begin()
+    try:
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+        plano = conn.exec_driver_sql(f"EXPLAIN ({opcoes}) {capture.statement}", capture.parameters).scalar()
+        return plano[0] if isinstance(plano, list) and plano else plano
+    except Exception as e:
+        return {"error": str(e)[:500]}
+    finally:
+        # Desfaz sempre: o ANALYZE roda a query de verdade
+        trans.rollback()
+
+
+def _persist(capture: _Capture) -> None:
+    global _last_purge
+    sql = normalize_sql(capture.statement)
+    chave = fingerprint(sql)
+    with _engine.connect() as conn:
+        plano = _explain(conn, capture) if _should_explain(chave, capture) else None
+        with conn.begin():
+            conn.execute(insert(SlowQuery).values(
+                created_at=capture.created_at,
+                fingerprint=chave,
+                sql=sql,
+                param_shapes=param_shapes(capture.parameters, capture.executemany),
+                duration_ms=capture.duration_ms,
+                rows=capture.rows if capture.rows is not None and capture.rows >= 0 else None,
+                origin=capture.origin,
+                explain_plan=plano,
+            ))
+            # Retenção: no máximo uma limpeza por hora por processo
+            if time.monotonic() - _last_purge > 3600:
+                _last_purge = time.monotonic()
+                limite = datetime.now(tz) - timedelta(days=settings.SLOW_QUERY_RETENTION_DAYS)
+                conn.execute(delete(SlowQuery).where(SlowQuery.created_at < limite))
+    logger.warning(f"Query lenta ({capture.duration_ms:.0f} ms, {capture.origin}): {sql[:300]}")
+
+
+# ---------------------------------------------------------------------------
+# Relatório
+# ---------------------------------------------------------------------------
+
+OFFENDER_ORDER = {
+    "total": "total_ms",
+    "p95": "p95_ms",
+    "max": "max_ms",
+    "count": "calls",
+}
+
+
+def _plan_summary(plano: Any) -> Optional[Dict[str, Any]]:
+    """Resumo do plano JSON: tempo de execução, seq scans e blocos lidos do disco."""
+    if not isinstance(plano, dict) or "Plan" not in plano:
+        return None
+    seq_scans: List[str] = []
+    pilha = [plano["Plan"]]
+    while pilha:
+        no = pilha.pop()
+        if no.get("Node Type") == "Seq Scan" and no.get("Relation Name"):
+            seq_scans.append(no["Relation Name"])
+        pilha.extend(no.get("Plans", ()))
+    raiz = plano["Plan"]
+    return {
+        "execution_ms": plano.get("Execution Time"),
+        "node_type": raiz.get("Node Type"),
+        "seq_scans": sorted(set(seq_scans)),
+        "shared_read_blocks": raiz.get("Shared Read Blocks"),
+    }
+
+
+def top_offenders(
+    db: Session,
+    since: datetime,
+    limit: int = 20,
+    order_by: str = "total",
+    origin: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fingerprints mais custosos desde `since`.
+
+    Args:
+        db: Sessão do banco
+        since: Início da janela
+        limit: Quantidade de fingerprints
+        order_by: total, p95, max ou count
+        origin: Restringe a uma origem (ex.: "GET /api/v1/web_links/")
+
+    Returns:
+        Lista com sql, calls, total/avg/p95/max (ms), origens, último formato de
+        parâmetros e o último plano capturado (com resumo)
+    """
+    if order_by not in OFFENDER_ORDER:
+        raise ValueError(f"order_by deve ser um de {', '.join(OFFENDER_ORDER)}")
+    coluna = OFFENDER_ORDER[order_by]
+    params: Dict[str, Any] = {"since": since, "limit": limit}
+    filtro_origem = ""
+    if origin:
+        filtro_origem = "AND s.origin = :origin"
+        params["origin"] = origin
+
+    rows = db.execute(
+        text(f"""
+            WITH agg AS (
+                SELECT s.fingerprint,
+                       min(s.sql) AS sql,
+                       count(*) AS calls,
+                       sum(s.duration_ms) AS total_ms,
+                       avg(s.duration_ms) AS avg_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY s.duration_ms) AS p95_ms,
+                       max(s.duration_ms) AS max_ms,
+                       max(s.created_at) AS last_seen,
+                       array_agg(DISTINCT s.origin) FILTER (WHERE s.origin IS NOT NULL) AS origins
+                FROM slow_query s
+                WHERE s.created_at >= :since {filtro_origem}
+                GROUP BY s.fingerprint
+                ORDER BY {coluna} DESC
+                LIMIT :limit
+            )
+            SELECT agg.*,
+                   ultimo.param_shapes,
+                   plano.explain_plan,
+                   plano.created_at AS explained_at
+            FROM agg
+            LEFT JOIN LATERAL (
+                SELECT param_shapes FROM slow_query
+                WHERE fingerprint = agg.fingerprint
+                ORDER BY created_at DESC LIMIT 1
+            ) ultimo ON true
+            LEFT JOIN LATERAL (
+                SELECT explain_plan, created_at FROM slow_query
+                WHERE fingerprint = agg.fingerprint AND explain_plan IS NOT NULL
+                ORDER BY created_at DESC LIMIT 1
+            ) plano ON true
+            ORDER BY {coluna} DESC
+        """),
+        params,
+    ).mappings().all()
+
+    return [
+        {
+            "fingerprint": row["fingerprint"],
+            "sql": row["sql"],
+            "calls": row["calls"],
+            "total_ms": round(float(row["total_ms"]), 1),
+            "avg_ms": round(float(row["avg_ms"]), 1),
+            "p95_ms": round(float(row["p95_ms"]), 1),
+            "max_ms": round(float(row["max_ms"]), 1),
+            "last_seen": row["last_seen"],
+            "origins": list(row["origins"] or []),
+            "param_shapes": row["param_shapes"],
+            "plan_summary": _plan_summary(row["explain_plan"]),
+            "explain_plan": row["explain_plan"],
+            "explained_at": row["explained_at"],
+        }
+        for row in rows
+    ]
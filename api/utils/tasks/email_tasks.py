@@ -7,6 +7,7 @@ from celery import current_task
 
 from api.utils.celery_app import celery_app
 from api.utils.modules.smtp.email_service import EmailService, EmailTemplateType
+from api.utils.settings import settings
 
 
 @celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
@@ -75,7 +76,10 @@ def send_email_task(self, template_type: str, to_email: str, variables: Dict[str
 @celery_app.task(bind=True)
 def send_bulk_emails_task(self, email_list: List[Dict[str, Any]]):
     """
-    Tarefa assíncrona para enviar emails em lote
+    Tarefa assíncrona para enviar emails em lote.
+
+    As conexões SMTP são reaproveitadas pelo pool do processo e o ritmo é dado pelo
+    orçamento SMTP_MESSAGES_PER_MINUTE (sem pausas fixas entre emails).
     
     Args:
         email_list: Lista de dicionários com dados dos emails
@@ -93,19 +97,24 @@ def send_bulk_emails_task(self, email_list: List[Dict[str, Any]]):
         
         # Inicializar serviço de email
         email_service = EmailService()
+        ultimo_progresso = time.monotonic()
         
         for index, email_data in enumerate(email_list):
             try:
-                # Atualizar progresso
-                current_task.update_state(
-                    state='PROGRESS',
-                    meta={
-                        'status': f'Enviando email {index + 1} de {total_emails}',
-                        'current': index,
-                        'total': total_emails,
-                        'to_email': email_data['to_email']
-                    }
-                )
+                # Atualizar progresso a cada N emails ou T segundos (não a cada email)
+                agora = time.monotonic()
+                if (index % settings.SMTP_BULK_PROGRESS_EVERY == 0
+                        or agora - ultimo_progresso >= settings.SMTP_BULK_PROGRESS_INTERVAL_SECONDS):
+                    ultimo_progresso = agora
+                    current_task.update_state(
+                        state='PROGRESS',
+                        meta={
+                            'status': f'Enviando email {index + 1} de {total_emails}',
+                            'current': index,
+                            'total': total_emails,
+                            'to_email': email_data['to_email']
+                        }
+                    )
                 
                 # Converter string para enum
                 email_template_type = EmailTemplateType(email_data['template_type'])
@@ -131,9 +140,6 @@ def send_bulk_emails_task(self, email_list: List[Dict[str, Any]]):
                 
                 results.append(result)
                 
-                # Pequena pausa entre emails para não sobrecarregar SMTP
-                time.sleep(0.5)
-                
             except Exception as e:
                 results.append({
                     'to_email': email_data.get('to_email', 'unknown'),
@@ -208,8 +214,6 @@ def send_password_reset_email_task(self, to_email: str, token: str, expiry_time:
     """
     Tarefa de conveniência para envio de email de reset de senha
     """
-    from api.utils.settings import settings
-    
     variables = {
         "reset_link": f"{settings.SMTP_FRONTEND_URL}/recuperar-senha?token={token}",
         "expiry_time": expiry_time
@@ -236,4 +240,33 @@ def send_verification_email_task(self, to_email: str, verification_link: str,
     return send_email_task.apply_async(
         args=['verification', to_email, variables],
         queue='email'
-    ) 
\ No newline at end of file
+    )
+
+
+@celery_app.task(bind=True)
+def dispatch_email_outbox_task(self):
+    """
+    Drena a outbox de e-mails em lotes (SELECT ... FOR UPDATE SKIP LOCKED).
+
+    Agendada periodicamente pelo beat e antecipada por `kick_email_dispatcher`.
+    Processa até EMAIL_OUTBOX_MAX_BATCHES lotes por execução.
+    """
+    from api.utils.db_services import SessionLocal
+    from api.utils.email_outbox import dispatch_batch
+
+    totais = {'selected': 0, 'sent': 0, 'failed': 0}
+    db = SessionLocal()
+    try:
+        for _ in range(settings.EMAIL_OUTBOX_MAX_BATCHES):
+            resultado = dispatch_batch(db)
+            for chave, valor in resultado.items():
+                totais[chave] += valor
+            if resultado['selected'] < settings.EMAIL_OUTBOX_BATCH_SIZE:
+                break
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return {'status': 'SUCCESS', **totais}
@@ -0,0 +1,163 @@
+"""
+Tarefas assíncronas do agente de WhatsApp usando Celery
+"""
+import asyncio
+import os
+import time
+from typing import Any, Coroutine, Dict, Optional
+
+from celery import signals
+
+from api.utils.agregador_mensagens import (
+    adquirir_lock,
+    buscar_resposta_pendente,
+    confirmar_janela,
+    ler_janela,
+    marcar_paragrafo_enviado,
+    salvar_resposta_pendente,
+    segundos_ate_prazo,
+)
+from api.utils.celery_app import celery_app
+from api.utils.evolution_api import aclose_evolution_client, send_text_message
+from api.utils.ia.llm_agent import Agent
+from api.utils.ia.memoria_conversa import compactar_memoria, montar_memoria, registrar_turno
+from api.utils.settings import settings
+
+_agent: Optional[Agent] = None
+# Event loop persistente do processo: o AsyncClient da Evolution API (e seu pool
+# de conexões) fica preso ao loop, então um loop novo por task (asyncio.run)
+# abriria um client novo a cada execução, sem reaproveitar nem fechar conexões
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+
+
+def _get_agent() -> Agent:
+    """Agent reaproveitado entre tasks do mesmo worker."""
+    global _agent
+    if _agent is None:
+        _agent = Agent()
+    return _agent
+
+
+def _run_async(coro: Coroutine) -> Any:
+    """Executa a coroutine no event loop persistente deste processo do worker."""
+    global _loop, _loop_pid
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        _loop = asyncio.new_event_loop()
+        _loop_pid = os.getpid()
+    return _loop.run_until_complete(coro)
+
+
+@signals.worker_process_shutdown.connect(weak=False)
+def _close_worker_loop(**kwargs) -> None:
+    """Fecha o client da Evolution API e o loop do processo ao encerrar o worker."""
+    global _loop
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        return
+    try:
+        _loop.run_until_complete(aclose_evolution_client())
+    finally:
+        _loop.close()
+        _loop = None
+
+
+async def _enviar_respostas(instancia: str, telefone: str, pendente: Dict[str, Any]) -> None:
+    """Envia os parágrafos ainda não entregues, marcando cada um logo após o envio."""
+    for paragrafo in pendente["respostas"][pendente["enviadas"]:]:
+        await send_text_message(instance_name=instancia, phone_number=telefone, text=paragrafo)
+        marcar_paragrafo_enviado(telefone)
+        pendente["enviadas"] += 1
+
+
+# Sem limite global: esperas de lock/janela são curtas e limitadas pelos próprios
+# timeouts; falhas da LLM/envio têm orçamento próprio (`falhas`, WHATSAPP_REPLY_MAX_ATTEMPTS)
+@celery_app.task(bind=True, max_retries=None)
+def processar_buffer_whatsapp_task(self, telefone: str, instancia: str, falhas: int = 0) -> Dict[str, Any]:
+    """
+    Processa o buffer de um telefone quando a janela de debounce vence.
+
+    Várias tasks podem ser agendadas para o mesmo telefone (uma por mensagem); apenas
+    a que encontra o prazo vencido lê o buffer e chama a LLM uma única vez. A resposta
+    gerada fica guardada no Redis até todos os parágrafos saírem: se a Evolution API
+    falhar, o retry envia só o que faltou, sem nova chamada à LLM. O buffer só é
+    consumido depois do envio.
+
+    Args:
+        telefone: Telefone do remetente
+        instancia: Nome da instância da Evolution API
+        falhas: Falhas de LLM/envio já ocorridas nesta janela
+    """
+    lock = adquirir_lock(telefone)
+    if lock is None:
+        # Outro worker está respondendo este telefone: tenta de novo em instantes
+        raise self.retry(countdown=2)
+
+    try:
+        restante = segundos_ate_prazo(telefone)
+        if restante is not None and restante > 0:
+            # A janela foi estendida: volta quando ela vencer
+            raise self.retry(countdown=restante)
+
+        mensagens = ler_janela(telefone)
+        if not mensagens:
+            return {'status': 'VAZIO', 'telefone': telefone}
+
+        tokens_in = tokens_out = 0
+        try:
+            pendente = buscar_resposta_pendente(telefone, mensagens)
+            if pendente is None:
+                memoria = montar_memoria(telefone)
+                inicio = time.perf_counter()
+                resultado = _get_agent().run(
+                    telefone=telefone, mensagem="\n".join(mensagens), memoria_resumida=memoria
+                )
+                duracao_llm = time.perf_counter() - inicio
+                tokens_in, tokens_out = resultado.tokens_in, resultado.tokens_out
+                pendente = salvar_resposta_pendente(telefone, mensagens, resultado.respostas)
+                print(f"🤖 {telefone}: {len(mensagens)} mensagens -> 1 chamada LLM ({duracao_llm:.2f}s, "
+                      f"{tokens_in} in / {tokens_out} out)")
+
+            _run_async(_enviar_respostas(instancia, telefone, pendente))
+        except Exception as e:
+            # Buffer e resposta pendente intactos: o retry continua de onde parou
+            print(f"❌ Falha ao responder {telefone} ({falhas + 1}/{settings.WHATSAPP_REPLY_MAX_ATTEMPTS}): {e}")
+            if falhas + 1 >= settings.WHATSAPP_REPLY_MAX_ATTEMPTS:
+                # Desiste por ora; a próxima mensagem do telefone retoma o buffer
+                return {'status': 'FALHOU', 'telefone': telefone, 'erro': str(e)[:500]}
+            raise self.retry(
+                exc=e,
+                countdown=settings.WHATSAPP_REPLY_RETRY_SECONDS * 2 ** falhas,
+                kwargs={'falhas': falhas + 1},
+            )
+
+        respondidas = mensagens[:pendente["quantidade"]]
+        confirmar_janela(telefone, len(respondidas))
+
+        registrar_turno(telefone, "user", "\n".join(respondidas))
+        if registrar_turno(telefone, "assistant", "\n".join(pendente["respostas"])):
+            resumir_memoria_task.delay(telefone)
+
+        return {
+            'status': 'SUCCESS',
+            'telefone': telefone,
+            'mensagens_agrupadas': len(respondidas),
+            'tokens_in': tokens_in,
+            'tokens_out': tokens_out,
+        }
+    finally:
+        try:
+            lock.release()
+        except Exception as e:
+            print(f"⚠️ Lock de {telefone} já havia expirado: {e}")
+
+
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 30})
+def resumir_memoria_task(self, telefone: str) -> Dict[str, Any]:
+    """
+    Incorpora ao resumo os turnos antigos da memória do telefone (fora do caminho da resposta).
+
+    Args:
+        telefone: Telefone da conversa
+    """
+    incorporados = compactar_memoria(telefone)
+    return {'status': 'SUCCESS', 'telefone': telefone, 'turnos_resumidos': incorporados}
@@ -0,0 +1,173 @@
+"""
+Tracing distribuído (OpenTelemetry): requisição HTTP -> Celery -> OpenAI/Postgres.
+
+Com TRACING_ENABLED=true, `setup_tracing` configura o TracerProvider do processo e
+instrumenta FastAPI, SQLAlchemy, httpx (cliente da OpenAI) e Celery. A
+instrumentação do Celery injeta o contexto do trace nos headers da task ao
+publicar e o extrai no worker, então `POST /web_links` -> `scrape_url_task` ->
+Chrome/OpenAI/pgvector aparecem como um único trace.
+
+- Exportação: OTLP/HTTP (TRACING_EXPORTER=otlp, coletor local) ou arquivo JSON
+  lines (TRACING_EXPORTER=file), útil sem coletor.
+- Amostragem: TRACING_SAMPLE_RATE na raiz; spans filhos (inclusive no worker)
+  seguem a decisão do pai.
+
+Desligado (padrão), nada do OpenTelemetry é importado e `span(...)` é um no-op.
+
+Uso para spans manuais:
+    with span("chrome.page_load", url=url) as s:
+        ...
+        s.set_attribute("timed_out", timed_out)
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from api.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+_setup_lock = threading.Lock()
+_instrumented = set()
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _build_exporter():
+    if settings.TRACING_EXPORTER == "file":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        arquivo = open(settings.TRACING_FILE_PATH, "a", encoding="utf-8")
+        return ConsoleSpanExporter(out=arquivo, formatter=lambda s: s.to_json(indent=None) + "\n")
+
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+
+
+def _instrument_once(nome: str, instrumentar) -> None:
+    if nome in _instrumented:
+        return
+    try:
+        instrumentar()
+        _instrumented.add(nome)
+    except Exception as e:
+        logger.warning(f"Instrumentação {nome} não aplicada: {e}")
+
+
+def setup_tracing(service_name: str, app=None) -> bool:
+    """
+    Configura o tracing do processo (idempotente).
+
+    Args:
+        service_name: service.name dos spans (ex.: bna-api, bna-worker)
+        app: Aplicação FastAPI a instrumentar (apenas na API)
+
+    Returns:
+        True se o tracing está ativo neste processo
+    """
+    global _tracer
+    if not settings.TRACING_ENABLED:
+        return False
+
+    with _setup_lock:
+        if _tracer is None:
+            try:
+                from opentelemetry import trace
+                from opentelemetry.sdk.resources import Resource
+                from opentelemetry.sdk.trace import TracerProvider
+                from opentelemetry.sdk.trace.export import BatchSpanProcessor
+                from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+            except ImportError as e:
+                logger.warning(f"TRACING_ENABLED=true, mas o OpenTelemetry não está instalado: {e}")
+                return False
+
+            provider = TracerProvider(
+                resource=Resource.create({"service.name": service_name}),
+                sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATE)),
+            )
+            provider.add_span_processor(BatchSpanProcessor(_build_exporter()))
+            trace.set_tracer_provider(provider)
+            _tracer = trace.get_tracer("bna")
+            logger.info(
+                f"Tracing ativo ({service_name}, exporter={settings.TRACING_EXPORTER}, "
+                f"amostragem={settings.TRACING_SAMPLE_RATE})"
+            )
+
+        def _sqlalchemy():
+            from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+            from api.utils.db_services import engine
+
+            SQLAlchemyInstrumentor().instrument(engine=engine)
+
+        def _httpx():
+            from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+
+            HTTPXClientInstrumentor().instrument()
+
+        def _celery():
+            from opentelemetry.instrumentation.celery import CeleryInstrumentor
+
+            CeleryInstrumentor().instrument()
+
+        _instrument_once("sqlalchemy", _sqlalchemy)
+        _instrument_once("httpx", _httpx)
+        _instrument_once("celery", _celery)
+
+        if app is not None:
+            def _fastapi():
+                from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+                FastAPIInstrumentor.instrument_app(app, excluded_urls="health,metrics")
+
+            _instrument_once("fastapi", _fastapi)
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Envia os spans pendentes (chamar no shutdown do processo)."""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """
+    Span manual filho do contexto atual (no-op sem tracing).
+
+    Exceções são registradas no span e repassadas.
+    """
+    if _tracer is None:
+        yield _NOOP_SPAN
+        return
+    with _tracer.start_as_current_span(name) as atual:
+        for chave, valor in attributes.items():
+            if valor is not None:
+                atual.set_attribute(chave, valor)
+        yield atual
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace id do contexto atual em hexa (para logs), ou None."""
+    if _tracer is None:
+        return None
+    from opentelemetry import trace
+
+    contexto = trace.get_current_span().get_span_context()
+    return format(contexto.trace_id, "032x") if contexto.is_valid else None
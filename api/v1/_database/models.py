@@ -5,11 +5,11 @@ from enum import Enum as PyEnum
 from datetime import datetime
 from sqlalchemy import (
     Table, Column, String, Text, Date, DateTime, Boolean, ForeignKey, Index,
-    Enum as SqlAlchemyEnum, Integer, ARRAY # Adicionar Integer e ARRAY
+    Enum as SqlAlchemyEnum, Integer, ARRAY, Float # Adicionar Integer e ARRAY
 )
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID, TEXT
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, TEXT, JSONB
 from sqlalchemy.orm import relationship, declarative_base, Mapped, mapped_column
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from typing import List
 from pgvector.sqlalchemy import Vector
 
@@ -18,6 +18,11 @@ Base = declarative_base()
 tz = pytz.timezone('America/Sao_Paulo') # Defina seu timezone
 logger = logging.getLogger(__name__)
 
+# Política de carregamento: relacionamentos nunca são carregados implicitamente.
+# Quem precisa deles declara via `include` (selectinload em apply_select_load_options);
+# um acesso não declarado que geraria SQL levanta erro em vez de virar N+1.
+RELATIONSHIP_LAZY = "raise_on_sql"
+
 
 class PermissaoTipo(str, PyEnum):
     """Tipos de permissões do sistema"""
@@ -44,7 +49,7 @@ class Usuario(BaseModel):
     permissoes = Column(ARRAY(String), nullable=False, default=list, server_default='{}')
 
     # Relacionamento
-    web_links: Mapped[List["WebLink"]] = relationship("WebLink", back_populates="usuario", lazy="selectin")
+    web_links: Mapped[List["WebLink"]] = relationship("WebLink", back_populates="usuario", lazy=RELATIONSHIP_LAZY)
 
     def __repr__(self):
         return f"<Usuario(id={self.id}), nome={self.nome}>"
@@ -59,26 +64,134 @@ class PasswordResetToken(BaseModel):
     used = Column(Boolean, default=False, nullable=False)
     
     # Relacionamento
-    usuario = relationship("Usuario", lazy="selectin")
+    usuario = relationship("Usuario", lazy=RELATIONSHIP_LAZY)
 
     def __repr__(self):
         return f"<PasswordResetToken(id={self.id}, usuario_id={self.usuario_id})>"
         
 
+class WebLinkStatus(str, PyEnum):
+    """Etapas do processamento (scraping -> resumo -> embeddings) de um WebLink"""
+    QUEUED = "QUEUED"
+    FETCHED = "FETCHED"
+    SUMMARIZED = "SUMMARIZED"
+    EMBEDDED = "EMBEDDED"
+    FAILED = "FAILED"
+
+
+# Estados em que o processamento não avança mais
+WEBLINK_TERMINAL_STATUSES = (WebLinkStatus.EMBEDDED.value, WebLinkStatus.FAILED.value)
+
+
 class WebLink(BaseModel):
     __tablename__ = 'weblink'
        
     weblink = Column(Text, nullable=True)
     title = Column(String(255), nullable=True)
     resumo = Column(Text, nullable=True)
+    status = Column(String(20), nullable=False, default=WebLinkStatus.QUEUED.value,
+                    server_default=WebLinkStatus.QUEUED.value)
     usuario_id = Column(PG_UUID(as_uuid=True), ForeignKey('usuario.id'), nullable=False, index=True) 
 
+    # Processamento (scrape_url_task): tentativas, último erro, duração de cada
+    # etapa em ms ({"queue", "fetch", "summarize", "embed", "total"}), tokens
+    # OpenAI (resumo + embeddings) e chunks inseridos no pgvector
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    last_error = Column(Text, nullable=True)
+    stage_durations = Column(JSONB, nullable=False, default=dict, server_default='{}')
+    tokens_used = Column(Integer, nullable=True)
+    chunk_count = Column(Integer, nullable=True)
+    processing_started_at = Column(DateTime(timezone=True), nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
     # Relacionamento
-    usuario = relationship("Usuario", lazy="selectin")
+    usuario = relationship("Usuario", lazy=RELATIONSHIP_LAZY)
+
+    __table_args__ = (
+        # Só os links ainda em processamento (monitoramento de travados/atrasados)
+        Index(
+            "ix_weblink_em_processamento",
+            "created_at",
+            postgresql_where=text("status NOT IN ('EMBEDDED', 'FAILED')"),
+        ),
+        # Agregação das durações por período (endpoint de métricas)
+        Index("ix_weblink_processed_at", "processed_at"),
+    )
 
     def __repr__(self):
         return f"<WebLink(id={self.id}), weblink={self.weblink}>"
 
+class EmailOutboxStatus(str, PyEnum):
+    """Estados de um e-mail na outbox"""
+    PENDENTE = "PENDENTE"
+    ENVIADO = "ENVIADO"
+    FALHOU = "FALHOU"
+
+
+class EmailOutbox(Base):
+    """
+    Outbox transacional de e-mails.
+
+    Gravado na mesma transação da mudança de negócio (o e-mail só existe se ela
+    for confirmada) e drenado em lotes pelo `dispatch_email_outbox_task`.
+    """
+    __tablename__ = 'email_outbox'
+
+    id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz), nullable=False)
+    template_type = Column(String(50), nullable=False)
+    to_email = Column(String(255), nullable=False)
+    variables = Column(JSONB, nullable=False, default=dict, server_default='{}')
+    custom_subject = Column(String(255), nullable=True)
+    status = Column(String(20), nullable=False, default=EmailOutboxStatus.PENDENTE.value,
+                    server_default=EmailOutboxStatus.PENDENTE.value)
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # O dispatcher só varre pendentes: índice parcial pequeno mesmo com histórico grande
+        Index(
+            "ix_email_outbox_pendente",
+            "available_at",
+            postgresql_where=text("status = 'PENDENTE'"),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox(id={self.id}, to_email={self.to_email}, status={self.status})>"
+
+
+class SlowQuery(Base):
+    """
+    Statement que passou de SLOW_QUERY_THRESHOLD_MS (ver api/utils/slow_queries.py).
+
+    Guarda o SQL normalizado (sem valores), o formato dos parâmetros, a origem
+    (endpoint ou task) e, por amostragem, o plano do EXPLAIN.
+    """
+    __tablename__ = 'slow_query'
+
+    id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz), nullable=False)
+    fingerprint = Column(String(40), nullable=False)
+    sql = Column(Text, nullable=False)
+    param_shapes = Column(JSONB, nullable=True)
+    duration_ms = Column(Float, nullable=False)
+    rows = Column(Integer, nullable=True)
+    origin = Column(String(255), nullable=True)
+    explain_plan = Column(JSONB, nullable=True)
+
+    __table_args__ = (
+        # Agregação dos top offenders por janela de tempo e último plano por fingerprint
+        Index("ix_slow_query_created_at", "created_at"),
+        Index("ix_slow_query_fingerprint_created_at", "fingerprint", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<SlowQuery(fingerprint={self.fingerprint}, duration_ms={self.duration_ms})>"
+
+
 # Tabela de Rag 
 EMBED_DIM = 1536
 
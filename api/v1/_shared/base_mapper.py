@@ -1,7 +1,9 @@
-from typing import Generic, TypeVar, List, Optional, Dict, Any, Type, Set
+from functools import lru_cache
+from typing import Generic, TypeVar, List, Optional, Dict, Any, Type, Set, Tuple
 from uuid import UUID
 from enum import Enum
 import traceback
+from pydantic import TypeAdapter, ValidationError
 from api.utils.utils_bd import (
     parse_select_fields_for_pydantic,
     extract_relationships_from_select_hybrid,
@@ -12,6 +14,13 @@ from sqlalchemy.inspection import inspect as sa_inspect
 ModelType = TypeVar('ModelType')  # Database model
 ViewSchemaType = TypeVar('ViewSchemaType')  # Schema for returning an item
 
+
+@lru_cache(maxsize=None)
+def _get_list_adapter(view_class: Type[Any]) -> TypeAdapter:
+    """Return a cached TypeAdapter that validates a whole list of view rows in one call."""
+    return TypeAdapter(List[view_class])
+
+
 class BaseMapper(Generic[ModelType, ViewSchemaType]):
     """
     Base class for all Mapper classes to reduce code duplication and improve performance.
@@ -49,6 +58,9 @@ class BaseMapper(Generic[ModelType, ViewSchemaType]):
         self.relationship_map = relationship_map
         self.sensitive_fields = sensitive_fields or []
         self._visiting_tracker: Set[UUID] = set()
+        # Built lazily: column names to copy and relationship plans per include set
+        self._column_names: Optional[Tuple[str, ...]] = None
+        self._relation_plans: Dict[Tuple[str, ...], Tuple[Tuple[str, Any, bool], ...]] = {}
 
     def _is_being_visited(self, model: ModelType) -> bool:
         """Check if a model is already being visited to prevent infinite recursion."""
@@ -76,18 +88,93 @@ class BaseMapper(Generic[ModelType, ViewSchemaType]):
             return value.value
         return value
 
+    def _get_column_names(self) -> Tuple[str, ...]:
+        """Return the (cached) column names copied into the view, without sensitive fields."""
+        if self._column_names is None:
+            self._column_names = tuple(
+                column.name
+                for column in self.model_class.__table__.columns
+                if column.name not in self.sensitive_fields
+            )
+        return self._column_names
+
+    def _get_relation_plan(self, include_key: Tuple[str, ...]) -> Tuple[Tuple[str, Any, bool], ...]:
+        """
+        Return the (cached) list of relationships to map for a given include set.
+
+        Each entry is (relation_name, mapper_func, is_list). Unknown names and
+        relationships without a mapper are dropped once, instead of on every row.
+        """
+        plan = self._relation_plans.get(include_key)
+        if plan is None:
+            entries = []
+            seen: Set[str] = set()
+            for rel_name in include_key:
+                rel_config = self.relationship_map.get(rel_name)
+                if rel_name in seen or not rel_config or not rel_config.get('mapper'):
+                    continue
+                seen.add(rel_name)
+                entries.append((rel_name, rel_config['mapper'], rel_config.get('is_list', False)))
+            plan = tuple(entries)
+            self._relation_plans[include_key] = plan
+        return plan
+
     def _extract_model_data(self, model: ModelType) -> Dict[str, Any]:
         """Extract data from a model instance."""
-        # Get all attributes from the model
-        data = {}
-        for column in model.__table__.columns:
-            attr_name = column.name
-            if attr_name in self.sensitive_fields:
-                continue  # Skip sensitive fields
-            value = getattr(model, attr_name, None)
-            data[attr_name] = self._handle_enum_value(value)
-
-        return data
+        handle_enum = self._handle_enum_value
+        return {
+            attr_name: handle_enum(getattr(model, attr_name, None))
+            for attr_name in self._get_column_names()
+        }
+
+    def _empty_relations(self) -> Dict[str, Any]:
+        """Default values for every relationship field of the view."""
+        return {
+            rel_name: [] if rel_config.get('is_list', False) else None
+            for rel_name, rel_config in self.relationship_map.items()
+        }
+
+    def _requested_relations(
+        self,
+        include: Optional[List[str]],
+        select_fields: Optional[str],
+    ) -> Tuple[str, ...]:
+        """Combine `include` with relationships referenced in `select` into a hashable key."""
+        requested_rels: List[str] = list(include or [])
+        if select_fields:
+            model_relation_keys = {r.key for r in sa_inspect(self.model_class).relationships}
+            requested_rels.extend(
+                sorted(extract_relationships_from_select_hybrid(select_fields, model_relation_keys))
+            )
+        return tuple(requested_rels)
+
+    def _build_view_data(
+        self,
+        model: ModelType,
+        include: Optional[List[str]],
+        plan: Tuple[Tuple[str, Any, bool], ...],
+    ) -> Dict[str, Any]:
+        """Build the raw dict for one row (columns + requested relationships)."""
+        view_data = self._extract_model_data(model)
+        view_data.update(self._empty_relations())
+
+        for rel_name, mapper_func, is_list in plan:
+            related_attr = getattr(model, rel_name, None)
+            if related_attr is None:
+                continue
+            if is_list:
+                # Handle to-many relationships
+                if isinstance(related_attr, (list, set)):
+                    # Pass the include parameter to support nested includes
+                    mapped_list = [mapper_func(obj, include) for obj in related_attr if obj is not None]
+                    view_data[rel_name] = [item for item in mapped_list if item is not None]
+            else:
+                # Handle to-one relationships
+                mapped_related = mapper_func(related_attr, include)
+                if mapped_related:
+                    view_data[rel_name] = mapped_related
+
+        return view_data
 
     def map_to_view(
         self,
@@ -116,49 +203,8 @@ class BaseMapper(Generic[ModelType, ViewSchemaType]):
         self._mark_as_visiting(model)
 
         try:
-            # Extract base data from model
-            view_data = self._extract_model_data(model)
-
-            # Initialize relationship fields
-            for rel_name, rel_config in self.relationship_map.items():
-                if rel_config.get('is_list', False):
-                    view_data[rel_name] = []
-                else:
-                    view_data[rel_name] = None
-
-            # Determinar quais relacionamentos incluir
-            requested_rels: List[str] = list(include or [])
-
-            if select_fields:
-                model_relation_keys = {r.key for r in sa_inspect(self.model_class).relationships}
-                requested_rels.extend(
-                    list(
-                        extract_relationships_from_select_hybrid(select_fields, model_relation_keys)
-                    )
-                )
-
-            # Incluir relacionamentos solicitados
-            if requested_rels:
-                for rel_name in requested_rels:
-                    if rel_name in self.relationship_map:
-                        rel_config = self.relationship_map[rel_name]
-                        mapper_func = rel_config.get('mapper')
-
-                        if mapper_func:
-                            related_attr = getattr(model, rel_name, None)
-
-                            if related_attr is not None:
-                                if rel_config.get('is_list', False):
-                                    # Handle to-many relationships
-                                    if isinstance(related_attr, (list, set)):
-                                        # Pass the include parameter to support nested includes
-                                        mapped_list = [mapper_func(obj, include) for obj in related_attr if obj is not None]
-                                        view_data[rel_name] = [item for item in mapped_list if item is not None]
-                                else:
-                                    # Handle to-one relationships
-                                    mapped_related = mapper_func(related_attr, include)
-                                    if mapped_related:
-                                        view_data[rel_name] = mapped_related
+            plan = self._get_relation_plan(self._requested_relations(include, select_fields))
+            view_data = self._build_view_data(model, include, plan)
 
             # Validate and create view model
             try:
@@ -182,6 +228,55 @@ class BaseMapper(Generic[ModelType, ViewSchemaType]):
             # Unmark as visiting
             self._unmark_as_visiting(model)
 
+    def _collect_rows(
+        self,
+        models: List[ModelType],
+        include: Optional[List[str]],
+        select_fields: Optional[str],
+    ) -> Tuple[List[ModelType], List[Dict[str, Any]]]:
+        """
+        Build the raw dicts for a whole page, resolving the relationship plan once.
+
+        Rows whose extraction fails (or that are already being visited higher up
+        in a nested mapping) are skipped, matching `map_to_view` returning None.
+        """
+        plan = self._get_relation_plan(self._requested_relations(include, select_fields))
+        kept_models: List[ModelType] = []
+        rows: List[Dict[str, Any]] = []
+
+        for model in models:
+            if model is None or self._is_being_visited(model):
+                continue
+            self._mark_as_visiting(model)
+            try:
+                rows.append(self._build_view_data(model, include, plan))
+                kept_models.append(model)
+            except Exception as e_outer:
+                print(f"ERRO INESPERADO no mapper para {self.entity_name} (ID: {getattr(model, 'id', None)}). Erro: {e_outer}")
+                print(traceback.format_exc())
+            finally:
+                self._unmark_as_visiting(model)
+
+        return kept_models, rows
+
+    def _validate_rows(self, models: List[ModelType], rows: List[Dict[str, Any]]) -> List[ViewSchemaType]:
+        """
+        Validate all rows with a single cached TypeAdapter call.
+
+        If any row is invalid the page is re-validated row by row so that only the
+        offending rows are dropped (same result as the per-item path).
+        """
+        try:
+            return _get_list_adapter(self.view_class).validate_python(rows)
+        except ValidationError:
+            validated: List[ViewSchemaType] = []
+            for model, row in zip(models, rows):
+                try:
+                    validated.append(self.view_class.model_validate(row))
+                except Exception as e_pydantic:
+                    print(f"ERRO Pydantic: Falha ao validar {self.entity_name}View para ID {getattr(model, 'id', None)}. Erro: {e_pydantic}")
+            return validated
+
     def map_list_to_view(
         self,
         models: List[ModelType],
@@ -191,6 +286,9 @@ class BaseMapper(Generic[ModelType, ViewSchemaType]):
         """
         Map a list of model instances to view models.
 
+        The relationship plan is resolved once per call and the whole page is
+        validated in one pass, instead of calling `map_to_view` for each row.
+
         Args:
             models: The list of model instances to map
             include: List of relationships to include
@@ -201,5 +299,44 @@ class BaseMapper(Generic[ModelType, ViewSchemaType]):
         if not models:
             return []
 
-        mapped_list = [self.map_to_view(model, include, select_fields) for model in models if model is not None]
-        return [view for view in mapped_list if view is not None]
\ No newline at end of file
+        kept_models, rows = self._collect_rows(models, include, select_fields)
+        views = self._validate_rows(kept_models, rows)
+
+        # Se select_fields foi fornecido, aplicar recorte usando utilitário existente
+        if select_fields:
+            include_structure = parse_select_fields_for_pydantic(select_fields)
+            return [view.model_dump(include=include_structure) for view in views]
+
+        return views
+
+    def map_list_to_dicts(
+        self,
+        models: List[ModelType],
+        include: Optional[List[str]] = None,
+        select_fields: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Map a list of model instances to plain dicts ready for an orjson response.
+
+        UUID and datetime values are kept as Python objects (orjson serializes
+        them natively), so the endpoint can skip FastAPI's `jsonable_encoder` pass.
+
+        Args:
+            models: The list of model instances to map
+            include: List of relationships to include
+            select_fields: Optional `select` string to trim the output
+
+        Returns:
+            The list of mapped rows as dicts
+        """
+        if not models:
+            return []
+
+        kept_models, rows = self._collect_rows(models, include, select_fields)
+        views = self._validate_rows(kept_models, rows)
+        include_structure = parse_select_fields_for_pydantic(select_fields) if select_fields else None
+
+        return _get_list_adapter(self.view_class).dump_python(
+            views,
+            include={'__all__': include_structure} if include_structure else None,
+        )
@@ -208,17 +208,8 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType, Generic
             db.flush()  # Ensure ID and other DB defaults are ready
             db.commit()  # Save the main entity
             db.refresh(db_model)  # Update scalar attributes of db_model
-            
-            # Determine which relationships to load after create
-            relations_to_load_after_create = []
-            for rel_name in self.relationship_map.keys():
-                relations_to_load_after_create.append(rel_name)
-            
-            if relations_to_load_after_create:
-                try:
-                    db.refresh(db_model, attribute_names=relations_to_load_after_create)
-                except Exception as refresh_err:
-                    print(f"WARNING: Failed to load relationships {relations_to_load_after_create} after creating {self.entity_name} (ID: {db_model.id}): {refresh_err}")
+            # Relationships are not refreshed here: callers that need them
+            # re-fetch with an explicit include (see RELATIONSHIP_LAZY in models).
             
         except IntegrityError as e:
             db.rollback()
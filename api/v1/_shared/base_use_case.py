@@ -23,7 +23,8 @@ class BaseUseCase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ViewSch
         service: Any,
         entity_name: str,
         map_to_view: Callable[[ModelType, Optional[List[str]]], Optional[ViewSchemaType]],
-        map_list_to_view: Callable[[List[ModelType], Optional[List[str]]], List[ViewSchemaType]]
+        map_list_to_view: Callable[[List[ModelType], Optional[List[str]]], List[ViewSchemaType]],
+        map_list_to_dicts: Optional[Callable[[List[ModelType], Optional[List[str]]], List[Dict[str, Any]]]] = None,
     ):
         """
         Initialize the base use case with service and mapper functions.
@@ -33,11 +34,14 @@ class BaseUseCase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ViewSch
             entity_name: The name of the entity (used in error messages)
             map_to_view: Function to map a single model to a view model
             map_list_to_view: Function to map a list of models to view models
+            map_list_to_dicts: Optional function to map a list of models straight to
+                plain dicts (used by list endpoints that answer with an orjson response)
         """
         self.service = service
         self.entity_name = entity_name
         self.map_to_view = map_to_view
         self.map_list_to_view = map_list_to_view
+        self.map_list_to_dicts = map_list_to_dicts
 
     def _assign_usuario_id(self, data: Any, user_info: Optional[Any] = None) -> Any:
         """
@@ -87,6 +91,7 @@ class BaseUseCase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ViewSch
         search: Optional[str] = None,
         select_fields: Optional[str] = None,
         user_info: Optional[Any] = None,
+        as_dicts: bool = False,
     ) -> Dict[str, Any]:
         """
         Get all entities with pagination, filtering, and sorting.
@@ -100,6 +105,7 @@ class BaseUseCase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ViewSch
             sort_by: Field to sort by
             sort_dir: Sort direction (asc or desc)
             user_info: Usuario object from authentication (from security.get_current_user)
+            as_dicts: Return plain dicts instead of view models (requires map_list_to_dicts)
 
         Returns:
             Dictionary with total count and list of view models
@@ -140,7 +146,10 @@ class BaseUseCase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ViewSch
             raise exception_internal_server_error(f"Internal server error - {str(e)}")
 
         if not select_fields:
-            models = self.map_list_to_view(models, include)
+            if as_dicts and self.map_list_to_dicts is not None:
+                models = self.map_list_to_dicts(models, include)
+            else:
+                models = self.map_list_to_view(models, include)
             return {
                 "total": total_count,
                 "data": models,
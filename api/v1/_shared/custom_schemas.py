@@ -31,6 +31,24 @@ class PageContent(BaseModel):
     model_config: Dict[str, Any] = {"from_attributes": True}
 
 
+class MensagemZap(BaseModel):
+    """Mensagem recebida pelo webhook da Evolution API (WhatsApp)"""
+    nome_instancia: str
+    telefone_remetente: str
+    message_id: str
+    tipo: str
+    label: Optional[str] = Field(None, description="Texto ou legenda da mensagem")
+    media_key: Optional[str] = Field(None, description="mediaKey da mídia, quando houver")
+
+
+class MensagemRetornoLLM(BaseModel):
+    """Resposta do Agent do WhatsApp"""
+    respostas: List[str] = Field(default_factory=list, description="Parágrafos enviados um a um")
+    tokens_in: int = 0
+    tokens_out: int = 0
+    permitiu_ligacao: bool = False
+
+
 class RagQueryRequest(BaseModel):
     """Schema para requisição de query RAG"""
     question: str = Field(..., min_length=3, description="Pergunta a ser respondida com base no conhecimento")
@@ -49,4 +67,71 @@ class RagQueryResponse(BaseModel):
     confidence: float = Field(..., ge=0.0, le=1.0, description="Confiança da resposta (0-1)")
     input_tokens: int = Field(..., description="Tokens de entrada usados")
     output_tokens: int = Field(..., description="Tokens de saída gerados")
-    weblink_id: str = Field(..., description="ID do WebLink consultado")
\ No newline at end of file
+    weblink_id: str = Field(..., description="ID do WebLink consultado")
+
+class TranscriptionSegment(BaseModel):
+    """Trecho transcrito com tempos absolutos (segundos desde o início do áudio)"""
+    start: float
+    end: float
+    text: str
+
+
+class TranscriptionResult(BaseModel):
+    """Resultado de uma transcrição de áudio"""
+    text: str
+    tokens_used: int = 0
+    model_used: str
+    duration_seconds: float = 0.0
+    segments: List[TranscriptionSegment] = Field(default_factory=list)
+    metrics: Dict[str, Any] = Field(default_factory=dict, description="Tempos por etapa e tamanhos (segundos/bytes)")
+
+
+class WebLinkStatusResponse(BaseModel):
+    """Situação do processamento de um WebLink (long-poll)"""
+    weblink_id: UUID
+    status: str = Field(..., description="QUEUED, FETCHED, SUMMARIZED, EMBEDDED ou FAILED")
+    terminal: bool = Field(..., description="True se o processamento não vai mais mudar de etapa")
+    changed: bool = Field(..., description="False se a espera terminou por timeout sem mudança")
+
+
+class StageTimingPoint(BaseModel):
+    """Percentis de duração de uma etapa num período"""
+    periodo: datetime
+    stage: str = Field(..., description="queue, fetch, summarize, embed ou total")
+    count: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+
+
+class StageTimingsResponse(BaseModel):
+    """Durações por etapa do processamento de WebLinks (p50/p95 por período)"""
+    since: datetime
+    bucket: str
+    series: List[StageTimingPoint]
+    totals: Dict[str, Any] = Field(default_factory=dict, description="links, failed, retries, tokens_used, chunk_count, p95_tokens")
+
+
+class SlowQueryOffender(BaseModel):
+    """Um formato de SQL (fingerprint) entre os mais custosos da janela"""
+    fingerprint: str
+    sql: str = Field(..., description="SQL normalizado (valores trocados por ?)")
+    calls: int
+    total_ms: float
+    avg_ms: float
+    p95_ms: float
+    max_ms: float
+    last_seen: datetime
+    origins: List[str] = Field(default_factory=list, description="Endpoints/tasks que executaram o SQL")
+    param_shapes: Optional[Any] = Field(None, description="Tipo e tamanho dos parâmetros da última execução")
+    plan_summary: Optional[Dict[str, Any]] = Field(None, description="execution_ms, node_type, seq_scans, shared_read_blocks")
+    explain_plan: Optional[Dict[str, Any]] = None
+    explained_at: Optional[datetime] = None
+
+
+class SlowQueryReport(BaseModel):
+    """Top offenders da tabela slow_query"""
+    since: datetime
+    order_by: str
+    threshold_ms: float
+    items: List[SlowQueryOffender]
@@ -41,6 +41,7 @@ class UsuarioUpdate(BaseModel):
     email: Optional[str] = Field(None) 
     senha: Optional[str] = Field(None)
     permissoes: Optional[List[str]] = Field(None)
+    flg_ativo: Optional[bool] = Field(None)
     model_config: Dict[str, Any] = {"arbitrary_types_allowed": True}
     
     @model_validator(mode='after')
@@ -84,6 +85,7 @@ class WebLinkBase(CustomBaseModel):
     title: Optional[str] = None
     weblink: Optional[str] = None
     resumo: Optional[str] = None
+    status: Optional[str] = None
     usuario_id: UUID
 
 
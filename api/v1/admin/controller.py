@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from api.utils.db_services import get_db
+from api.utils.exceptions import exception_invalid_query, exception_nao_encontrado
+from api.utils.permissions import require
+from api.utils.profiling import PROFILE_FORMATS, load_profile, speedscope_to_collapsed
+from api.utils.settings import settings
+from api.utils.slow_queries import top_offenders
+from api.v1._shared.custom_schemas import SlowQueryReport, StageTimingsResponse
+from api.v1.web_link.progress import stage_duration_percentiles
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+)
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    include_in_schema=False,
+    dependencies=[Depends(require(["ADMIN"]))],
+)
+def get_profile(
+    profile_id: str,
+    format: str = Query("speedscope", description=f"Um de: {', '.join(PROFILE_FORMATS)}"),
+):
+    """
+    Profile guardado por uma requisição com `X-Profile: 1`.
+
+    speedscope: abrir em https://speedscope.app; collapsed: flamegraph.pl/inferno;
+    sql: log de statements com tempos; full: tudo.
+    """
+    if format not in PROFILE_FORMATS:
+        raise exception_invalid_query(f"format deve ser um de {', '.join(PROFILE_FORMATS)}")
+    profile = load_profile(profile_id)
+    if profile is None:
+        raise exception_nao_encontrado("Profile")
+    if format == "speedscope":
+        return profile["speedscope"]
+    if format == "collapsed":
+        return PlainTextResponse(speedscope_to_collapsed(profile["speedscope"]))
+    if format == "sql":
+        return {chave: valor for chave, valor in profile.items() if chave != "speedscope"}
+    return profile
+
+
+@router.get(
+    "/slow-queries",
+    response_model=SlowQueryReport,
+    summary="Queries lentas mais custosas (admin)",
+    description=(
+        "Agrega a tabela slow_query por fingerprint (SQL normalizado): chamadas, tempo total, "
+        "p95, origens, formato dos parâmetros e o último EXPLAIN (ANALYZE, BUFFERS) capturado."
+    ),
+    dependencies=[Depends(require(["ADMIN"]))],
+)
+async def get_slow_queries(
+    db: Session = Depends(get_db),
+    hours: int = Query(24, ge=1, le=24 * 30, description="Janela em horas"),
+    limit: int = Query(20, ge=1, le=200),
+    order_by: Literal["total", "p95", "max", "count"] = Query("total"),
+    origin: Optional[str] = Query(None, description="Ex.: 'GET /api/v1/web_links/' ou 'task ...'"),
+):
+    since = datetime.now().astimezone() - timedelta(hours=hours)
+    try:
+        items = top_offenders(db, since=since, limit=limit, order_by=order_by, origin=origin)
+    except ValueError as e:
+        raise exception_invalid_query(str(e))
+    return {
+        "since": since,
+        "order_by": order_by,
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "items": items,
+    }
+
+
+@router.get(
+    "/web-link-stage-timings",
+    response_model=StageTimingsResponse,
+    summary="Durações p50/p95 por etapa do processamento de WebLinks (admin)",
+    description=(
+        "Agrega `stage_durations` dos WebLinks finalizados: espera na fila, scraping, "
+        "resumo, embeddings e total, por hora/dia/semana."
+    ),
+    dependencies=[Depends(require(["ADMIN"]))],
+)
+async def get_web_link_stage_timings(
+    db: Session = Depends(get_db),
+    days: int = Query(7, ge=1, le=90, description="Janela em dias"),
+    bucket: Literal["hour", "day", "week"] = Query("day", description="Granularidade do período"),
+    status_filter: Optional[Literal["EMBEDDED", "FAILED"]] = Query(None, alias="status"),
+):
+    since = datetime.now().astimezone() - timedelta(days=days)
+    try:
+        return stage_duration_percentiles(db, since=since, bucket=bucket, status=status_filter)
+    except ValueError as e:
+        raise exception_invalid_query(str(e))
@@ -1,5 +1,5 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
@@ -17,7 +17,7 @@ from api.v1._shared.schemas import (
     PasswordResetResponse
 )
 from api.utils.db_services import get_db
-from api.utils.security import get_current_user
+from api.utils.security import get_current_user, get_current_usuario
 from api.utils.exceptions import exception_nao_encontrado
 
 router = APIRouter(
@@ -64,6 +64,7 @@ async def registrar_conta(
 )
 async def fazer_login(
     data: ContaLogin,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -73,7 +74,7 @@ async def fazer_login(
     - **senha**: Senha do usuário
     """
     try:
-        token_response = await use_case.login(db=db, data=data)
+        token_response = await use_case.login(db=db, data=data, ip=request.client.host if request.client else None)
         return token_response
     except HTTPException as http_exc:
         raise http_exc
@@ -90,6 +91,7 @@ async def fazer_login(
     description="Autentica o usuário usando OAuth2 form e retorna tokens de acesso e refresh."
 )
 async def fazer_login_oauth(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -99,7 +101,7 @@ async def fazer_login_oauth(
     """
     try:
         data = ContaLogin(email=form_data.username, senha=form_data.password)
-        token_response = await use_case.login(db=db, data=data)
+        token_response = await use_case.login(db=db, data=data, ip=request.client.host if request.client else None)
         return token_response
     except HTTPException as http_exc:
         raise http_exc
@@ -174,7 +176,7 @@ async def trocar_senha(
 )
 async def obter_perfil(
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user),
+    current_user = Depends(get_current_usuario),
     authorization: Optional[str] = Header(None)
 ):
     """
@@ -1,8 +1,7 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from uuid import UUID
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import secrets
 
@@ -16,18 +15,24 @@ from api.v1._shared.schemas import (
     PasswordResetConfirm
 )
 from api.utils.security import (
-    verify_password, 
+    aget_password_hash,
+    averify_password,
     create_access_token, 
     create_refresh_token, 
     verify_refresh_token
 )
+from api.utils.login_limiter import (
+    cancel_login_attempt,
+    reserve_login_attempt,
+    reset_login_failures,
+)
+from api.utils.principal_cache import invalidate_principal
 from api.utils.settings import settings
 from api.v1.conta.mapper import UsuarioMapper
 from api.v1._shared.schemas import ContaCreate, UsuarioCreate
 from api.v1.usuario.service import UsuarioService
-from api.utils.async_email_service import async_email_service
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from api.utils.email_outbox import enqueue_email, kick_email_dispatcher
+from api.utils.modules.smtp.email_service import EmailTemplateType
 
 class ContaService:
     """
@@ -39,7 +44,7 @@ class ContaService:
         self.mapper = UsuarioMapper()
         self.usuario_service = UsuarioService()
         
-    def register(self, db: Session, data: ContaCreate) -> Usuario:
+    async def register(self, db: Session, data: ContaCreate) -> Usuario:
         """
         Register a new user account.
         
@@ -66,7 +71,7 @@ class ContaService:
         # Trunca em bytes para evitar erro com caracteres especiais
         senha_bytes = data.senha.encode('utf-8')[:72]
         senha_truncada = senha_bytes.decode('utf-8', errors='ignore')
-        hashed_password = pwd_context.hash(senha_truncada)
+        hashed_password = await aget_password_hash(senha_truncada)
         
         # Cria os dados do usuário
         usuario_data = UsuarioCreate(
@@ -86,20 +91,27 @@ class ContaService:
                 detail="Erro interno ao criar conta"
             )
 
-    def login(self, db: Session, data: ContaLogin) -> Dict[str, Any]:
+    async def login(self, db: Session, data: ContaLogin, ip: Optional[str] = None) -> Dict[str, Any]:
         """
         Authenticate user and generate tokens.
+
+        Password verification runs on the bounded hash pool. Each attempt is
+        reserved atomically (per account and per IP) before any hashing happens;
+        the reservation is the recorded failure unless the login succeeds.
         
         Args:
             db: Database session
             data: Login credentials
+            ip: Client IP address (for the attempt limiter)
             
         Returns:
             Dictionary with access token, refresh token, and user info
             
         Raises:
-            HTTPException: If credentials are invalid or user is inactive
+            HTTPException: If credentials are invalid, user is inactive or too many attempts
         """
+        await reserve_login_attempt(data.email, ip)
+
         # Find user by email
         user = db.query(Usuario).filter(Usuario.email == data.email).first()
         if not user:
@@ -110,12 +122,24 @@ class ContaService:
             )
         
         # Verify password
-        if not verify_password(data.senha, user.senha):
+        try:
+            valid, new_hash = await averify_password(data.senha, user.senha)
+        except HTTPException:
+            # Pool de hash saturado: a senha não foi avaliada, não conta como falha
+            await cancel_login_attempt(data.email, ip)
+            raise
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email ou senha incorretos",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        await reset_login_failures(data.email, ip)
+
+        # Rehash transparente quando os parâmetros do hash foram atualizados
+        if new_hash:
+            user.senha = new_hash
+            db.commit()
         
         if not user.flg_ativo:
             raise HTTPException(
@@ -190,7 +214,7 @@ class ContaService:
             "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60  # seconds
         }
     
-    def change_password(self, db: Session, user_id: UUID, data: ContaChangePassword) -> Usuario:
+    async def change_password(self, db: Session, user_id: UUID, data: ContaChangePassword) -> Usuario:
         """
         Change user password.
         
@@ -214,16 +238,18 @@ class ContaService:
             )
         
         # Verify current password
-        if not verify_password(data.senha_atual, user.senha):
+        valid, _ = await averify_password(data.senha_atual, user.senha)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Senha atual incorreta"
             )
         
         # Update password
-        user.senha = pwd_context.hash(data.nova_senha)
+        user.senha = await aget_password_hash(data.nova_senha)
         db.commit()
         db.refresh(user)
+        invalidate_principal(user.id)
         
         return user
     
@@ -332,19 +358,24 @@ class ContaService:
             )
             
             db.add(reset_token)
-            db.commit()
             
-            # Enviar email de forma assíncrona
-            task_id = async_email_service.send_password_reset_async(
-                to_email=user.email,
-                token=token,
-                expiry_time="1 hora"
+            # Email gravado na outbox na mesma transação do token
+            outbox_item = enqueue_email(
+                db,
+                EmailTemplateType.PASSWORD_RESET,
+                user.email,
+                {
+                    "reset_link": f"{settings.SMTP_FRONTEND_URL}/recuperar-senha?token={token}",
+                    "expiry_time": "1 hora"
+                }
             )
+            db.commit()
+            kick_email_dispatcher()
             
             return PasswordResetResponse(
                 message="Se o email estiver cadastrado, você receberá instruções para redefinir sua senha.",
                 email=data.email,
-                task_id=task_id
+                task_id=str(outbox_item.id)
             )
             
         except Exception as e:
@@ -354,7 +385,7 @@ class ContaService:
                 detail="Erro interno ao processar solicitação"
             )
     
-    def confirm_password_reset(self, db: Session, data: PasswordResetConfirm) -> PasswordResetResponse:
+    async def confirm_password_reset(self, db: Session, data: PasswordResetConfirm) -> PasswordResetResponse:
         """
         Confirm password reset with token.
         
@@ -392,12 +423,13 @@ class ContaService:
                 )
             
             # Atualizar senha
-            user.senha = pwd_context.hash(data.nova_senha)
+            user.senha = await aget_password_hash(data.nova_senha)
             
             # Marcar token como usado
             reset_token.used = True
             
             db.commit()
+            invalidate_principal(user.id)
             
             return PasswordResetResponse(
                 message="Senha redefinida com sucesso. Você já pode fazer login com a nova senha.",
@@ -1,3 +1,4 @@
+from typing import Optional
 from uuid import UUID
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
@@ -54,7 +55,7 @@ class ContaUseCase:
                     permissoes=DEFAULT_USER_PERMISSIONS  # ["RAG", "LINK"]
                 )
             
-            user = self.service.register(db, data)
+            user = await self.service.register(db, data)
             return conta_mapper.map_to_conta_view(user)
         except HTTPException:
             raise
@@ -64,19 +65,20 @@ class ContaUseCase:
                 detail=f"Erro interno ao registrar conta: {str(e)}"
             )
     
-    async def login(self, db: Session, data: ContaLogin) -> str:
+    async def login(self, db: Session, data: ContaLogin, ip: Optional[str] = None) -> str:
         """
         Authenticate user and return access and refresh tokens.
         
         Args:
             db: Database session
             data: Login credentials
+            ip: Client IP address (for the attempt limiter)
             
         Returns:
             TokenResponse with access token, refresh token and user data
         """
         try:
-            login_result = self.service.login(db, data)
+            login_result = await self.service.login(db, data, ip=ip)
             
             # Map user to ContaView for response
             # user_view = conta_mapper.map_to_conta_view(login_result["user"])
@@ -139,7 +141,7 @@ class ContaUseCase:
             ContaView with updated user data
         """
         try:
-            user = self.service.change_password(db, user_id, data)
+            user = await self.service.change_password(db, user_id, data)
             return conta_mapper.map_to_conta_view(user)
         except HTTPException:
             raise
@@ -182,7 +184,7 @@ class ContaUseCase:
             PasswordResetResponse with confirmation message
         """
         try:
-            return self.service.confirm_password_reset(db, data)
+            return await self.service.confirm_password_reset(db, data)
         except HTTPException:
             raise
         except Exception as e:
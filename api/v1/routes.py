@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 
+from api.v1.admin.controller import router as admin_router
 from api.v1.conta.controller import router as conta_router
 from api.v1.web_link.controller import router as web_link_router
 from api.v1.usuario.controller import router as usuario_router
@@ -10,4 +11,5 @@ routes = APIRouter(prefix="/api/v1")
 
 routes.include_router(conta_router)
 routes.include_router(usuario_router)
-routes.include_router(web_link_router)
\ No newline at end of file
+routes.include_router(web_link_router)
+routes.include_router(admin_router)
\ No newline at end of file
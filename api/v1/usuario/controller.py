@@ -10,16 +10,19 @@ from api.v1._shared.schemas import (
     UsuarioPermissoesUpdate
 )
 from api.utils.db_services import get_db
-from api.utils.security import get_current_user
+from api.utils.security import get_current_user, get_current_usuario
 from api.utils.permissions import require
 from api.utils.exceptions import exception_nao_encontrado, exception_invalid_query
-from api.utils.query_parser import parse_filters
+from api.utils.query_parser import parse_filters, parse_include
 
 router = APIRouter(
     prefix="/usuarios",
     tags=["Usuarios"], 
 )
 
+# Relacionamentos que os endpoints deste router aceitam em `include`
+USUARIO_INCLUDES = {"web_links"}
+
 use_case = UsuarioUseCase()
 
 @router.get(
@@ -29,7 +32,7 @@ use_case = UsuarioUseCase()
     description="Retorna as informações e permissões do usuário autenticado atualmente.",
 )
 async def get_me(
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_usuario)
 ):
     """
     Endpoint público (apenas requer autenticação) para o usuário verificar suas próprias informações.
@@ -38,7 +41,7 @@ async def get_me(
     - Dados completos do usuário
     - Lista de permissões que o usuário possui
     """
-    # current_user já é o objeto Usuario completo do banco (vem de security.get_current_user)
+    # current_user já é o objeto Usuario completo do banco (vem de security.get_current_usuario)
     # Converter para UsuarioView usando Pydantic
     return UsuarioView.model_validate(current_user)
 
@@ -65,7 +68,7 @@ async def list_usuarios(
 ):
     
     try:
-        include_list = include.split(',') if include else None
+        include_list = parse_include(include, USUARIO_INCLUDES)
         filter_params_dict = parse_filters(request.query_params)
     except ValueError as e:
         raise exception_invalid_query(str(e))
@@ -130,7 +133,11 @@ async def get_usuario_by_id(
     
 ):
     try:
-        include_list = include.split(',') if include else None
+        include_list = parse_include(include, USUARIO_INCLUDES)
+    except ValueError as e:
+        raise exception_invalid_query(str(e))
+
+    try:
         result = await use_case.get_by_id(
             db=db, 
             id=id, 
@@ -7,6 +7,7 @@ from fastapi import HTTPException, status
 from api.v1._database.models import Usuario
 from api.v1._shared.schemas import UsuarioCreate, UsuarioUpdate, UsuarioGeneric
 from api.v1._shared.base_service import BaseService
+from api.utils.principal_cache import invalidate_principal
 
 
 
@@ -248,12 +249,16 @@ class UsuarioService(BaseService[Usuario, UsuarioCreate, UsuarioUpdate, UsuarioG
         #        return None
         
         # Call the parent method without user_id filtering
-        return super().update(
+        updated = super().update(
             db=db,
             id=id,
             data=data,
             user_id=None  # Don't apply the base user filtering for Usuario model
         )
+        # Ativo/permissões/senha podem ter mudado: o principal em cache deixa de valer
+        if updated is not None:
+            invalidate_principal(id)
+        return updated
 
     def delete(self, db: Session, id: UUID, user_id: Optional[UUID] = None) -> Optional[Usuario]:
         """
@@ -269,10 +274,13 @@ class UsuarioService(BaseService[Usuario, UsuarioCreate, UsuarioUpdate, UsuarioG
         #        return None
         
         # Call the parent method without user_id filtering
-        return super().delete(
+        deleted = super().delete(
             db=db,
             id=id,
             user_id=None  # Don't apply the base user filtering for Usuario model
         )
+        if deleted is not None:
+            invalidate_principal(id)
+        return deleted
 
 usuario_service = UsuarioService()
\ No newline at end of file
@@ -9,10 +9,16 @@ from sqlalchemy.orm import Session
 
 from api.utils.celery_app import celery_app
 from api.utils.db_services import get_db
-from api.v1._database.models import WebLink
+from api.utils.modules.pdf.pdf_download import PdfTooLargeError
+from api.utils.modules.pdf.pdf_text import iter_pdf_pages
+from api.utils.settings import settings
+from api.utils.utils_file import cleanup_temp_file
+from api.v1._database.models import WebLink, WebLinkStatus
 from api.v1._shared.schemas import WebLinkUpdate
 from api.v1.web_link.ia.summarize import generate_summary
-from api.v1.web_link.rag.ingest import ingest_page_content
+from api.v1.web_link.progress import emit_stage, start_processing
+from api.v1.web_link.rag.ingest import ingest_page_content, ingest_pdf_pages
+from api.v1.web_link.scraping.pdf import download_pdf, is_pdf_url, pdf_title
 from api.v1.web_link.scraping.scraping import url_to_json
 from api.v1.web_link.service import WebLinkService
 
@@ -20,6 +26,73 @@ from api.v1.web_link.service import WebLinkService
 logger = logging.getLogger(__name__)
 OPENAI_API_KEY = config("OPENAI_API_KEY")
 
+
+def _process_pdf(
+    db: Session,
+    weblink_id: str,
+    usuario_id,
+    url: str,
+    pdf_path: str,
+    timer,
+    attempt: int,
+    usage: dict,
+) -> dict:
+    """
+    Caminho do WebLink que aponta para PDF: resumo a partir das primeiras páginas
+    (PDF_MESSAGE_CHAR_BUDGET) e ingestão página a página no pgvector
+    (PDF_RAG_CHAR_BUDGET), sem montar o texto inteiro em memória.
+    """
+    title = pdf_title(url)
+    client = OpenAI(api_key=OPENAI_API_KEY)
+
+    logger.info(f"[RESUMO] Gerando resumo do PDF para WebLink ID: {weblink_id}")
+    text_head = "\n\n".join(
+        text for _, text in iter_pdf_pages(pdf_path, settings.PDF_MESSAGE_CHAR_BUDGET)
+    )
+    summary = generate_summary(
+        client=client,
+        title=title,
+        text_full=text_head,
+        description=None,
+        usage=usage,
+    )
+
+    WebLinkService().update(
+        db=db,
+        id=UUID(weblink_id),
+        data=WebLinkUpdate(title=title, resumo=summary)
+    )
+    emit_stage(
+        db, weblink_id, usuario_id, WebLinkStatus.SUMMARIZED.value, timer,
+        columns={"tokens_used": usage["total_tokens"]},
+        attempt=attempt,
+    )
+
+    ingest_result = ingest_pdf_pages(
+        db=db,
+        client=client,
+        context=url,
+        title=title,
+        pages=iter_pdf_pages(pdf_path, settings.PDF_RAG_CHAR_BUDGET),
+    )
+    tokens_used = usage["total_tokens"] + ingest_result.get("tokens", 0)
+    chunk_count = ingest_result.get("inserted", 0)
+    emit_stage(
+        db, weblink_id, usuario_id, WebLinkStatus.EMBEDDED.value, timer,
+        columns={"tokens_used": tokens_used, "chunk_count": chunk_count, "last_error": None},
+        attempt=attempt, chunks=chunk_count,
+    )
+
+    logger.info(f"[SCRAPING] PDF processado para WebLink ID: {weblink_id} ({chunk_count} chunks)")
+    return {
+        "weblink_id": weblink_id,
+        "scraping": "pdf",
+        "page_title": title,
+        "summary_length": len(summary),
+        "ingest": ingest_result
+    }
+
+
 @celery_app.task(
     name="api.v1.web_link.celery.tasks.scrape_url_task",
     bind=True,
@@ -29,9 +102,13 @@ OPENAI_API_KEY = config("OPENAI_API_KEY")
 def scrape_url_task(self, weblink_id: str, url: str) -> Optional[dict]:
     """
     Task assíncrona para:
-    1. Fazer scraping da URL
+    1. Fazer scraping da URL (ou baixar o PDF, quando o link aponta para um)
     2. Atualizar o título do WebLink
     3. Ingerir conteúdo no pgvector para RAG
+
+    Cada etapa concluída é gravada em `weblink.status` e publicada para o dono do
+    link (FETCHED, SUMMARIZED, EMBEDDED; FAILED quando acabam as tentativas),
+    junto com tentativas, último erro, duração das etapas, tokens e chunks.
     
     Args:
         weblink_id: ID do WebLink sendo processado
@@ -41,13 +118,31 @@ def scrape_url_task(self, weblink_id: str, url: str) -> Optional[dict]:
         dict: Estatísticas do processamento ou None em caso de erro
     """
     db: Session = next(get_db())
+    timer = None
+    attempt = self.request.retries
+    usuario_id = None
+    usage = {"total_tokens": 0}
+    pdf_path = None
     
     try:
         logger.info(f"[SCRAPING] Iniciando para WebLink ID: {weblink_id}")
         logger.info(f"[SCRAPING] URL: {url}")
+
+        usuario_id, timer = start_processing(db, weblink_id, attempt)
+        if timer is None:
+            logger.warning(f"[SCRAPING] WebLink ID {weblink_id} não existe mais. Ignorando.")
+            return None
         
+        # Links para PDF: download em streaming + extração página a página
+        if is_pdf_url(url):
+            pdf_path = download_pdf(url)
+            if pdf_path:
+                emit_stage(db, weblink_id, usuario_id, WebLinkStatus.FETCHED.value, timer, attempt=attempt)
+                return _process_pdf(db, weblink_id, usuario_id, url, pdf_path, timer, attempt, usage)
+
         # 1) Executa o scraping
         page_content = url_to_json(url)
+        emit_stage(db, weblink_id, usuario_id, WebLinkStatus.FETCHED.value, timer, attempt=attempt)
         
         # Print no terminal (debug)
         content_dict = page_content.model_dump()
@@ -65,7 +160,8 @@ def scrape_url_task(self, weblink_id: str, url: str) -> Optional[dict]:
             client=client,
             title=page_content.title,
             text_full=page_content.text_full,
-            description=page_content.description
+            description=page_content.description,
+            usage=usage,
         )
         
         print("\n" + "="*80)
@@ -93,6 +189,11 @@ def scrape_url_task(self, weblink_id: str, url: str) -> Optional[dict]:
             id=UUID(weblink_id),
             data=update_data
         )
+        emit_stage(
+            db, weblink_id, usuario_id, WebLinkStatus.SUMMARIZED.value, timer,
+            columns={"tokens_used": usage["total_tokens"]},
+            attempt=attempt,
+        )
         
         # 4) Ingere no pgvector para RAG
         ingest_result = ingest_page_content(
@@ -101,6 +202,13 @@ def scrape_url_task(self, weblink_id: str, url: str) -> Optional[dict]:
             context=url,
             page_content=page_content
         )
+        tokens_used = usage["total_tokens"] + ingest_result.get("tokens", 0)
+        chunk_count = ingest_result.get("inserted", 0)
+        emit_stage(
+            db, weblink_id, usuario_id, WebLinkStatus.EMBEDDED.value, timer,
+            columns={"tokens_used": tokens_used, "chunk_count": chunk_count, "last_error": None},
+            attempt=attempt, chunks=chunk_count,
+        )
         
         print("\n" + "="*80)
         print(f"[INGESTÃO PGVECTOR] WebLink ID: {weblink_id}")
@@ -121,10 +229,37 @@ def scrape_url_task(self, weblink_id: str, url: str) -> Optional[dict]:
     except Exception as e:
         logger.error(f"[SCRAPING] Erro ao processar WebLink ID {weblink_id}: {str(e)}")
         print(f"\n[SCRAPING ERRO] WebLink ID: {weblink_id} - Erro: {str(e)}\n")
+
+        # Sem mais tentativas, ou erro que se repetiria igual (PDF acima do limite):
+        # FAILED (terminal); senão volta para QUEUED até o retry
+        permanente = isinstance(e, PdfTooLargeError)
+        esgotado = permanente or attempt >= self.max_retries
+        erro = str(e)[:500]
+        columns = {"last_error": erro}
+        if timer is not None:
+            # Tokens já gastos nesta tentativa também contam (somados no retry)
+            columns["tokens_used"] = usage["total_tokens"]
+        try:
+            db.rollback()
+            emit_stage(
+                db, weblink_id, usuario_id,
+                WebLinkStatus.FAILED.value if esgotado else WebLinkStatus.QUEUED.value,
+                timer,
+                columns=columns,
+                attempt=attempt,
+                error=erro,
+                retry_in=None if esgotado else self.default_retry_delay,
+            )
+        except Exception as emit_error:
+            logger.error(f"[SCRAPING] Não foi possível registrar a falha do WebLink {weblink_id}: {emit_error}")
         
+        if permanente:
+            return None
+
         # Retry automático está configurado no decorator
         raise self.retry(exc=e)
         
     finally:
+        cleanup_temp_file(pdf_path)
         db.close()
 
@@ -11,22 +11,35 @@ from fastapi import (
     Query,
     Request,
     Response,
+    WebSocket,
+    WebSocketDisconnect,
     status,
 )
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from openai import OpenAI
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from api.utils.db_services import get_db
 from api.utils.exceptions import exception_invalid_query, exception_nao_encontrado
-from api.utils.security import get_current_user
-from api.utils.permissions import require
-from api.utils.query_parser import parse_filters
-from api.v1._shared.custom_schemas import RagQueryRequest, RagQueryResponse
+from api.utils.modules.ws.websocket_manager import manager as ws_manager
+from api.utils.security import get_current_user, principal_from_access_token
+from api.utils.settings import settings
+from api.utils.permissions import has_permission, require
+from api.utils.query_budget import query_budget
+from api.utils.query_parser import parse_filters, parse_include
+from api.v1._database.models import WEBLINK_TERMINAL_STATUSES
+from api.v1._shared.custom_schemas import (
+    RagQueryRequest,
+    RagQueryResponse,
+    WebLinkStatusResponse,
+)
 from api.v1._shared.schemas import (
     WebLinkCreate,
     WebLinkUpdate,
     WebLinkView,
 )
+from api.v1.web_link.progress import stream_stage_events, wait_for_status
 from api.v1.web_link.rag.query import query_weblink_knowledge
 from api.v1.web_link.use_case import WebLinkUseCase
 
@@ -40,6 +53,9 @@ router = APIRouter(
     tags=["WebLinks"], 
 )
 
+# Relacionamentos que os endpoints deste router aceitam em `include`
+WEB_LINK_INCLUDES = {"usuario"}
+
 use_case = WebLinkUseCase()
 
 @router.get(
@@ -47,7 +63,8 @@ use_case = WebLinkUseCase()
     # response_model=MedicoResponseList,
     summary="Listar WebLinks",
     description="Recupera uma lista paginada de WebLinks com opções de filtro, ordenação e inclusão de relacionamentos.",
-    dependencies=[Depends(require(["LINK"]))]
+    # principal (miss) + count + página + selectin de usuario
+    dependencies=[Depends(require(["LINK"])), Depends(query_budget(4))]
 )
 async def list_web_links(
     request: Request, 
@@ -64,7 +81,7 @@ async def list_web_links(
 ):
     
     try:
-        include_list = include.split(',') if include else None
+        include_list = parse_include(include, WEB_LINK_INCLUDES)
         filter_params_dict = parse_filters(request.query_params)
     except ValueError as e:
         raise exception_invalid_query(str(e))
@@ -80,14 +97,16 @@ async def list_web_links(
             sort_dir=sort_dir,
             search=search,
             select_fields=select_fields,
-            user_info=user_info
+            user_info=user_info,
+            as_dicts=True,
         )
     except HTTPException as http_exc: 
         raise http_exc
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno no servidor.")
 
-    return result
+    # Linhas já são dicts simples (UUID/datetime nativos): serializa direto com orjson
+    return ORJSONResponse(content=result)
 
 
 @router.post(
@@ -117,7 +136,7 @@ async def create_web_link(
     response_model=WebLinkView,
     summary="Obter WebLink por ID",
     responses={404: {"description": "WebLink não encontrado"}},
-    dependencies=[Depends(require(["LINK"]))]
+    dependencies=[Depends(require(["LINK"])), Depends(query_budget(3))]
 )
 async def get_web_link_by_id(  
     id: UUID,  
@@ -129,7 +148,11 @@ async def get_web_link_by_id(
     
 ):
     try:
-        include_list = include.split(',') if include else None
+        include_list = parse_include(include, WEB_LINK_INCLUDES)
+    except ValueError as e:
+        raise exception_invalid_query(str(e))
+
+    try:
         result = await use_case.get_by_id(
             db=db, 
             id=id, 
@@ -253,4 +276,87 @@ async def ask_weblink(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro interno ao processar consulta RAG"
-        )
\ No newline at end of file
+        )
+
+
+@router.get(
+    "/{id}/status",
+    response_model=WebLinkStatusResponse,
+    summary="Status do processamento do WebLink (long-poll)",
+    description=(
+        "Sem `since`, devolve o status atual. Com `since`, segura a requisição até o "
+        "status mudar (ou chegar a um estado terminal) ou até `wait` segundos."
+    ),
+    responses={404: {"description": "WebLink não encontrado"}},
+    dependencies=[Depends(require(["LINK"]))]
+)
+async def get_web_link_status(
+    id: UUID,
+    db: Session = Depends(get_db),
+    user_info = Depends(get_current_user),
+    authorization: Optional[str] = Header(None),
+    since: Optional[str] = Query(None, description="Último status conhecido pelo cliente"),
+    wait: float = Query(25.0, ge=0, description="Tempo máximo de espera em segundos"),
+):
+    info = await use_case.get_status(db=db, id=id, user_info=user_info)
+    # Libera a conexão do pool: a espera abaixo não usa esta sessão
+    db.close()
+
+    timeout = min(wait, settings.WEBLINK_STATUS_MAX_WAIT_SECONDS)
+    current, changed = await wait_for_status(id, info["usuario_id"], since, timeout)
+    return WebLinkStatusResponse(
+        weblink_id=id,
+        status=current or info["status"],
+        terminal=current in WEBLINK_TERMINAL_STATUSES,
+        changed=changed,
+    )
+
+
+@router.get(
+    "/{id}/events",
+    summary="Eventos de processamento do WebLink (SSE)",
+    description="Stream `text/event-stream` com o status atual e cada etapa seguinte, até EMBEDDED ou FAILED.",
+    responses={404: {"description": "WebLink não encontrado"}},
+    dependencies=[Depends(require(["LINK"]))]
+)
+async def stream_web_link_events(
+    id: UUID,
+    db: Session = Depends(get_db),
+    user_info = Depends(get_current_user),
+    authorization: Optional[str] = Header(None),
+):
+    info = await use_case.get_status(db=db, id=id, user_info=user_info)
+    db.close()
+
+    return StreamingResponse(
+        stream_stage_events(id, info["usuario_id"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def web_link_events_ws(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    WebSocket com os eventos do usuário (inclui `weblink.stage` de todos os seus links).
+
+    Autenticação pelo access token na query string (`?token=`), já que o navegador
+    não envia headers customizados no handshake. Exige as mesmas condições de
+    `require(["LINK"])`: usuário ativo e com LINK (ou ADMIN); senão fecha com 1008.
+    """
+    principal = await run_in_threadpool(principal_from_access_token, token)
+    if principal is None or not has_permission(principal, "LINK"):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    user_id = str(principal.id)
+
+    connection = await ws_manager.connect(websocket, user_id)
+    try:
+        while True:
+            # O canal é só de saída; ler mantém a conexão e detecta o fechamento
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        ws_manager.disconnect(user_id, connection)
@@ -1,7 +1,10 @@
-from typing import Optional
+from typing import Dict, Optional
 from openai import OpenAI
 import logging
 from decouple import config
+
+from api.utils.metrics import observe_openai
+
 logger = logging.getLogger(__name__)
 
 # Configurações
@@ -42,20 +45,30 @@ def _truncate_text(text: str, max_chars: int) -> str:
     return truncated + "..."
 
 
-def _summarize_chunk(client: OpenAI, text: str) -> str:
+def _add_usage(usage: Optional[Dict[str, int]], response) -> None:
+    """Soma os tokens da resposta no acumulador (se informado)."""
+    if usage is None or getattr(response, "usage", None) is None:
+        return
+    usage["total_tokens"] = usage.get("total_tokens", 0) + (response.usage.total_tokens or 0)
+
+
+def _summarize_chunk(client: OpenAI, text: str, usage: Optional[Dict[str, int]] = None) -> str:
     """
     Resume um chunk de texto usando GPT-4o-mini.
     """
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": f"Resuma o seguinte texto:\n\n{text}"}
-            ],
-            max_tokens=MAX_OUTPUT_TOKENS,
-            temperature=TEMPERATURE,
-        )
+        with observe_openai("summarize", MODEL) as call:
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": f"Resuma o seguinte texto:\n\n{text}"}
+                ],
+                max_tokens=MAX_OUTPUT_TOKENS,
+                temperature=TEMPERATURE,
+            )
+            call.record(response)
+        _add_usage(usage, response)
         
         summary = response.choices[0].message.content.strip()
         return summary
@@ -69,7 +82,8 @@ def generate_summary(
     client: OpenAI,
     title: Optional[str],
     text_full: Optional[str],
-    description: Optional[str] = None
+    description: Optional[str] = None,
+    usage: Optional[Dict[str, int]] = None,
 ) -> str:
     """
     Gera um resumo executivo do conteúdo usando GPT-4o-mini.
@@ -84,6 +98,7 @@ def generate_summary(
         title: Título da página
         text_full: Texto completo da página
         description: Descrição da página (meta tag)
+        usage: Acumulador opcional; recebe "total_tokens" somados de todas as chamadas
         
     Returns:
         str: Resumo em português (~100-150 palavras)
@@ -98,7 +113,7 @@ def generate_summary(
             fallback_text += f". {description}" if fallback_text else description
         
         if fallback_text:
-            return _summarize_chunk(client, fallback_text)
+            return _summarize_chunk(client, fallback_text, usage)
         else:
             return "Sem conteúdo disponível para resumir."
     
@@ -106,7 +121,7 @@ def generate_summary(
     if len(text_full) <= MAX_INPUT_CHARS:
         context = f"Título: {title}\n\n" if title else ""
         context += text_full
-        return _summarize_chunk(client, context)
+        return _summarize_chunk(client, context, usage)
     
     # Caso 3: Texto grande - estratégia de resumo em etapas
     logger.info(f"Texto grande ({len(text_full)} chars), usando estratégia de chunks")
@@ -122,7 +137,7 @@ def generate_summary(
     for idx, chunk in enumerate(chunks[:3]):
         try:
             logger.info(f"Resumindo chunk {idx+1}/{min(len(chunks), 3)}")
-            summary = _summarize_chunk(client, chunk)
+            summary = _summarize_chunk(client, chunk, usage)
             chunk_summaries.append(summary)
         except Exception as e:
             logger.warning(f"Falha ao resumir chunk {idx+1}: {e}")
@@ -144,15 +159,18 @@ def generate_summary(
             final_context = f"Título: {title}\n\n" if title else ""
             final_context += f"Resumos parciais do conteúdo:\n\n{combined_summaries}"
             
-            response = client.chat.completions.create(
-                model=MODEL,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": f"Crie um resumo executivo único e coeso a partir destes resumos parciais:\n\n{final_context}"}
-                ],
-                max_tokens=MAX_OUTPUT_TOKENS,
-                temperature=0.3,
-            )
+            with observe_openai("summarize", MODEL) as call:
+                response = client.chat.completions.create(
+                    model=MODEL,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": f"Crie um resumo executivo único e coeso a partir destes resumos parciais:\n\n{final_context}"}
+                    ],
+                    max_tokens=MAX_OUTPUT_TOKENS,
+                    temperature=0.3,
+                )
+                call.record(response)
+            _add_usage(usage, response)
             
             return response.choices[0].message.content.strip()
             
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from api.v1._database.models import WebLink
 from api.v1._shared.base_mapper import BaseMapper
@@ -56,3 +56,12 @@ def map_list_to_web_link_view(
 ) -> List[WebLinkView]:
     """Map a list of WebLink models to a list of WebLinkViews."""
     return web_link_mapper.map_list_to_view(models, include, select_fields)
+
+
+def map_list_to_web_link_dicts(
+    models: List[WebLink],
+    include: Optional[List[str]] = None,
+    select_fields: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Map a list of WebLink models to plain dicts (for orjson responses)."""
+    return web_link_mapper.map_list_to_dicts(models, include, select_fields)
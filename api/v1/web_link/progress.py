@@ -0,0 +1,320 @@
+"""
+Eventos de progresso do processamento de um WebLink.
+
+O `scrape_url_task` grava cada etapa na coluna `weblink.status` e publica um
+evento no canal WebSocket do dono do link (ver websocket_manager.py):
+
+    {"type": "weblink.stage", "weblink_id": "...", "stage": "FETCHED",
+     "stage_ms": 812, "elapsed_ms": 845, "attempt": 0, "at": "..."}
+
+Etapas: QUEUED -> FETCHED -> SUMMARIZED -> EMBEDDED, ou FAILED (com "error").
+Além do status, ficam gravados no próprio WebLink as tentativas, o último erro,
+a duração de cada etapa (`stage_durations`), tokens e chunks, que alimentam as
+métricas p50/p95 por etapa (`stage_duration_percentiles`). Nos retries as durações
+são mescladas às já gravadas e os tokens somados aos das tentativas anteriores.
+Os clientes acompanham pelo WebSocket (/web_links/ws), por SSE
+(/web_links/{id}/events) ou esperam a próxima mudança com long-poll
+(/web_links/{id}/status?since=...), em vez de consultar o WebLink em loop.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from uuid import UUID
+
+import pytz
+from sqlalchemy import literal, text, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from api.utils.db_services import SessionLocal
+from api.utils.modules.ws.websocket_manager import manager, publish_user_event
+from api.utils.settings import settings
+from api.v1._database.models import WEBLINK_TERMINAL_STATUSES, WebLink, WebLinkStatus
+
+tz = pytz.timezone('America/Sao_Paulo')
+STAGE_EVENT = "weblink.stage"
+
+# Etapa concluída -> chave em `weblink.stage_durations`
+STAGE_DURATION_KEYS = {
+    WebLinkStatus.FETCHED.value: "fetch",
+    WebLinkStatus.SUMMARIZED.value: "summarize",
+    WebLinkStatus.EMBEDDED.value: "embed",
+}
+
+
+class StageTimer:
+    """
+    Cronômetro das etapas de uma execução da task.
+
+    `durations` acumula o que vai para `weblink.stage_durations` (ms): a espera na
+    fila (só na primeira tentativa), cada etapa concluída e o total da execução.
+    `tokens_before` são os tokens já gravados por tentativas anteriores.
+    """
+
+    def __init__(self, queue_ms: Optional[int] = None, tokens_before: int = 0):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.durations: Dict[str, int] = {}
+        self.tokens_before = tokens_before
+        if queue_ms is not None:
+            self.durations["queue"] = queue_ms
+
+    def lap(self) -> Tuple[int, int]:
+        agora = time.perf_counter()
+        stage_ms = int((agora - self._last) * 1000)
+        self._last = agora
+        return stage_ms, int((agora - self.started) * 1000)
+
+
+def start_processing(db: Session, weblink_id, attempt: int) -> Tuple[Optional[UUID], Optional[StageTimer]]:
+    """
+    Marca o início de uma tentativa (attempts, processing_started_at) e cria o cronômetro.
+
+    Returns:
+        (usuario_id, timer); (None, None) se o WebLink não existir mais
+    """
+    agora = datetime.now(tz)
+    row = db.execute(
+        update(WebLink)
+        .where(WebLink.id == UUID(str(weblink_id)))
+        .values(attempts=attempt + 1, processing_started_at=agora)
+        .returning(WebLink.usuario_id, WebLink.created_at, WebLink.tokens_used)
+    ).first()
+    db.commit()
+    if row is None:
+        return None, None
+
+    queue_ms = None
+    if attempt == 0 and row.created_at is not None:
+        queue_ms = max(0, int((agora - row.created_at).total_seconds() * 1000))
+    return row.usuario_id, StageTimer(queue_ms=queue_ms, tokens_before=row.tokens_used or 0)
+
+
+def build_stage_event(weblink_id, stage: str, **extra: Any) -> Dict[str, Any]:
+    """Monta o evento de etapa (campos None são omitidos)."""
+    event = {
+        "type": STAGE_EVENT,
+        "weblink_id": str(weblink_id),
+        "stage": stage,
+        "at": datetime.now(tz).isoformat(),
+    }
+    event.update({chave: valor for chave, valor in extra.items() if valor is not None})
+    return event
+
+
+def emit_stage(
+    db: Session,
+    weblink_id,
+    usuario_id,
+    stage: str,
+    timer: Optional[StageTimer] = None,
+    columns: Optional[Dict[str, Any]] = None,
+    **extra: Any,
+) -> Dict[str, Any]:
+    """
+    Persiste a etapa em `weblink.status` e publica o evento para o dono do link.
+
+    Args:
+        db: Sessão da task
+        weblink_id: ID do WebLink
+        usuario_id: Dono do link (canal WebSocket que recebe o evento)
+        stage: Valor de WebLinkStatus
+        timer: Se informado, adiciona stage_ms/elapsed_ms ao evento e mescla as
+            durações desta tentativa em `stage_durations` (e grava `processed_at`
+            em estado terminal)
+        columns: Outras colunas do WebLink a gravar no mesmo UPDATE
+            (last_error, tokens_used, chunk_count...). `tokens_used` é o acumulado
+            da tentativa atual; com `timer` ele é somado ao das anteriores e o
+            total também vai no evento (`tokens`)
+        **extra: Campos adicionais do evento (attempt, error, chunks...)
+
+    Returns:
+        O evento publicado
+    """
+    values: Dict[str, Any] = {"status": stage, **(columns or {})}
+    if timer is not None:
+        stage_ms, elapsed_ms = timer.lap()
+        extra["stage_ms"], extra["elapsed_ms"] = stage_ms, elapsed_ms
+        chave = STAGE_DURATION_KEYS.get(stage)
+        if chave:
+            timer.durations[chave] = stage_ms
+        if stage in WEBLINK_TERMINAL_STATUSES:
+            timer.durations["total"] = elapsed_ms
+        # Mescla (||) em vez de sobrescrever: um retry não apaga a fila/etapas já medidas
+        values["stage_durations"] = WebLink.stage_durations.op("||")(
+            literal(dict(timer.durations), type_=JSONB)
+        )
+        if values.get("tokens_used") is not None:
+            values["tokens_used"] = timer.tokens_before + values["tokens_used"]
+            extra["tokens"] = values["tokens_used"]
+    if stage in WEBLINK_TERMINAL_STATUSES:
+        values["processed_at"] = datetime.now(tz)
+
+    db.query(WebLink).filter(WebLink.id == UUID(str(weblink_id))).update(
+        values, synchronize_session=False
+    )
+    db.commit()
+
+    event = build_stage_event(weblink_id, stage, **extra)
+    if usuario_id is not None:
+        publish_user_event(str(usuario_id), event)
+    return event
+
+
+def read_status(weblink_id) -> Optional[str]:
+    """Lê só a coluna de status, numa sessão curta (não segura conexão durante a espera)."""
+    db = SessionLocal()
+    try:
+        return db.query(WebLink.status).filter(WebLink.id == weblink_id).scalar()
+    finally:
+        db.close()
+
+
+STATS_BUCKETS = ("hour", "day", "week")
+
+
+def stage_duration_percentiles(
+    db: Session,
+    since: datetime,
+    bucket: str = "day",
+    status: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    p50/p95 (ms) de cada etapa por período, a partir de `weblink.stage_durations`.
+
+    Args:
+        db: Sessão do banco
+        since: Considera links finalizados (processed_at) a partir desta data
+        bucket: Granularidade do período (hour, day ou week)
+        status: Restringe a EMBEDDED ou FAILED (padrão: ambos)
+
+    Returns:
+        Dict com `series` (periodo, stage, count, p50_ms, p95_ms, max_ms) e
+        `totals` (links, falhas, tentativas extras, tokens e chunks no intervalo)
+    """
+    if bucket not in STATS_BUCKETS:
+        raise ValueError(f"bucket deve ser um de {', '.join(STATS_BUCKETS)}")
+    statuses = [status] if status else list(WEBLINK_TERMINAL_STATUSES)
+    params = {"bucket": bucket, "since": since, "statuses": statuses}
+
+    series = db.execute(
+        text("""
+            SELECT date_trunc(:bucket, w.processed_at) AS periodo,
+                   d.key AS stage,
+                   count(*) AS count,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY d.value::numeric) AS p50_ms,
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY d.value::numeric) AS p95_ms,
+                   max(d.value::numeric) AS max_ms
+            FROM weblink w
+            CROSS JOIN LATERAL jsonb_each_text(w.stage_durations) AS d
+            WHERE w.processed_at >= :since
+              AND w.status = ANY(:statuses)
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """),
+        params,
+    ).mappings().all()
+
+    totals = db.execute(
+        text("""
+            SELECT count(*) AS links,
+                   count(*) FILTER (WHERE w.status = 'FAILED') AS failed,
+                   coalesce(sum(greatest(w.attempts - 1, 0)), 0) AS retries,
+                   coalesce(sum(w.tokens_used), 0) AS tokens_used,
+                   coalesce(sum(w.chunk_count), 0) AS chunk_count,
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY w.tokens_used) AS p95_tokens
+            FROM weblink w
+            WHERE w.processed_at >= :since
+              AND w.status = ANY(:statuses)
+        """),
+        params,
+    ).mappings().first()
+
+    return {
+        "since": since,
+        "bucket": bucket,
+        "series": [
+            {
+                "periodo": row["periodo"],
+                "stage": row["stage"],
+                "count": row["count"],
+                "p50_ms": round(float(row["p50_ms"]), 1),
+                "p95_ms": round(float(row["p95_ms"]), 1),
+                "max_ms": float(row["max_ms"]),
+            }
+            for row in series
+        ],
+        "totals": dict(totals) if totals else {},
+    }
+
+
+def _is_stage_event(event: dict, weblink_id) -> bool:
+    return event.get("type") == STAGE_EVENT and event.get("weblink_id") == str(weblink_id)
+
+
+async def wait_for_status(
+    weblink_id,
+    usuario_id,
+    since: Optional[str],
+    timeout: float,
+) -> Tuple[Optional[str], bool]:
+    """
+    Long-poll: espera o status do link sair de `since`.
+
+    Assina os eventos do dono ANTES de ler o banco, então uma etapa gravada entre
+    a leitura e a espera não se perde.
+
+    Returns:
+        (status, changed); changed=False quando a espera acabou por timeout
+    """
+    async with manager.subscribe(usuario_id) as fila:
+        status = await asyncio.to_thread(read_status, weblink_id)
+        if since is None or status != since or status in WEBLINK_TERMINAL_STATUSES:
+            return status, status != since
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            restante = deadline - loop.time()
+            if restante <= 0:
+                return status, False
+            try:
+                event = await asyncio.wait_for(fila.get(), timeout=restante)
+            except asyncio.TimeoutError:
+                return status, False
+            if _is_stage_event(event, weblink_id) and event.get("stage") != since:
+                return event["stage"], True
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+async def stream_stage_events(weblink_id, usuario_id) -> AsyncIterator[str]:
+    """
+    Gerador SSE: envia o status atual e depois cada etapa até um estado terminal.
+
+    Comentários de heartbeat a cada WEBLINK_SSE_HEARTBEAT_SECONDS mantêm proxies
+    com a conexão aberta; o stream fecha após WEBLINK_SSE_MAX_SECONDS.
+    """
+    async with manager.subscribe(usuario_id) as fila:
+        status = await asyncio.to_thread(read_status, weblink_id)
+        yield _sse(build_stage_event(weblink_id, status, snapshot=True))
+        if status in WEBLINK_TERMINAL_STATUSES:
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.WEBLINK_SSE_MAX_SECONDS
+        while loop.time() < deadline:
+            try:
+                event = await asyncio.wait_for(fila.get(), timeout=settings.WEBLINK_SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if not _is_stage_event(event, weblink_id):
+                continue
+            yield _sse(event)
+            if event.get("stage") in WEBLINK_TERMINAL_STATUSES:
+                return
@@ -1,7 +1,8 @@
-from typing import List, Dict, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from openai import OpenAI
+from api.utils.metrics import observe_openai
 from api.v1._database.models import Conhecimento
 from api.v1._shared.custom_schemas import PageContent
 from decouple import config
@@ -15,11 +16,17 @@ BATCH_SIZE = 64
 EMBED_MODEL = config("EMBED_MODEL")
 
 
-def embed_batch(client: OpenAI, texts: List[str]) -> List[List[float]]:
-    """Gera embeddings em batch para múltiplos textos."""
+def embed_batch(
+    client: OpenAI, texts: List[str], usage: Optional[Dict[str, int]] = None
+) -> List[List[float]]:
+    """Gera embeddings em batch para múltiplos textos (soma os tokens em `usage`, se informado)."""
     if not texts:
         return []
-    resp = client.embeddings.create(model=EMBED_MODEL, input=texts)
+    with observe_openai("embed", EMBED_MODEL) as call:
+        resp = client.embeddings.create(model=EMBED_MODEL, input=texts)
+        call.record(resp)
+    if usage is not None and getattr(resp, "usage", None) is not None:
+        usage["total_tokens"] = usage.get("total_tokens", 0) + (resp.usage.total_tokens or 0)
     return [d.embedding for d in resp.data]
 
 
@@ -193,6 +200,166 @@ def chunk_page_content(page_content: PageContent) -> List[Tuple[str, str]]:
     return items
 
 
+def _embed_and_insert(
+    db: Session,
+    client: OpenAI,
+    context: str,
+    batch: List[Tuple[str, str]],
+    usage: Optional[Dict[str, int]] = None,
+) -> Tuple[int, int]:
+    """
+    Gera embeddings de um batch de (title, content) e insere no pgvector.
+
+    Returns:
+        (inseridos, falhas)
+    """
+    inserted = 0
+    failed = 0
+    try:
+        # Tenta embeddar o batch inteiro
+        texts = [content for (_, content) in batch]
+        embeddings = embed_batch(client, texts, usage)
+        
+        # Insere todos do batch
+        for (title, content), embedding in zip(batch, embeddings):
+            row = Conhecimento(
+                title=title,
+                context=context,
+                content=content,
+                embedding=embedding
+            )
+            db.add(row)
+            inserted += 1
+        
+        db.commit()
+        
+    except Exception as e:
+        # Se batch falhar, tenta item a item
+        print(f"[AVISO] Falha no batch de {len(batch)} chunks: {e}")
+        
+        for title, content in batch:
+            try:
+                embedding = embed_batch(client, [content], usage)[0]
+                row = Conhecimento(
+                    title=title,
+                    context=context,
+                    content=content,
+                    embedding=embedding
+                )
+                db.add(row)
+                inserted += 1
+            except Exception as item_error:
+                print(f"[ERRO] Falha ao inserir chunk: {item_error}")
+                failed += 1
+        
+        db.commit()
+    return inserted, failed
+
+
+def chunk_pdf_pages(pages: Iterable[Tuple[int, str]], title: str) -> Iterator[Tuple[str, str]]:
+    """
+    Converte páginas de PDF (numero, texto) em chunks (title, content) sob demanda.
+
+    O texto de páginas consecutivas é acumulado até formar parágrafos completos, então
+    um parágrafo que atravessa a quebra de página não vira dois chunks truncados.
+    Title = "{title} - p. {pagina}" (página onde o chunk começa).
+    """
+    buffer: List[str] = []
+    buffer_chars = 0
+    first_page = None
+
+    for page_num, page_text in pages:
+        page_text = (page_text or "").strip()
+        if not page_text:
+            continue
+        if first_page is None:
+            first_page = page_num
+        buffer.append(page_text)
+        buffer_chars += len(page_text)
+        if buffer_chars < MAX_CHARS * 2:
+            continue
+
+        # Mantém o último parágrafo no buffer: pode continuar na próxima página
+        text = "\n\n".join(buffer)
+        head, sep, tail = text.rpartition("\n\n")
+        if not sep:
+            head, tail = text, ""
+        for chunk in _chunk_text(head, MAX_CHARS):
+            if len(chunk) >= MIN_CHARS_TO_PROCESS:
+                yield f"{title} - p. {first_page}", chunk
+        buffer = [tail] if tail else []
+        buffer_chars = len(tail)
+        first_page = page_num if tail else None
+
+    if buffer:
+        for chunk in _chunk_text("\n\n".join(buffer), MAX_CHARS):
+            if len(chunk) >= MIN_CHARS_TO_PROCESS:
+                yield f"{title} - p. {first_page}", chunk
+
+
+def ingest_pdf_pages(
+    db: Session,
+    client: OpenAI,
+    *,
+    context: str,
+    title: str,
+    pages: Iterable[Tuple[int, str]]
+) -> Dict:
+    """
+    Ingere um PDF no pgvector a partir do gerador de páginas (`iter_pdf_pages`).
+
+    Os chunks são embeddados e inseridos em batches de BATCH_SIZE à medida que as
+    páginas chegam; o documento nunca fica inteiro em memória.
+    
+    Args:
+        db: Sessão do banco de dados
+        client: Cliente OpenAI para embeddings
+        context: Identificador único do documento
+        title: Título base dos chunks (nome do arquivo)
+        pages: Iterável de (numero_da_pagina, texto)
+        
+    Returns:
+        Dict com estatísticas: processed, chunks_total, inserted, failed, tokens
+    """
+    replace_context(db, context)
+
+    total = 0
+    inserted = 0
+    failed = 0
+    usage: Dict[str, int] = {"total_tokens": 0}
+    batch: List[Tuple[str, str]] = []
+
+    for item in chunk_pdf_pages(pages, title):
+        batch.append(item)
+        total += 1
+        if len(batch) >= BATCH_SIZE:
+            batch_inserted, batch_failed = _embed_and_insert(db, client, context, batch, usage)
+            inserted += batch_inserted
+            failed += batch_failed
+            batch = []
+
+    if batch:
+        batch_inserted, batch_failed = _embed_and_insert(db, client, context, batch, usage)
+        inserted += batch_inserted
+        failed += batch_failed
+
+    if not total:
+        return {
+            "processed": False,
+            "reason": "sem chunks válidos (texto muito curto ou vazio)"
+        }
+
+    analyze_table(db)
+
+    return {
+        "processed": True,
+        "chunks_total": total,
+        "inserted": inserted,
+        "failed": failed,
+        "tokens": usage["total_tokens"]
+    }
+
+
 def ingest_page_content(
     db: Session,
     client: OpenAI,
@@ -210,7 +377,7 @@ def ingest_page_content(
         page_content: Objeto PageContent extraído do scraping
         
     Returns:
-        Dict com estatísticas: processed, chunks_total, inserted, failed
+        Dict com estatísticas: processed, chunks_total, inserted, failed, tokens
     """
     # 1) Apaga conhecimentos antigos do mesmo contexto
     replace_context(db, context)
@@ -228,48 +395,12 @@ def ingest_page_content(
     total = len(items)
     inserted = 0
     failed = 0
+    usage: Dict[str, int] = {"total_tokens": 0}
     
     for i in range(0, total, BATCH_SIZE):
-        batch = items[i:i + BATCH_SIZE]
-        
-        try:
-            # Tenta embeddar o batch inteiro
-            texts = [content for (_, content) in batch]
-            embeddings = embed_batch(client, texts)
-            
-            # Insere todos do batch
-            for (title, content), embedding in zip(batch, embeddings):
-                row = Conhecimento(
-                    title=title,
-                    context=context,
-                    content=content,
-                    embedding=embedding
-                )
-                db.add(row)
-                inserted += 1
-            
-            db.commit()
-            
-        except Exception as e:
-            # Se batch falhar, tenta item a item
-            print(f"[AVISO] Falha no batch {i}-{i+BATCH_SIZE}: {e}")
-            
-            for title, content in batch:
-                try:
-                    embedding = embed_batch(client, [content])[0]
-                    row = Conhecimento(
-                        title=title,
-                        context=context,
-                        content=content,
-                        embedding=embedding
-                    )
-                    db.add(row)
-                    inserted += 1
-                except Exception as item_error:
-                    print(f"[ERRO] Falha ao inserir chunk: {item_error}")
-                    failed += 1
-            
-            db.commit()
+        batch_inserted, batch_failed = _embed_and_insert(db, client, context, items[i:i + BATCH_SIZE], usage)
+        inserted += batch_inserted
+        failed += batch_failed
     
     # 4) Otimiza a tabela
     analyze_table(db)
@@ -278,5 +409,6 @@ def ingest_page_content(
         "processed": True,
         "chunks_total": total,
         "inserted": inserted,
-        "failed": failed
+        "failed": failed,
+        "tokens": usage["total_tokens"]
     }
\ No newline at end of file
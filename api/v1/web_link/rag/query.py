@@ -6,6 +6,7 @@ from openai import OpenAI
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from api.utils.metrics import observe_openai
 from api.v1._database.models import Conhecimento, WebLink
 
 logger = logging.getLogger(__name__)
@@ -124,15 +125,17 @@ Pergunta: {question}
 Resposta:"""
     
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            max_tokens=MAX_TOKENS,
-            temperature=TEMPERATURE,
-        )
+        with observe_openai("rag", MODEL) as call:
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+            )
+            call.record(response)
         
         answer = response.choices[0].message.content.strip()
         input_tokens = response.usage.prompt_tokens
@@ -186,10 +189,12 @@ def query_weblink_knowledge(
     
     # 3) Gera embedding da pergunta
     try:
-        embedding_response = client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=question
-        )
+        with observe_openai("embed", "text-embedding-ada-002") as call:
+            embedding_response = client.embeddings.create(
+                model="text-embedding-ada-002",
+                input=question
+            )
+            call.record(embedding_response)
         query_embedding = embedding_response.data[0].embedding
     except Exception as e:
         logger.error(f"Erro ao gerar embedding da pergunta: {e}")
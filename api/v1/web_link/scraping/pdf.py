@@ -0,0 +1,65 @@
+"""
+Download de WebLinks que apontam para PDF.
+
+O Selenium não renderiza PDF; para esses links o arquivo é baixado em streaming
+para um temporário (com timeout e limite de tamanho) e o texto é extraído página a
+página por `iter_pdf_pages`, sem carregar o documento inteiro em memória.
+"""
+import logging
+import os
+import tempfile
+from pathlib import PurePosixPath
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+from api.utils.modules.pdf.pdf_download import iter_pdf_download
+from api.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b"%PDF"
+
+
+def is_pdf_url(url: str) -> bool:
+    """True quando o caminho da URL termina em .pdf."""
+    return urlparse(url).path.lower().endswith(".pdf")
+
+
+def pdf_title(url: str) -> str:
+    """Nome do arquivo na URL (sem extensão), usado como título do WebLink e dos chunks."""
+    nome = unquote(PurePosixPath(urlparse(url).path).name)
+    return nome[:-4] if nome.lower().endswith(".pdf") else nome or urlparse(url).netloc
+
+
+def download_pdf(url: str) -> Optional[str]:
+    """
+    Baixa o PDF para um arquivo temporário (limite PDF_RAG_MAX_BYTES).
+
+    Returns:
+        Caminho do arquivo (o chamador remove) ou None se a resposta não for um PDF,
+        caso em que o link segue pelo scraping normal
+
+    Raises:
+        PdfTooLargeError: se o arquivo passar do limite (falha permanente, sem retry)
+        requests.RequestException: em erro de rede/HTTP (a task faz retry)
+    """
+    timeout = (settings.PDF_RAG_CONNECT_TIMEOUT, settings.PDF_RAG_READ_TIMEOUT)
+    chunks = iter_pdf_download(url, settings.PDF_RAG_MAX_BYTES, timeout)
+    try:
+        primeiro = next(chunks, b"")
+        if not primeiro.startswith(PDF_MAGIC):
+            logger.info(f"[PDF] {url} não retornou um PDF; seguindo com scraping")
+            return None
+
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(primeiro)
+                for chunk in chunks:
+                    f.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+    finally:
+        chunks.close()
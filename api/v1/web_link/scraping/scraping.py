@@ -19,6 +19,8 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from api.utils.metrics import observe_chrome_launch, observe_page_load
+from api.utils.tracing import span
 from api.v1._shared.custom_schemas import HeadingsData, OpenGraphData, PageContent
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -122,7 +124,8 @@ def _create_chrome_driver_headless() -> tuple[webdriver.Chrome, str, str]:
     debug_port = random.randint(9222, 9999)
     chrome_options.add_argument(f"--remote-debugging-port={debug_port}")
 
-    driver = webdriver.Chrome(options=chrome_options)
+    with observe_chrome_launch():
+        driver = webdriver.Chrome(options=chrome_options)
     driver.set_page_load_timeout(30)
 
     try:
@@ -321,7 +324,12 @@ def url_to_json(url: str, timeout: float = 30.0, max_retries: int = 1) -> PageCo
         driver, user_data_dir, cache_dir = None, None, None
         try:
             driver, user_data_dir, cache_dir = _create_chrome_driver_headless()
-            html, timed_out = _poll_until_ready_or_timeout(driver, url, max_seconds=timeout, poll_interval=0.25)
+            load_start = time.perf_counter()
+            with span("chrome.page_load", **{"url.domain": _domain(url), "scrape.attempt": attempt}) as page_span:
+                html, timed_out = _poll_until_ready_or_timeout(driver, url, max_seconds=timeout, poll_interval=0.25)
+                page_span.set_attribute("scrape.timed_out", timed_out)
+                page_span.set_attribute("scrape.html_bytes", len(html))
+            observe_page_load(time.perf_counter() - load_start, timed_out)
 
             if len(html) > len(best_html):
                 best_html = html
@@ -347,10 +355,11 @@ def url_to_json(url: str, timeout: float = 30.0, max_retries: int = 1) -> PageCo
         raise ValueError(f"Nenhum HTML válido obtido em {url}")
 
     # ===== Extração (fora do limite de 30s) =====
-    soup = BeautifulSoup(best_html, "lxml")
-    meta = _extract_meta(soup)
-    headings_dict = _extract_headings(soup)
-    main_text = _extract_main_text(soup)
+    with span("scrape.parse_html", **{"scrape.html_bytes": len(best_html)}):
+        soup = BeautifulSoup(best_html, "lxml")
+        meta = _extract_meta(soup)
+        headings_dict = _extract_headings(soup)
+        main_text = _extract_main_text(soup)
     
     #print(soup.body.prettify())
     #print(soup.body.get_text(" ", strip=True))
@@ -3,11 +3,17 @@ from sqlalchemy.orm import Session
 from uuid import UUID
 import logging
 
-from api.v1._database.models import WebLink
+from api.v1._database.models import WebLink, WebLinkStatus
 from api.v1._shared.base_use_case import BaseUseCase
 from api.v1._shared.schemas import WebLinkCreate, WebLinkUpdate, WebLinkView
-from api.v1.web_link.mapper import map_list_to_web_link_view, map_to_web_link_view
+from api.v1.web_link.mapper import (
+    map_list_to_web_link_dicts,
+    map_list_to_web_link_view,
+    map_to_web_link_view,
+)
 from api.v1.web_link.service import WebLinkService
+from api.utils.exceptions import exception_nao_encontrado
+from api.utils.modules.ws.websocket_manager import manager as ws_manager
 from api.utils.permissions import has_permission
 
 logger = logging.getLogger(__name__)
@@ -26,7 +32,8 @@ class WebLinkUseCase(BaseUseCase[WebLink, WebLinkCreate, WebLinkUpdate, WebLinkV
             service=WebLinkService(),
             entity_name="WebLink",
             map_to_view=map_to_web_link_view,
-            map_list_to_view=map_list_to_web_link_view
+            map_list_to_view=map_list_to_web_link_view,
+            map_list_to_dicts=map_list_to_web_link_dicts,
         )
 
     async def get_all(
@@ -41,6 +48,7 @@ class WebLinkUseCase(BaseUseCase[WebLink, WebLinkCreate, WebLinkUpdate, WebLinkV
         search: Optional[str] = None,
         select_fields: Optional[str] = None,
         user_info: Optional[Any] = None,
+        as_dicts: bool = False,
     ) -> Dict[str, Any]:
         """
         Get all WebLinks with access control.
@@ -60,6 +68,7 @@ class WebLinkUseCase(BaseUseCase[WebLink, WebLinkCreate, WebLinkUpdate, WebLinkV
             search: Search term
             select_fields: Fields to select
             user_info: Usuario object from authentication
+            as_dicts: Return plain dicts instead of view models
             
         Returns:
             Dictionary with total count and list of view models
@@ -95,7 +104,8 @@ class WebLinkUseCase(BaseUseCase[WebLink, WebLinkCreate, WebLinkUpdate, WebLinkV
             sort_dir=sort_dir,
             search=search,
             select_fields=select_fields,
-            user_info=user_info_for_base
+            user_info=user_info_for_base,
+            as_dicts=as_dicts,
         )
 
     async def create(
@@ -125,11 +135,37 @@ class WebLinkUseCase(BaseUseCase[WebLink, WebLinkCreate, WebLinkUpdate, WebLinkV
         if created_model.weblink:
             try:
                 from api.v1.web_link.celery.tasks import scrape_url_task
+                from api.v1.web_link.progress import build_stage_event
                 scrape_url_task.delay(str(created_model.id), created_model.weblink)
                 logger.info(f"Task de scraping disparada para WebLink ID: {created_model.id}")
+                await ws_manager.publish(
+                    created_model.usuario_id,
+                    build_stage_event(created_model.id, WebLinkStatus.QUEUED.value),
+                )
             except Exception as e:
                 # Apenas loga erro, não interrompe a criação do WebLink
                 logger.error(f"Erro ao disparar task de scraping para WebLink ID {created_model.id}: {e}")
                 print(f"[AVISO] Não foi possível disparar task de scraping: {e}")
         
         return created_model
+
+    async def get_status(self, db: Session, id: UUID, user_info: Any) -> Dict[str, Any]:
+        """
+        Status de processamento e dono do WebLink (só essas colunas).
+
+        Mesma regra de acesso da listagem: admin vê qualquer link, usuário normal
+        apenas os próprios (os demais respondem 404).
+
+        Returns:
+            Dict com status e usuario_id
+        """
+        row = (
+            db.query(WebLink.status, WebLink.usuario_id)
+            .filter(WebLink.id == id, WebLink.flg_excluido.is_(False))
+            .first()
+        )
+        if row is None:
+            raise exception_nao_encontrado("WebLink")
+        if not has_permission(user_info, "ADMIN") and str(row.usuario_id) != str(user_info.id):
+            raise exception_nao_encontrado("WebLink")
+        return {"status": row.status, "usuario_id": row.usuario_id}
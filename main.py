@@ -1,11 +1,22 @@
+from contextlib import asynccontextmanager
 from datetime import datetime
 import logging
+import sys
 
 from fastapi import FastAPI
-from fastapi import HTTPException, Request
+from fastapi import HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
+from api.utils.compression import CompressionMiddleware
+from api.utils.db_services import engine
+from api.utils.metrics import MetricsMiddleware, render_latest
+from api.utils.modules.ws.websocket_manager import manager as ws_manager
+from api.utils.profiling import ProfilingMiddleware, install_profiling_hooks
+from api.utils.query_budget import QueryBudgetMiddleware
+from api.utils.settings import settings
+from api.utils.slow_queries import SlowQueryContextMiddleware
+from api.utils.tracing import setup_tracing, shutdown_tracing
 from api.v1.routes import routes
 
 
@@ -13,9 +24,25 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Encerra o listener Redis e fecha os WebSockets deste processo
+    await ws_manager.shutdown()
+    # Fecha o pool keep-alive da Evolution API, se algum código deste processo o abriu
+    # (importar o módulo aqui exigiria EVOLUTIONAPI_URL mesmo sem uso do WhatsApp)
+    evolution_api = sys.modules.get("api.utils.evolution_api")
+    if evolution_api is not None:
+        await evolution_api.aclose_evolution_client()
+    shutdown_tracing()
+
+
 app = FastAPI(
     title="Teste - Seletivo", 
-    version="0.0.1"
+    version="0.0.1",
+    lifespan=lifespan,
+    # orjson serializa UUID/datetime nativamente e é bem mais rápido que o json padrão
+    default_response_class=ORJSONResponse,
 )
 app.include_router(routes)
 
@@ -29,13 +56,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+if settings.QUERY_BUDGET_ENABLED:
+    app.add_middleware(QueryBudgetMiddleware)
+
+# Endpoint de origem das queries lentas
+if settings.SLOW_QUERY_ENABLED:
+    app.add_middleware(SlowQueryContextMiddleware)
+
+# Starlette: o último add_middleware é o mais externo. Ordem de fora para dentro:
+# Profiling -> Metrics -> SlowQueryContext -> QueryBudget -> Compression -> CORS.
+# Metrics fica por fora da compressão e mede a requisição inteira; o Profiling
+# envolve tudo (inclusive Metrics) para o profile cobrir a requisição completa
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Profiling sob demanda: sem o header/flag de um admin, só lê os headers
+if settings.PROFILING_ENABLED:
+    install_profiling_hooks(engine)
+    app.add_middleware(ProfilingMiddleware)
+
+# FastAPI, SQLAlchemy, httpx (OpenAI) e Celery (contexto nos headers das tasks)
+setup_tracing("bna-api", app=app)
+
 @app.exception_handler(HTTPException)
 async def custom_http_exception_handler(request: Request, exc: HTTPException):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail},
+        headers=getattr(exc, "headers", None),
     )
 
+# Síncrono de propósito: a coleta lê os arquivos do multiprocess e o LLEN das filas
+# no Redis, então roda no threadpool em vez de travar o event loop
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
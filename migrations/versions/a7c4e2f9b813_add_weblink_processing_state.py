@@ -0,0 +1,52 @@
+"""add_weblink_processing_state
+
+Revision ID: a7c4e2f9b813
+Revises: f1a2c3d4e5b6
+Create Date: 2025-10-29 15:06:52.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c4e2f9b813'
+down_revision: Union[str, Sequence[str], None] = 'f1a2c3d4e5b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('weblink', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('weblink', sa.Column('last_error', sa.Text(), nullable=True))
+    op.add_column('weblink', sa.Column('stage_durations', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False))
+    op.add_column('weblink', sa.Column('tokens_used', sa.Integer(), nullable=True))
+    op.add_column('weblink', sa.Column('chunk_count', sa.Integer(), nullable=True))
+    op.add_column('weblink', sa.Column('processing_started_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('weblink', sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True))
+    # Índice parcial: só os links ainda em processamento
+    op.create_index(
+        'ix_weblink_em_processamento',
+        'weblink',
+        ['created_at'],
+        unique=False,
+        postgresql_where=sa.text("status NOT IN ('EMBEDDED', 'FAILED')")
+    )
+    op.create_index('ix_weblink_processed_at', 'weblink', ['processed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_weblink_processed_at', table_name='weblink')
+    op.drop_index('ix_weblink_em_processamento', table_name='weblink', postgresql_where=sa.text("status NOT IN ('EMBEDDED', 'FAILED')"))
+    op.drop_column('weblink', 'processed_at')
+    op.drop_column('weblink', 'processing_started_at')
+    op.drop_column('weblink', 'chunk_count')
+    op.drop_column('weblink', 'tokens_used')
+    op.drop_column('weblink', 'stage_durations')
+    op.drop_column('weblink', 'last_error')
+    op.drop_column('weblink', 'attempts')
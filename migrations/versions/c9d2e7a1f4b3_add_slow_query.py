@@ -0,0 +1,50 @@
+"""add_slow_query
+
+Revision ID: c9d2e7a1f4b3
+Revises: a7c4e2f9b813
+Create Date: 2025-10-30 09:41:17.228530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d2e7a1f4b3'
+down_revision: Union[str, Sequence[str], None] = 'a7c4e2f9b813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'slow_query',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('fingerprint', sa.String(length=40), nullable=False),
+        sa.Column('sql', sa.Text(), nullable=False),
+        sa.Column('param_shapes', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('duration_ms', sa.Float(), nullable=False),
+        sa.Column('rows', sa.Integer(), nullable=True),
+        sa.Column('origin', sa.String(length=255), nullable=True),
+        sa.Column('explain_plan', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_slow_query_created_at', 'slow_query', ['created_at'], unique=False)
+    op.create_index(
+        'ix_slow_query_fingerprint_created_at',
+        'slow_query',
+        ['fingerprint', 'created_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_slow_query_fingerprint_created_at', table_name='slow_query')
+    op.drop_index('ix_slow_query_created_at', table_name='slow_query')
+    op.drop_table('slow_query')
@@ -0,0 +1,52 @@
+"""add_email_outbox
+
+Revision ID: e3b7c1d9a4f2
+Revises: de6a4cdedc7a
+Create Date: 2025-10-28 10:12:41.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7c1d9a4f2'
+down_revision: Union[str, Sequence[str], None] = 'de6a4cdedc7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('template_type', sa.String(length=50), nullable=False),
+        sa.Column('to_email', sa.String(length=255), nullable=False),
+        sa.Column('variables', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+        sa.Column('custom_subject', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.String(length=20), server_default='PENDENTE', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('available_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Índice parcial: o dispatcher só varre os pendentes
+    op.create_index(
+        'ix_email_outbox_pendente',
+        'email_outbox',
+        ['available_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'PENDENTE'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_email_outbox_pendente', table_name='email_outbox', postgresql_where=sa.text("status = 'PENDENTE'"))
+    op.drop_table('email_outbox')
@@ -0,0 +1,30 @@
+"""add_weblink_status
+
+Revision ID: f1a2c3d4e5b6
+Revises: e3b7c1d9a4f2
+Create Date: 2025-10-29 09:41:07.218345
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a2c3d4e5b6'
+down_revision: Union[str, Sequence[str], None] = 'e3b7c1d9a4f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('weblink', sa.Column('status', sa.String(length=20), server_default='QUEUED', nullable=False))
+    # Links já processados antes da coluna existir
+    op.execute("UPDATE weblink SET status = 'EMBEDDED' WHERE resumo IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('weblink', 'status')
@@ -0,0 +1,92 @@
+"""
+Microbenchmark do mapeamento de listas (BaseMapper).
+
+Compara o caminho antigo (map_to_view item a item + jsonable_encoder/json)
+com o caminho em lote (map_list_to_view / map_list_to_dicts + orjson),
+usando objetos WebLink transientes (sem banco de dados).
+
+Uso:
+    python scripts/bench_mapper.py [--rows 500] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+# Adicionar o diretório raiz ao PYTHONPATH
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from api.v1._database.models import WebLink
+from api.v1.web_link.mapper import web_link_mapper
+
+
+def _build_models(rows: int):
+    """Cria WebLinks transientes com dados plausíveis."""
+    agora = datetime.now(timezone.utc)
+    usuario_id = uuid.uuid4()
+    return [
+        WebLink(
+            id=uuid.uuid4(),
+            weblink=f"https://exemplo.com/artigo/{i}",
+            title=f"Artigo {i}",
+            resumo="Resumo " * 40,
+            usuario_id=usuario_id,
+            flg_ativo=True,
+            flg_excluido=False,
+            created_at=agora,
+            updated_at=agora,
+        )
+        for i in range(rows)
+    ]
+
+
+def _per_item(models):
+    """Caminho antigo: um model_validate por linha + jsonable_encoder + json.dumps."""
+    views = [web_link_mapper.map_to_view(m, None) for m in models]
+    return json.dumps(jsonable_encoder({"total": len(views), "data": views})).encode()
+
+
+def _batch_views(models):
+    """Validação em lote, serialização ainda pelo caminho padrão do FastAPI."""
+    views = web_link_mapper.map_list_to_view(models, None)
+    return json.dumps(jsonable_encoder({"total": len(views), "data": views})).encode()
+
+
+def _batch_dicts(models):
+    """Validação em lote + dicts simples serializados direto com orjson."""
+    rows = web_link_mapper.map_list_to_dicts(models, None)
+    return orjson.dumps({"total": len(rows), "data": rows})
+
+
+def _bench(label, func, models, repeat):
+    func(models)  # aquecimento (planos e TypeAdapter em cache)
+    inicio = time.perf_counter()
+    for _ in range(repeat):
+        corpo = func(models)
+    total = (time.perf_counter() - inicio) / repeat
+    print(f"{label:<28} {total * 1000:8.2f} ms/req  {len(corpo) / 1024:8.1f} KiB")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    models = _build_models(args.rows)
+    print(f"📊 {args.rows} linhas, {args.repeat} repetições\n")
+    base = _bench("map_to_view (por item)", _per_item, models, args.repeat)
+    lote = _bench("map_list_to_view (lote)", _batch_views, models, args.repeat)
+    dicts = _bench("map_list_to_dicts + orjson", _batch_dicts, models, args.repeat)
+    print(f"\n⚡ lote: {base / lote:.1f}x | lote + orjson: {base / dicts:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
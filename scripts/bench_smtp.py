@@ -0,0 +1,116 @@
+"""
+Benchmark do envio SMTP: conexão nova por e-mail x pool de conexões.
+
+Sobe um servidor SMTP local (aiosmtpd) que só conta as mensagens recebidas e
+envia N e-mails de duas formas:
+    - antigo: smtplib.SMTP + (STARTTLS/LOGIN) + send_message a cada e-mail
+    - pool:   PooledSMTPSender reaproveitando as conexões do SMTPConnectionPool
+
+O servidor local não tem TLS nem autenticação, então a diferença medida é só a
+do handshake TCP/SMTP; com STARTTLS + LOGIN num provedor real ela é bem maior.
+
+Requer: pip install aiosmtpd
+
+Uso:
+    python scripts/bench_smtp.py [--messages 1000] [--pool-size 2] [--latency-ms 0]
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import socket
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+# Adicionar o diretório raiz ao PYTHONPATH
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiosmtpd.controller import Controller
+
+from api.utils.modules.smtp.smtp_pool import PooledSMTPSender, RateBudget, SMTPConnectionPool
+
+HOST = "127.0.0.1"
+
+
+class CountingHandler:
+    """Handler do aiosmtpd que só conta mensagens (com latência opcional por comando)."""
+
+    def __init__(self, latency: float = 0.0):
+        self.received = 0
+        self.latency = latency
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.received += 1
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _build_message(index: int) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["From"] = "bench@exemplo.com"
+    msg["To"] = f"destinatario{index}@exemplo.com"
+    msg["Subject"] = f"Benchmark {index}"
+    msg.attach(MIMEText("<p>" + "Conteúdo de teste. " * 40 + "</p>", "html"))
+    return msg
+
+
+def bench_conexao_por_email(port: int, messages: int) -> float:
+    inicio = time.perf_counter()
+    for i in range(messages):
+        with smtplib.SMTP(HOST, port) as server:
+            server.send_message(_build_message(i))
+    return time.perf_counter() - inicio
+
+
+def bench_pool(port: int, messages: int, pool_size: int) -> float:
+    pool = SMTPConnectionPool(HOST, port, use_tls=False, size=pool_size)
+    sender = PooledSMTPSender(pool, RateBudget(per_minute=0))  # sem orçamento: mede só o envio
+    inicio = time.perf_counter()
+    resultados = sender.send_many(_build_message(i) for i in range(messages))
+    duracao = time.perf_counter() - inicio
+    sender.close()
+    if not all(resultados):
+        print(f"⚠️ {resultados.count(False)} falhas no envio com pool")
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latência simulada por comando no servidor")
+    args = parser.parse_args()
+
+    handler = CountingHandler(latency=args.latency_ms / 1000)
+    port = _free_port()
+    controller = Controller(handler, hostname=HOST, port=port)
+    controller.start()
+
+    try:
+        print(f"📨 {args.messages} e-mails para o SMTP local em {HOST}:{port}\n")
+        antigo = bench_conexao_por_email(port, args.messages)
+        print(f"🐢 conexão por e-mail: {antigo:.2f}s ({args.messages / antigo:.0f} msg/s)")
+        pool = bench_pool(port, args.messages, args.pool_size)
+        print(f"🚀 pool de conexões:  {pool:.2f}s ({args.messages / pool:.0f} msg/s)")
+        print(f"\n✅ {antigo / pool:.1f}x mais rápido; servidor recebeu {handler.received} mensagens")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
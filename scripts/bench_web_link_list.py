@@ -0,0 +1,80 @@
+"""
+Benchmark de tamanho e latência da listagem de WebLinks.
+
+Chama GET /api/v1/web_links/?include=usuario (sem select) em uma API rodando,
+variando o Accept-Encoding (identity, gzip, br), e reporta bytes trafegados,
+bytes descomprimidos e latência p50/p95.
+
+Uso:
+    python scripts/bench_web_link_list.py --token <ACCESS_TOKEN>
+    python scripts/bench_web_link_list.py --base-url http://localhost:8000 --limit 500 --requests 50 --token <ACCESS_TOKEN>
+"""
+import argparse
+import statistics
+import time
+
+import httpx
+
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def bench_encoding(client: httpx.Client, url: str, params: dict, encoding: str, requests: int):
+    """Executa `requests` chamadas com o encoding informado e retorna as métricas."""
+    latencies, wire_sizes = [], []
+    body_size, content_encoding = 0, "identity"
+
+    headers = {"Accept-Encoding": encoding}
+    client.get(url, params=params, headers=headers)  # aquecimento
+
+    for _ in range(requests):
+        inicio = time.perf_counter()
+        with client.stream("GET", url, params=params, headers=headers) as response:
+            response.raise_for_status()
+            raw = b"".join(response.iter_raw())
+            content_encoding = response.headers.get("content-encoding", "identity")
+        latencies.append((time.perf_counter() - inicio) * 1000)
+        wire_sizes.append(len(raw))
+
+    response = client.get(url, params=params, headers=headers)
+    body_size = len(response.content)
+
+    return {
+        "encoding": content_encoding,
+        "wire_kib": statistics.mean(wire_sizes) / 1024,
+        "body_kib": body_size / 1024,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="Access token (Bearer)")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=30)
+    args = parser.parse_args()
+
+    url = f"{args.base_url.rstrip('/')}/api/v1/web_links/"
+    params = {"include": "usuario", "limit": args.limit}
+
+    print(f"📊 GET {url} include=usuario limit={args.limit} ({args.requests} requisições por encoding)\n")
+    print(f"{'pedido':<10} {'recebido':<10} {'fio KiB':>10} {'corpo KiB':>10} {'p50 ms':>9} {'p95 ms':>9}")
+
+    with httpx.Client(headers={"Authorization": f"Bearer {args.token}"}, timeout=30) as client:
+        for encoding in ENCODINGS:
+            result = bench_encoding(client, url, params, encoding, args.requests)
+            print(
+                f"{encoding:<10} {result['encoding']:<10} {result['wire_kib']:>10.1f} "
+                f"{result['body_kib']:>10.1f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
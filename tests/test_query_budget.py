@@ -0,0 +1,87 @@
+"""
+Orçamento de statements por requisição (api/utils/query_budget.py).
+
+Com QUERY_BUDGET_ENABLED=true (ligado em conftest.py), os endpoints de WebLink com
+`include=usuario` têm de caber no orçamento declarado em `query_budget(...)`, e um
+N+1 proposital tem de falhar com 500 e a lista de `problems`.
+"""
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from api.utils import principal_cache
+from api.utils.db_services import SessionLocal, get_db
+from api.utils.query_budget import QueryBudgetMiddleware, query_budget
+from api.utils.security import create_access_token
+from api.v1._database.models import Usuario, WebLink
+
+QUANTIDADE_LINKS = 5
+
+
+@pytest.fixture(scope="module")
+def usuario(engine):
+    db = SessionLocal()
+    try:
+        usuario = Usuario(nome="Orçamento", email="orcamento@teste.local", permissoes=["LINK"])
+        db.add(usuario)
+        db.flush()
+        db.add_all(
+            WebLink(weblink=f"https://exemplo.com/{i}", title=f"Link {i}", usuario_id=usuario.id)
+            for i in range(QUANTIDADE_LINKS)
+        )
+        db.commit()
+        yield usuario
+        db.query(WebLink).filter(WebLink.usuario_id == usuario.id).delete()
+        db.query(Usuario).filter(Usuario.id == usuario.id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def headers(usuario):
+    # Principal fora do cache: mede o pior caso (lookup do usuário no banco)
+    principal_cache._local.clear()
+    token = create_access_token({"sub": str(usuario.id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_listagem_com_usuario_cabe_no_orcamento(client, headers):
+    response = client.get("/api/v1/web_links/", params={"include": "usuario"}, headers=headers)
+
+    assert response.status_code == 200, response.json()
+    assert int(response.headers["X-DB-Statements"]) <= 4
+
+
+def test_busca_por_id_com_usuario_cabe_no_orcamento(client, headers, usuario):
+    db = SessionLocal()
+    try:
+        link_id = db.query(WebLink.id).filter(WebLink.usuario_id == usuario.id).limit(1).scalar()
+    finally:
+        db.close()
+
+    response = client.get(f"/api/v1/web_links/{link_id}", params={"include": "usuario"}, headers=headers)
+
+    assert response.status_code == 200, response.json()
+    assert int(response.headers["X-DB-Statements"]) <= 3
+
+
+def test_n_mais_um_falha_com_500(usuario):
+    app = FastAPI()
+    app.add_middleware(QueryBudgetMiddleware)
+
+    @app.get("/n-mais-um", dependencies=[Depends(query_budget(20))])
+    def n_mais_um(db: Session = Depends(get_db)):
+        links = db.query(WebLink).filter(WebLink.usuario_id == usuario.id).all()
+        # Um SELECT por link em vez de um selectin: o mesmo SQL se repete N vezes
+        return [
+            db.query(Usuario.nome).filter(Usuario.id == link.usuario_id).scalar()
+            for link in links
+        ]
+
+    response = TestClient(app).get("/n-mais-um")
+
+    assert response.status_code == 500
+    problems = response.json()["problems"]
+    assert any(f"repetido {QUANTIDADE_LINKS}x" in problem for problem in problems)